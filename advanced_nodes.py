@@ -3,9 +3,28 @@ Advanced nodes for GIF Inpainter Studio
 These nodes provide additional functionality for complex use cases
 """
 
+import re
 import torch
-import numpy as np
-from typing import Tuple
+from typing import List
+
+try:
+    from .background_model import BACKGROUND_METHODS, BackgroundModel
+    from .batch_filters import (CHUNK_FRAMES, MORPHOLOGY_OPERATIONS, color_distance_mask, gaussian_blur,
+                                hysteresis_threshold, max_filter, morphology, motion_energy, motion_mask)
+    from .packed_masks import map_packed, pack_frames
+    from .tracking import (STABILIZE_MOTIONS, coverage_masks, estimate_camera_path, similarity_parameters,
+                           stabilizing_transforms, track_mask, warp_frames)
+    from .utils import (float_frames_input, map_mask_planes, mask_plane, resize_frames, static_mask,
+                        to_float_frames, to_frame_dtype)
+except ImportError:
+    from background_model import BACKGROUND_METHODS, BackgroundModel
+    from batch_filters import (CHUNK_FRAMES, MORPHOLOGY_OPERATIONS, color_distance_mask, gaussian_blur,
+                               hysteresis_threshold, max_filter, morphology, motion_energy, motion_mask)
+    from packed_masks import map_packed, pack_frames
+    from tracking import (STABILIZE_MOTIONS, coverage_masks, estimate_camera_path, similarity_parameters,
+                          stabilizing_transforms, track_mask, warp_frames)
+    from utils import (float_frames_input, map_mask_planes, mask_plane, resize_frames, static_mask,
+                       to_float_frames, to_frame_dtype)
 
 
 class AdvancedMaskEditor:
@@ -18,50 +37,32 @@ class AdvancedMaskEditor:
         return {
             "required": {
                 "mask": ("MASK",),
-                "operation": (["dilate", "erode", "smooth", "invert"], {"default": "dilate"}),
+                "operation": (MORPHOLOGY_OPERATIONS + ["smooth", "invert"], {"default": "dilate"}),
+                # Morphology: square window radius, soft edges kept (not scipy's binary diamond)
                 "strength": ("INT", {"default": 3, "min": 1, "max": 20}),
             },
+            "optional": {
+                # Morphology only: also spread across this many neighbouring frames (steadies flicker)
+                "temporal_radius": ("INT", {"default": 0, "min": 0, "max": 10}),
+            },
         }
     
     RETURN_TYPES = ("MASK",)
     FUNCTION = "edit_mask"
     CATEGORY = "GifInpaint/Advanced"
     
-    def edit_mask(self, mask, operation, strength):
-        from scipy.ndimage import binary_dilation, binary_erosion, gaussian_filter
-        
-        if operation == "dilate":
-            if mask.dim() == 3:
-                result = []
-                for m in mask:
-                    dilated = binary_dilation(m.numpy(), iterations=strength)
-                    result.append(torch.from_numpy(dilated.astype(np.float32)))
-                return (torch.stack(result),)
-            else:
-                dilated = binary_dilation(mask.numpy(), iterations=strength)
-                return (torch.from_numpy(dilated.astype(np.float32)),)
+    def edit_mask(self, mask, operation, strength, temporal_radius=0):
+        if mask_plane(mask) is not None:
+            # Same mask on every frame: edit the shared plane once
+            return (map_mask_planes(lambda plane: self.edit_mask(plane, operation, strength, temporal_radius)[0], mask),)
         
-        elif operation == "erode":
-            if mask.dim() == 3:
-                result = []
-                for m in mask:
-                    eroded = binary_erosion(m.numpy(), iterations=strength)
-                    result.append(torch.from_numpy(eroded.astype(np.float32)))
-                return (torch.stack(result),)
-            else:
-                eroded = binary_erosion(mask.numpy(), iterations=strength)
-                return (torch.from_numpy(eroded.astype(np.float32)),)
+        if operation in MORPHOLOGY_OPERATIONS:
+            # Square window of radius strength; cost barely depends on the radius
+            return (morphology(mask, operation, strength, temporal_radius),)
         
         elif operation == "smooth":
-            if mask.dim() == 3:
-                result = []
-                for m in mask:
-                    smoothed = gaussian_filter(m.numpy(), sigma=strength)
-                    result.append(torch.from_numpy(smoothed))
-                return (torch.stack(result),)
-            else:
-                smoothed = gaussian_filter(mask.numpy(), sigma=strength)
-                return (torch.from_numpy(smoothed),)
+            # Batched separable blur, one pass over all frames
+            return (gaussian_blur(mask, strength),)
         
         elif operation == "invert":
             return (1.0 - mask,)
@@ -69,6 +70,38 @@ class AdvancedMaskEditor:
         return (mask,)
 
 
+class PackedMaskEditor:
+    """
+    Morphology and invert on packed masks (smooth them with Unpack Masks feather)
+    """
+    
+    @classmethod
+    def INPUT_TYPES(cls):
+        return {
+            "required": {
+                "packed_masks": ("PACKED_MASK",),
+                "operation": (MORPHOLOGY_OPERATIONS + ["invert"], {"default": "dilate"}),
+                "strength": ("INT", {"default": 3, "min": 1, "max": 20}),
+            },
+            "optional": {
+                "temporal_radius": ("INT", {"default": 0, "min": 0, "max": 10}),
+            },
+        }
+    
+    RETURN_TYPES = ("PACKED_MASK",)
+    RETURN_NAMES = ("packed_masks",)
+    FUNCTION = "edit_mask"
+    CATEGORY = "GifInpaint/Advanced"
+    
+    def edit_mask(self, packed_masks, operation, strength, temporal_radius=0):
+        if operation == "invert":
+            return (~packed_masks,)
+        # Unpacked a chunk at a time; open/close reach 2 * temporal_radius frames
+        halo = temporal_radius * (2 if operation in ("open", "close") else 1)
+        return (map_packed(lambda chunk: morphology(chunk, operation, strength, temporal_radius),
+                           packed_masks, halo),)
+
+
 class MotionMaskGenerator:
     """
     Generate masks based on motion detection between frames
@@ -82,35 +115,133 @@ class MotionMaskGenerator:
                 "threshold": ("FLOAT", {"default": 0.1, "min": 0.0, "max": 1.0, "step": 0.01}),
                 "blur": ("INT", {"default": 5, "min": 0, "max": 20}),
             },
+            "optional": {
+                # frame_difference: change to the next frame; background_*: difference to a
+                # running background estimate (catches slow and stopped objects)
+                "method": (["frame_difference"] + [f"background_{m}" for m in BACKGROUND_METHODS],
+                           {"default": "frame_difference"}),
+                "rate": ("FLOAT", {"default": 0.02, "min": 0.001, "max": 0.5, "step": 0.001}),
+            },
         }
     
     RETURN_TYPES = ("MASK",)
     FUNCTION = "detect_motion"
     CATEGORY = "GifInpaint/Advanced"
     
-    def detect_motion(self, frames, threshold, blur):
-        from scipy.ndimage import gaussian_filter
-        
-        masks = []
-        
-        for i in range(len(frames) - 1):
-            # Calculate frame difference
-            diff = torch.abs(frames[i + 1] - frames[i])
-            motion = torch.mean(diff, dim=2)  # Average across channels
-            
-            # Apply blur
-            if blur > 0:
-                motion_np = gaussian_filter(motion.numpy(), sigma=blur)
-                motion = torch.from_numpy(motion_np)
-            
-            # Threshold
-            mask = (motion > threshold).float()
-            masks.append(mask)
+    def detect_motion(self, frames, threshold, blur, method="frame_difference", rate=0.02):
+        # For threshold tuning, Motion Energy → Motion Threshold computes the energy only once
+        energy = MotionEnergy().compute(frames, blur, method, rate)[0]
+        return ((energy > threshold).float(),)
+
+
+class PackedMotionMaskGenerator(MotionMaskGenerator):
+    """
+    Generate motion masks at one bit per pixel, chunk by chunk
+    """
+    
+    RETURN_TYPES = ("PACKED_MASK",)
+    RETURN_NAMES = ("packed_masks",)
+    FUNCTION = "detect_packed_motion"
+    CATEGORY = "GifInpaint/Advanced"
+    
+    def detect_packed_motion(self, frames, threshold, blur, method="frame_difference", rate=0.02):
+        # Packed chunk by chunk, never holding the float energy of the whole clip
+        if method == "frame_difference":
+            # A chunk needs the frame after it
+            return (pack_frames(lambda chunk: motion_mask(chunk, threshold, blur), frames, halo=1),)
+        # Chunks arrive in order: the model learns from each one
+        model = BackgroundModel(method[len("background_"):], rate, threshold, blur)
+        return (pack_frames(model.apply, frames),)
+
+
+class MotionEnergy:
+    """
+    Motion energy volume for threshold tuning with Motion Threshold
+    
+    ComfyUI keeps this node's output while its inputs are unchanged, so only
+    Motion Threshold reruns when a threshold is edited.
+    """
+    
+    @classmethod
+    def INPUT_TYPES(cls):
+        return {
+            "required": {
+                "frames": ("IMAGE",),
+                "blur": ("INT", {"default": 5, "min": 0, "max": 20}),
+            },
+            "optional": {
+                "method": (["frame_difference"] + [f"background_{m}" for m in BACKGROUND_METHODS],
+                           {"default": "frame_difference"}),
+                "rate": ("FLOAT", {"default": 0.02, "min": 0.001, "max": 0.5, "step": 0.001}),
+            },
+        }
+    
+    RETURN_TYPES = ("MOTION_ENERGY",)
+    RETURN_NAMES = ("energy",)
+    FUNCTION = "compute"
+    CATEGORY = "GifInpaint/Advanced"
+    
+    def compute(self, frames, blur, method="frame_difference", rate=0.02):
+        if method == "frame_difference":
+            energy = motion_energy(frames, blur)
+        else:
+            model = BackgroundModel(method[len("background_"):], rate, blur=blur)
+            energy = torch.cat([model.energy(frames[start:start + CHUNK_FRAMES])
+                                for start in range(0, len(frames), CHUNK_FRAMES)])
+        return (energy,)
+
+
+class MotionThreshold:
+    """
+    Threshold a motion energy volume, optionally at several levels for comparison
+    """
+    
+    @classmethod
+    def INPUT_TYPES(cls):
+        return {
+            "required": {
+                "energy": ("MOTION_ENERGY",),
+                # One or more levels, e.g. "0.05, 0.1, 0.2"; masks use the first
+                "thresholds": ("STRING", {"default": "0.1"}),
+            },
+            "optional": {
+                # Hysteresis: also keep pixels above low connected to pixels above the threshold (0 = off)
+                "low": ("FLOAT", {"default": 0.0, "min": 0.0, "max": 1.0, "step": 0.01}),
+                "preview_frame": ("INT", {"default": 0, "min": 0, "max": 10000}),
+            },
+        }
+    
+    RETURN_TYPES = ("MASK", "MASK")
+    RETURN_NAMES = ("masks", "candidates")
+    FUNCTION = "threshold"
+    CATEGORY = "GifInpaint/Advanced"
+    
+    def threshold(self, energy, thresholds, low=0.0, preview_frame=0):
+        levels = self.parse_thresholds(thresholds)
         
-        # Add last frame (copy of previous)
-        masks.append(masks[-1] if masks else torch.zeros(frames.shape[1:3]))
+        # One candidate per level for the preview frame, as a batch for side-by-side preview
+        frame = energy[min(preview_frame, len(energy) - 1)][None]
+        candidates = torch.cat([self.apply_threshold(frame, level, low) for level in levels]).float()
         
-        return (torch.stack(masks),)
+        masks = self.apply_threshold(energy, levels[0], low).float()
+        return (masks, candidates)
+    
+    @staticmethod
+    def apply_threshold(energy, level, low=0.0):
+        """Bool masks: energy above level, grown through pixels above low when 0 < low < level"""
+        if 0 < low < level:
+            return hysteresis_threshold(energy, low, level)
+        return energy > level
+    
+    @staticmethod
+    def parse_thresholds(text) -> List[float]:
+        try:
+            levels = [float(value) for value in re.split(r"[,\s]+", text.strip()) if value]
+        except ValueError:
+            raise ValueError(f"Thresholds must be numbers separated by commas: {text!r}")
+        if not levels:
+            raise ValueError("At least one threshold is required")
+        return levels
 
 
 class ColorRangeMaskGenerator:
@@ -136,24 +267,13 @@ class ColorRangeMaskGenerator:
     CATEGORY = "GifInpaint/Advanced"
     
     def color_mask(self, frames, red, green, blue, tolerance, feather):
-        from scipy.ndimage import gaussian_filter
-        
-        target = torch.tensor([red, green, blue]).reshape(1, 1, 1, 3)
+        # Colour distance and feathering both run over the whole batch
+        masks = color_distance_mask(frames, (red, green, blue), tolerance)
         
-        masks = []
-        for frame in frames:
-            # Calculate color distance
-            distance = torch.sqrt(torch.sum((frame - target) ** 2, dim=2))
-            mask = (distance < tolerance).float()
-            
-            # Apply feathering
-            if feather > 0:
-                mask_np = gaussian_filter(mask.numpy(), sigma=feather)
-                mask = torch.from_numpy(mask_np)
-            
-            masks.append(mask)
+        if feather > 0:
+            masks = gaussian_blur(masks, feather)
         
-        return (torch.stack(masks),)
+        return (masks,)
 
 
 class MaskCombiner:
@@ -177,6 +297,11 @@ class MaskCombiner:
     CATEGORY = "GifInpaint/Advanced"
     
     def combine(self, mask1, mask2, operation):
+        # Static masks are combined as single planes
+        return (map_mask_planes(lambda a, b: self.combine_planes(a, b, operation), mask1, mask2),)
+    
+    @staticmethod
+    def combine_planes(mask1, mask2, operation):
         if operation == "union":
             result = torch.maximum(mask1, mask2)
         elif operation == "intersection":
@@ -190,6 +315,188 @@ class MaskCombiner:
         else:
             result = mask1
         
+        return result
+
+
+class PackedMaskCombiner:
+    """
+    Boolean algebra on packed masks, word by word
+    """
+    
+    OPERATIONS = {
+        "union": lambda a, b: a | b,
+        "intersection": lambda a, b: a & b,
+        "difference": lambda a, b: a - b,
+        "xor": lambda a, b: a ^ b,
+    }
+    
+    @classmethod
+    def INPUT_TYPES(cls):
+        return {
+            "required": {
+                "packed_masks1": ("PACKED_MASK",),
+                "packed_masks2": ("PACKED_MASK",),
+                "operation": (list(cls.OPERATIONS), {"default": "union"}),
+            },
+        }
+    
+    RETURN_TYPES = ("PACKED_MASK",)
+    RETURN_NAMES = ("packed_masks",)
+    FUNCTION = "combine"
+    CATEGORY = "GifInpaint/Advanced"
+    
+    def combine(self, packed_masks1, packed_masks2, operation):
+        return (self.OPERATIONS[operation](packed_masks1, packed_masks2),)
+
+
+class MaskTracker:
+    """
+    Propagate a mask painted on one keyframe to every frame by tracking its content
+    """
+    
+    @classmethod
+    def INPUT_TYPES(cls):
+        return {
+            "required": {
+                "frames": ("IMAGE",),
+                "mask": ("MASK",),
+                "keyframe": ("INT", {"default": 0, "min": 0, "max": 10000}),
+                # Largest movement away from the keyframe position, in pixels
+                "search_radius": ("INT", {"default": 32, "min": 1, "max": 256}),
+                # Block matching grid over the mask (1 = move the whole mask together)
+                "blocks": ("INT", {"default": 1, "min": 1, "max": 8}),
+            },
+        }
+    
+    RETURN_TYPES = ("MASK", "STRING")
+    RETURN_NAMES = ("masks", "info")
+    FUNCTION = "track"
+    CATEGORY = "GifInpaint/Advanced"
+    
+    def track(self, frames, mask, keyframe=0, search_radius=32, blocks=1):
+        keyframe = min(keyframe, len(frames) - 1)
+        # A per-frame mask batch is read at the keyframe
+        if mask.dim() == 3:
+            mask = mask[keyframe] if mask.shape[0] > 1 else mask[0]
+        if mask.shape != frames.shape[1:3]:
+            raise ValueError(f"Mask {tuple(mask.shape)} does not match frames {tuple(frames.shape[1:3])}")
+        
+        masks, shifts = track_mask(frames, mask.float(), keyframe, search_radius, blocks)
+        info = "Empty mask: nothing to track"
+        if shifts.numel():
+            info = (f"Tracked {shifts.shape[1]} region(s): shifts up to {int(shifts[..., 0].abs().max())}px "
+                    f"vertical, {int(shifts[..., 1].abs().max())}px horizontal")
+        
+        return (masks, info)
+
+
+class StabilizeFrames:
+    """
+    Cancel camera motion so a static mask and crop fit every frame
+    """
+    
+    @classmethod
+    def INPUT_TYPES(cls):
+        return {
+            "required": {
+                "frames": ("IMAGE",),
+                # similarity also follows rotation and zoom
+                "motion": (STABILIZE_MOTIONS, {"default": "translation"}),
+                "reference_frame": ("INT", {"default": 0, "min": 0, "max": 10000}),
+                # 0 locks every frame to the reference; otherwise only shake (deviation from
+                # the camera path smoothed over this many frames) is removed
+                "smoothing": ("FLOAT", {"default": 0.0, "min": 0.0, "max": 100.0, "step": 0.5}),
+            },
+        }
+    
+    RETURN_TYPES = ("IMAGE", "FRAME_TRANSFORMS", "STRING")
+    RETURN_NAMES = ("frames", "transforms", "info")
+    FUNCTION = "stabilize"
+    CATEGORY = "GifInpaint/Advanced"
+    
+    def stabilize(self, frames, motion="translation", reference_frame=0, smoothing=0.0):
+        batch_size, height, width = frames.shape[:3]
+        reference_frame = min(reference_frame, batch_size - 1)
+        path = estimate_camera_path(frames, motion)
+        matrices = stabilizing_transforms(path, reference_frame, smoothing)
+        stabilized = warp_frames(frames, matrices)
+        
+        parameters = similarity_parameters(matrices)
+        info = (f"Stabilized {batch_size} frames ({motion}): up to {float(parameters[:, 2:].abs().max()):.1f}px, "
+                f"{float(parameters[:, 0].abs().max().rad2deg()):.1f} degrees")
+        
+        transforms = {
+            "matrices": matrices.tolist(),
+            "width": width,
+            "height": height,
+        }
+        return (stabilized, transforms, info)
+
+
+class UnstabilizeFrames:
+    """
+    Undo Stabilize Frames after inpainting, optionally blending onto the original frames
+    """
+    
+    @classmethod
+    def INPUT_TYPES(cls):
+        return {
+            "required": {
+                "frames": ("IMAGE",),
+                "transforms": ("FRAME_TRANSFORMS",),
+            },
+            "optional": {
+                # Without originals, pixels the stabilized frames did not cover stay black
+                "original_frames": ("IMAGE",),
+                # Stabilized-space masks: only the masked area replaces the originals
+                "masks": ("MASK",),
+                "feather": ("INT", {"default": 8, "min": 0, "max": 128}),
+            },
+        }
+    
+    RETURN_TYPES = ("IMAGE",)
+    FUNCTION = "unstabilize"
+    CATEGORY = "GifInpaint/Advanced"
+    
+    def unstabilize(self, frames, transforms, original_frames=None, masks=None, feather=8):
+        matrices = torch.tensor(transforms["matrices"], dtype=torch.float64)
+        width, height = transforms["width"], transforms["height"]
+        if frames.shape[0] != len(matrices):
+            raise ValueError(f"Transforms have {len(matrices)} frames, got {frames.shape[0]}")
+        # VAE round trips can trim sizes that are not multiples of 8
+        if frames.shape[1:3] != (height, width):
+            frames = resize_frames(frames, (width, height))
+        
+        inverse = torch.linalg.inv(matrices)
+        if original_frames is None:
+            return (warp_frames(frames, inverse),)
+        if original_frames.shape[:3] != (len(matrices), height, width):
+            raise ValueError(f"Original frames {tuple(original_frames.shape[:3])} do not match "
+                             f"the transforms {(len(matrices), height, width)}")
+        if masks is not None:
+            if masks.dim() == 2 or masks.shape[0] == 1:
+                masks = static_mask(masks.reshape(masks.shape[-2:]), len(matrices))
+            if masks.shape != (len(matrices), height, width):
+                raise ValueError(f"Masks {tuple(masks.shape)} do not match the transforms "
+                                 f"{(len(matrices), height, width)}")
+        
+        # Blend chunk by chunk in float; the originals keep their transport dtype
+        result = original_frames.clone()
+        for start in range(0, len(matrices), CHUNK_FRAMES):
+            end = min(start + CHUNK_FRAMES, len(matrices))
+            restored = to_float_frames(warp_frames(frames[start:end], inverse[start:end]))
+            # Only pixels the stabilized frames actually cover are replaced
+            alpha = coverage_masks(inverse[start:end], height, width)
+            if masks is not None:
+                chunk_masks = masks[start:end]
+                # Grow by the feather width, then blur within it, as Paste Crop does
+                if feather > 0:
+                    chunk_masks = gaussian_blur(max_filter(chunk_masks.float(), feather), feather / 4)
+                alpha = torch.minimum(alpha, warp_frames(chunk_masks.clamp(0, 1), inverse[start:end]))
+            original = to_float_frames(original_frames[start:end])
+            blended = original + (restored - original) * alpha[..., None]
+            result[start:end] = to_frame_dtype(blended, original_frames.dtype)
+        
         return (result,)
 
 
@@ -212,6 +519,7 @@ class TemporalSmoother:
     FUNCTION = "smooth"
     CATEGORY = "GifInpaint/Advanced"
     
+    @float_frames_input("frames")
     def smooth(self, frames, window_size, strength):
         if window_size % 2 == 0:
             window_size += 1
@@ -234,6 +542,70 @@ class TemporalSmoother:
         return (torch.stack(smoothed),)
 
 
+class StreamTemporalSmoother(TemporalSmoother):
+    """
+    Apply temporal smoothing to a GIF stream window by window
+    """
+    
+    @classmethod
+    def INPUT_TYPES(cls):
+        input_types = TemporalSmoother.INPUT_TYPES()
+        input_types["required"] = {"frame_stream": ("GIF_STREAM",), **{
+            k: v for k, v in input_types["required"].items() if k != "frames"
+        }}
+        return input_types
+    
+    RETURN_TYPES = ("GIF_STREAM",)
+    RETURN_NAMES = ("frame_stream",)
+    FUNCTION = "smooth_stream"
+    CATEGORY = "GifInpaint/Stream"
+    
+    def smooth_stream(self, frame_stream, window_size, strength):
+        if window_size % 2 == 0:
+            window_size += 1
+        
+        # Each window carries half_window neighbours on both sides so the
+        # result matches smoothing the whole clip at once
+        return (frame_stream.map(
+            lambda window, start: self.smooth(window, window_size, strength)[0],
+            context=window_size // 2,
+        ),)
+
+
+class StreamBackgroundMask:
+    """
+    Foreground masks from a running background model, window by window
+    """
+    
+    @classmethod
+    def INPUT_TYPES(cls):
+        return {
+            "required": {
+                "frame_stream": ("GIF_STREAM",),
+                "method": (BACKGROUND_METHODS, {"default": "median"}),
+                "threshold": ("FLOAT", {"default": 0.1, "min": 0.0, "max": 1.0, "step": 0.01}),
+                "blur": ("INT", {"default": 5, "min": 0, "max": 20}),
+                "rate": ("FLOAT", {"default": 0.02, "min": 0.001, "max": 0.5, "step": 0.001}),
+            },
+        }
+    
+    RETURN_TYPES = ("MASK_STREAM",)
+    RETURN_NAMES = ("mask_stream",)
+    FUNCTION = "background_stream"
+    CATEGORY = "GifInpaint/Stream"
+    
+    def background_stream(self, frame_stream, method, threshold, blur, rate):
+        model = BackgroundModel(method, rate, threshold, blur)
+        
+        def mask_window(window, start):
+            # Windows arrive in order; every pass over the stream starts a fresh model
+            if start == 0:
+                model.reset()
+            return model.apply(window)
+        
+        return (frame_stream.map(mask_window),)
+
+
 class BatchFrameResizer:
     """
     Resize all frames in batch
@@ -256,21 +628,8 @@ class BatchFrameResizer:
     CATEGORY = "GifInpaint/Advanced"
     
     def resize(self, frames, width, height, method):
-        import torch.nn.functional as F
-        
-        # Convert to [B, C, H, W]
-        frames_transposed = frames.permute(0, 3, 1, 2)
-        
-        # Resize
-        resized = F.interpolate(
-            frames_transposed,
-            size=(height, width),
-            mode=method,
-            align_corners=False if method != 'nearest' else None
-        )
-        
-        # Convert back to [B, H, W, C]
-        result = resized.permute(0, 2, 3, 1)
+        # Output keeps the input's dtype (uint8 frames stay uint8)
+        result = resize_frames(frames, (width, height), method)
         
         return (result, width, height)
 
@@ -279,17 +638,37 @@ class BatchFrameResizer:
 ADVANCED_NODE_CLASS_MAPPINGS = {
     "AdvancedMaskEditor": AdvancedMaskEditor,
     "MotionMaskGenerator": MotionMaskGenerator,
+    "MotionEnergy": MotionEnergy,
+    "MotionThreshold": MotionThreshold,
     "ColorRangeMaskGenerator": ColorRangeMaskGenerator,
     "MaskCombiner": MaskCombiner,
+    "PackedMaskEditor": PackedMaskEditor,
+    "PackedMaskCombiner": PackedMaskCombiner,
+    "PackedMotionMaskGenerator": PackedMotionMaskGenerator,
+    "MaskTracker": MaskTracker,
+    "StabilizeFrames": StabilizeFrames,
+    "UnstabilizeFrames": UnstabilizeFrames,
     "TemporalSmoother": TemporalSmoother,
+    "StreamTemporalSmoother": StreamTemporalSmoother,
+    "StreamBackgroundMask": StreamBackgroundMask,
     "BatchFrameResizer": BatchFrameResizer,
 }
 
 ADVANCED_NODE_DISPLAY_NAME_MAPPINGS = {
     "AdvancedMaskEditor": "Advanced Mask Editor ✏️",
     "MotionMaskGenerator": "Motion Mask Generator 🎯",
+    "MotionEnergy": "Motion Energy 🎯",
+    "MotionThreshold": "Motion Threshold 🎚️",
     "ColorRangeMaskGenerator": "Color Range Mask 🎨",
     "MaskCombiner": "Mask Combiner ➕",
+    "PackedMaskEditor": "Packed Mask Editor 🗜️",
+    "PackedMaskCombiner": "Packed Mask Combiner 🗜️",
+    "PackedMotionMaskGenerator": "Packed Motion Mask Generator 🗜️",
+    "MaskTracker": "Mask Tracker 🧭",
+    "StabilizeFrames": "Stabilize Frames 📌",
+    "UnstabilizeFrames": "Unstabilize Frames 📌",
     "TemporalSmoother": "Temporal Smoother 📊",
+    "StreamTemporalSmoother": "Stream Temporal Smoother 📊",
+    "StreamBackgroundMask": "Stream Background Mask 🎯",
     "BatchFrameResizer": "Batch Frame Resizer 📐",
 }
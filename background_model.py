@@ -0,0 +1,80 @@
+"""
+Streaming background model for GIF Inpainter Studio
+Keeps a per-pixel background estimate that is updated frame by frame, so
+foreground masks can be produced window by window for clips of any length
+"""
+
+import torch
+from typing import Optional
+
+try:
+    from .batch_filters import gaussian_blur
+    from .utils import to_float_frames
+except ImportError:
+    from batch_filters import gaussian_blur
+    from utils import to_float_frames
+
+BACKGROUND_METHODS = ["median", "mean"]
+
+
+class BackgroundModel:
+    """
+    Per-pixel background estimate [H, W, C] for foreground masking.
+
+    "median" is a running median estimate: each frame moves every pixel of
+    the background one `rate` step towards it, so the estimate settles on the
+    per-pixel median and ignores short-lived objects. "mean" is an
+    exponential moving average with weight `rate`. The model starts from the
+    median of the first window it sees, and only the current estimate is
+    kept, so memory does not grow with the clip length.
+    """
+
+    def __init__(self, method: str = "median", rate: float = 0.02, threshold: float = 0.1, blur: float = 0):
+        if method not in BACKGROUND_METHODS:
+            raise ValueError(f"Unknown background method: {method}")
+        self.method = method
+        self.rate = rate
+        self.threshold = threshold
+        self.blur = blur
+        self.background: Optional[torch.Tensor] = None
+
+    def reset(self):
+        self.background = None
+
+    def apply(self, window: torch.Tensor) -> torch.Tensor:
+        """
+        Foreground masks for the next window of frames, then learn from them
+
+        Args:
+            window: Frames [B, H, W, C] following the previous window, any transport dtype
+
+        Returns:
+            Float masks [B, H, W]: 1 where energy() exceeds the threshold
+        """
+        return (self.energy(window) > self.threshold).float()
+
+    def energy(self, window: torch.Tensor) -> torch.Tensor:
+        """
+        Foreground energy for the next window of frames, then learn from them
+
+        Returns:
+            Float [B, H, W]: blurred mean channel difference to the background
+            as it was before each frame
+        """
+        frames = to_float_frames(window)
+        if self.background is None:
+            self.background = frames.median(dim=0).values
+
+        differences = torch.empty(frames.shape[:3], device=frames.device)
+        for i, frame in enumerate(frames):
+            delta = frame - self.background
+            differences[i] = delta.abs().mean(dim=-1)
+            # Per-frame update: each frame is compared with what came before it
+            if self.method == "median":
+                self.background += self.rate * delta.sign_()
+            else:
+                self.background += self.rate * delta
+
+        if self.blur > 0:
+            differences = gaussian_blur(differences, self.blur)
+        return differences
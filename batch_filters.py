@@ -0,0 +1,429 @@
+"""
+Batched image filters for GIF Inpainter Studio
+Whole-batch torch implementations of the filters behind the mask nodes, so a
+clip is filtered with a few tensor operations instead of per-frame scipy calls
+"""
+
+import torch
+import torch.nn.functional as F
+from typing import Tuple
+
+try:
+    from .utils import map_mask_planes, mask_plane
+except ImportError:
+    from utils import map_mask_planes, mask_plane
+
+# Frames filtered per step; bounds the float32 working set for long clips
+CHUNK_FRAMES = 16
+
+# Gaussian kernels wider than this radius are applied by FFT instead of convolution
+FFT_RADIUS = 128
+
+# Rec. 601 luma weights
+LUMA_WEIGHTS = (0.299, 0.587, 0.114)
+
+
+def luminance(frames: torch.Tensor) -> torch.Tensor:
+    """Float luminance [B, H, W] in [0, 1] of frames [B, H, W, C] in any transport dtype"""
+    weights = torch.tensor(LUMA_WEIGHTS, dtype=torch.float32, device=frames.device)
+    if frames.dtype == torch.uint8:
+        # Fold the 1/255 scale into the weights instead of converting the frames first
+        weights /= 255.0
+    return frames[..., :3].float() @ weights
+
+
+def color_distance_mask(frames: torch.Tensor, color: Tuple[float, float, float], tolerance: float,
+                        chunk_frames: int = CHUNK_FRAMES) -> torch.Tensor:
+    """
+    Colour key: 1 where a pixel is within tolerance of color
+
+    Args:
+        frames: Frame batch [B, H, W, C], any transport dtype
+        color: RGB key colour in [0, 1]
+        tolerance: Euclidean RGB distance in [0, 1] units
+        chunk_frames: Frames converted to float at once
+
+    Returns:
+        Float masks [B, H, W]
+    """
+    # uint8 frames are compared on the 0-255 scale, without normalizing them
+    scale = 255.0 if frames.dtype == torch.uint8 else 1.0
+    target = torch.tensor(color, dtype=torch.float32, device=frames.device) * scale
+    limit = (tolerance * scale) ** 2
+
+    masks = torch.empty(frames.shape[:3], device=frames.device)
+    for start in range(0, frames.shape[0], chunk_frames):
+        chunk = frames[start:start + chunk_frames, ..., :3].float()
+        # Squared distance against squared tolerance avoids a sqrt per pixel
+        distance = (chunk - target).square_().sum(dim=-1)
+        masks[start:start + chunk_frames] = distance < limit
+    return masks
+
+
+def sobel_magnitude(gray: torch.Tensor) -> torch.Tensor:
+    """
+    Sobel gradient magnitude of a [B, H, W] batch, in one conv2d
+
+    Frames are laid out as channels of a single image and filtered with a
+    grouped (depthwise) convolution, which is much faster than a batch of
+    one-channel images. The result is scaled so a full black-to-white step
+    edge has magnitude 1.
+    """
+    batch = gray.shape[0]
+    gx = torch.tensor([[-1.0, 0.0, 1.0], [-2.0, 0.0, 2.0], [-1.0, 0.0, 1.0]], device=gray.device) / 4.0
+    kernels = torch.stack([gx, gx.t()])[:, None].repeat(batch, 1, 1, 1)
+
+    padded = F.pad(gray[None], (1, 1, 1, 1), mode="replicate")
+    gradients = F.conv2d(padded, kernels, groups=batch)[0]
+    return gradients[0::2].square().add_(gradients[1::2].square()).sqrt_()
+
+
+def dilate3(masks: torch.Tensor) -> torch.Tensor:
+    """8-connected 3x3 dilation of a bool [B, H, W] batch, as shifted ORs"""
+    rows = masks.clone()
+    rows[:, :, 1:] |= masks[:, :, :-1]
+    rows[:, :, :-1] |= masks[:, :, 1:]
+    result = rows.clone()
+    result[:, 1:] |= rows[:, :-1]
+    result[:, :-1] |= rows[:, 1:]
+    return result
+
+
+def hysteresis_threshold(magnitude: torch.Tensor, low: float, high: float) -> torch.Tensor:
+    """
+    Keep pixels above high, plus pixels above low connected to them
+
+    Strong pixels are grown through the weak ones with 8-connected 3x3
+    dilations over the whole batch until nothing changes.
+
+    Returns:
+        Bool masks [B, H, W]
+    """
+    weak = magnitude >= low
+    edges = magnitude >= high
+    while True:
+        grown = dilate3(edges).logical_and_(weak)
+        if torch.equal(grown, edges):
+            return edges
+        edges = grown
+
+
+def edge_mask(frames: torch.Tensor, low: float = 0.1, high: float = 0.3,
+              chunk_frames: int = CHUNK_FRAMES) -> torch.Tensor:
+    """
+    Edge masks: Sobel magnitude of the luminance with hysteresis thresholds
+
+    Args:
+        frames: Frame batch [B, H, W, C], any transport dtype
+        low: Weak edge threshold (magnitude of a full step edge is 1)
+        high: Strong edge threshold
+        chunk_frames: Frames filtered at once
+
+    Returns:
+        Float masks [B, H, W]
+    """
+    masks = torch.empty(frames.shape[:3], device=frames.device)
+    for start in range(0, frames.shape[0], chunk_frames):
+        magnitude = sobel_magnitude(luminance(frames[start:start + chunk_frames]))
+        masks[start:start + chunk_frames] = hysteresis_threshold(magnitude, low, max(low, high))
+    return masks
+
+
+def gaussian_kernel1d(sigma: float, truncate: float = 4.0) -> torch.Tensor:
+    """Normalized 1-D Gaussian kernel with scipy's radius, int(truncate * sigma + 0.5)"""
+    radius = int(truncate * sigma + 0.5)
+    x = torch.arange(-radius, radius + 1, dtype=torch.float64)
+    kernel = torch.exp(-0.5 * (x / sigma) ** 2)
+    return (kernel / kernel.sum()).float()
+
+
+def reflect_indices(size: int, radius: int, device=None) -> torch.Tensor:
+    """
+    Source indices for padding an axis by radius on both sides
+
+    Uses scipy's "reflect" mode (d c b a | a b c d | d c b a), repeating for
+    radii longer than the axis.
+    """
+    indices = torch.arange(-radius, size + radius, device=device) % (2 * size)
+    return torch.where(indices >= size, 2 * size - 1 - indices, indices)
+
+
+def _blur_convolution(chunk: torch.Tensor, kernel: torch.Tensor) -> torch.Tensor:
+    """Separable blur of [B, H, W] as two grouped conv2d passes (frames as channels)"""
+    batch, height, width = chunk.shape
+    size = len(kernel)
+    radius = size // 2
+
+    padded = chunk.index_select(2, reflect_indices(width, radius, chunk.device))
+    rows = F.conv2d(padded[None], kernel.view(1, 1, 1, size).expand(batch, 1, 1, size), groups=batch)[0]
+    padded = rows.index_select(1, reflect_indices(height, radius, chunk.device))
+    return F.conv2d(padded[None], kernel.view(1, 1, size, 1).expand(batch, 1, size, 1), groups=batch)[0]
+
+
+def _blur_fft(chunk: torch.Tensor, kernel: torch.Tensor) -> torch.Tensor:
+    """Separable blur of [B, H, W] as one FFT product over the reflect-padded frames"""
+    _, height, width = chunk.shape
+    radius = len(kernel) // 2
+    padded = chunk.index_select(1, reflect_indices(height, radius, chunk.device))
+    padded = padded.index_select(2, reflect_indices(width, radius, chunk.device))
+    padded_height, padded_width = padded.shape[1:]
+
+    def transfer(length, rfft):
+        # Kernel centred on index 0, wrapping around; the padding keeps the wrap out of the crop
+        taps = torch.zeros(length, device=chunk.device)
+        taps[:radius + 1] = kernel[radius:]
+        taps[length - radius:] = kernel[:radius]
+        return torch.fft.rfft(taps) if rfft else torch.fft.fft(taps)
+
+    spectrum = torch.fft.rfft2(padded)
+    spectrum *= transfer(padded_height, False)[:, None] * transfer(padded_width, True)[None, :]
+    blurred = torch.fft.irfft2(spectrum, s=(padded_height, padded_width))
+    return blurred[:, radius:radius + height, radius:radius + width]
+
+
+def gaussian_blur(masks: torch.Tensor, sigma: float, truncate: float = 4.0,
+                  chunk_frames: int = CHUNK_FRAMES) -> torch.Tensor:
+    """
+    Gaussian blur of every frame of a mask batch
+
+    Matches scipy.ndimage.gaussian_filter (mode "reflect") on each [H, W]
+    frame, to float32 precision. Small kernels run as separable grouped
+    convolutions, kernels wider than FFT_RADIUS as an FFT product. Static
+    masks are blurred once.
+
+    Args:
+        masks: Masks [B, H, W] or a single mask [H, W]
+        sigma: Standard deviation in pixels (<= 0 returns the input as float)
+        truncate: Kernel radius in standard deviations
+        chunk_frames: Frames filtered at once
+
+    Returns:
+        Float masks with the input's shape
+    """
+    if sigma <= 0:
+        return masks.float()
+    if mask_plane(masks) is not None:
+        return map_mask_planes(lambda plane: gaussian_blur(plane, sigma, truncate), masks)
+
+    single = masks.dim() == 2
+    batch = masks[None] if single else masks
+
+    kernel = gaussian_kernel1d(sigma, truncate).to(masks.device)
+    blur = _blur_fft if len(kernel) // 2 > FFT_RADIUS else _blur_convolution
+
+    result = torch.empty(batch.shape, device=masks.device)
+    for start in range(0, batch.shape[0], chunk_frames):
+        result[start:start + chunk_frames] = blur(batch[start:start + chunk_frames].float(), kernel)
+
+    return result[0] if single else result
+
+
+MORPHOLOGY_OPERATIONS = ["dilate", "erode", "open", "close"]
+
+
+def running_max(x: torch.Tensor, size: int, dim: int) -> torch.Tensor:
+    """
+    Maximum over a centred window of size (odd) along one dimension
+
+    Windows are built by doubling (max of two shifted windows of width w is a
+    window of width 2w), so the cost grows with log(size), not size. Values
+    outside the tensor are ignored.
+    """
+    if size <= 1:
+        return x
+    length = x.shape[dim]
+    radius = size // 2
+    pad = [0, 0] * (x.dim() - 1 - dim) + [radius, radius]
+    window = F.pad(x, pad, value=float("-inf"))
+
+    width = 1
+    while width * 2 <= size:
+        span = window.shape[dim] - width
+        window = torch.maximum(window.narrow(dim, 0, span), window.narrow(dim, width, span))
+        width *= 2
+    rest = size - width
+    if rest:
+        span = window.shape[dim] - rest
+        window = torch.maximum(window.narrow(dim, 0, span), window.narrow(dim, rest, span))
+    return window.narrow(dim, 0, length)
+
+
+def max_filter(masks: torch.Tensor, radius: int, temporal_radius: int = 0,
+               chunk_frames: int = CHUNK_FRAMES) -> torch.Tensor:
+    """
+    Grey dilation of a mask batch with a square (2r+1)^2 window
+
+    Args:
+        masks: Masks [B, H, W] or [H, W]
+        radius: Spatial radius in pixels
+        temporal_radius: Also take the maximum over this many frames on each side
+        chunk_frames: Frames filtered at once in the spatial pass
+
+    Returns:
+        Float masks with the input's shape
+    """
+    if mask_plane(masks) is not None:
+        # Identical frames: the temporal window changes nothing
+        return map_mask_planes(lambda plane: max_filter(plane, radius), masks)
+
+    single = masks.dim() == 2
+    batch = masks[None].float() if single else masks.float()
+
+    size = 2 * radius + 1
+    result = torch.empty(batch.shape, device=masks.device)
+    for start in range(0, batch.shape[0], chunk_frames):
+        chunk = running_max(batch[start:start + chunk_frames], size, 2)
+        result[start:start + chunk_frames] = running_max(chunk, size, 1)
+
+    if temporal_radius > 0 and not single:
+        # Row bands keep the padded temporal copies small
+        rows = max(1, chunk_frames * batch.shape[1] // max(1, batch.shape[0]))
+        for top in range(0, batch.shape[1], rows):
+            band = result[:, top:top + rows]
+            result[:, top:top + rows] = running_max(band, 2 * temporal_radius + 1, 0)
+
+    return result[0] if single else result
+
+
+def min_filter(masks: torch.Tensor, radius: int, temporal_radius: int = 0,
+               chunk_frames: int = CHUNK_FRAMES) -> torch.Tensor:
+    """Grey erosion; the counterpart of max_filter()"""
+    return max_filter(-masks.float(), radius, temporal_radius, chunk_frames).neg_()
+
+
+def morphology(masks: torch.Tensor, operation: str, radius: int, temporal_radius: int = 0) -> torch.Tensor:
+    """
+    Batched dilate / erode / open / close
+
+    Binary masks stay binary; soft masks keep soft edges. The frame border
+    does not erode masks that touch it.
+
+    Args:
+        masks: Masks [B, H, W] or [H, W]
+        operation: One of MORPHOLOGY_OPERATIONS
+        radius: Spatial radius (square window)
+        temporal_radius: Frames on each side included in the window (0 = per frame)
+    """
+    if operation == "dilate":
+        return max_filter(masks, radius, temporal_radius)
+    if operation == "erode":
+        return min_filter(masks, radius, temporal_radius)
+    if operation == "open":
+        return max_filter(min_filter(masks, radius, temporal_radius), radius, temporal_radius)
+    if operation == "close":
+        return min_filter(max_filter(masks, radius, temporal_radius), radius, temporal_radius)
+    raise ValueError(f"Unknown morphology operation: {operation}")
+
+
+def l1_distance_pass(cost: torch.Tensor, radius: int, dim: int) -> torch.Tensor:
+    """
+    min over |t| <= radius of cost[x + t] + |t| along one dim, capped at radius + 1
+
+    Built from shifts by 1, 2, 4, ...: the binary expansion of any offset
+    reaches it at cost |t|, so log2(radius) steps cover the window.
+    """
+    length = cost.shape[dim]
+    step = 1
+    while step <= radius and step < length:
+        span = length - step
+        result = cost.clone()
+        head, tail = result.narrow(dim, 0, span), result.narrow(dim, step, span)
+        torch.minimum(head, cost.narrow(dim, step, span) + step, out=head)
+        torch.minimum(tail, cost.narrow(dim, 0, span) + step, out=tail)
+        cost = result.clamp_max_(radius + 1)
+        step *= 2
+    return cost
+
+
+def diamond_morphology(masks: torch.Tensor, operation: str, radius: int,
+                       chunk_frames: int = CHUNK_FRAMES) -> torch.Tensor:
+    """
+    Binary dilate / erode with scipy's iterated 4-connected cross
+
+    Matches scipy.ndimage.binary_dilation / binary_erosion with
+    iterations=radius: nonzero pixels are set, the window is the diamond
+    |dx| + |dy| <= radius, and pixels outside the frame count as unset, so
+    masks touching the border erode from it. The L1 distance to the nearest
+    set (dilate) or unset (erode) pixel is taken in a row pass and a column pass.
+
+    Args:
+        masks: Masks [B, H, W] or [H, W]
+        operation: "dilate" or "erode"
+        radius: Diamond radius (scipy iterations)
+
+    Returns:
+        Float 0/1 masks with the input's shape
+    """
+    if operation not in ("dilate", "erode"):
+        raise ValueError(f"Unknown diamond morphology operation: {operation}")
+    if mask_plane(masks) is not None:
+        return map_mask_planes(lambda plane: diamond_morphology(plane, operation, radius), masks)
+
+    single = masks.dim() == 2
+    batch = masks[None] if single else masks
+    erode = operation == "erode"
+
+    result = torch.empty(batch.shape, device=masks.device)
+    for start in range(0, batch.shape[0], chunk_frames):
+        sources = batch[start:start + chunk_frames] != 0
+        if erode:
+            sources = ~sources
+        cost = torch.where(sources, 0, radius + 1).to(torch.int32)
+        if erode:
+            # One ring of unset pixels around the frame
+            cost = F.pad(cost, (1, 1, 1, 1), value=0)
+        near = l1_distance_pass(l1_distance_pass(cost, radius, 2), radius, 1) <= radius
+        if erode:
+            near = ~near[:, 1:-1, 1:-1]
+        result[start:start + chunk_frames] = near
+
+    return result[0] if single else result
+
+
+def frame_differences(frames: torch.Tensor, chunk_frames: int = CHUNK_FRAMES) -> torch.Tensor:
+    """
+    Mean absolute channel difference between consecutive frames
+
+    Args:
+        frames: Frame batch [B, H, W, C], any transport dtype
+        chunk_frames: Frame pairs differenced per tensor operation
+
+    Returns:
+        Float differences [B - 1, H, W] in [0, 1]; entry i compares frames i and i + 1
+    """
+    count = max(0, frames.shape[0] - 1)
+    scale = 1.0 / 255.0 if frames.dtype == torch.uint8 else 1.0
+    differences = torch.empty((count,) + frames.shape[1:3], device=frames.device)
+    for start in range(0, count, chunk_frames):
+        # Each chunk carries one extra frame so its last pair is complete
+        chunk = frames[start:start + chunk_frames + 1].float()
+        differences[start:start + chunk_frames] = (chunk[1:] - chunk[:-1]).abs_().mean(dim=-1).mul_(scale)
+    return differences
+
+
+def motion_energy(frames: torch.Tensor, blur: float = 0, chunk_frames: int = CHUNK_FRAMES) -> torch.Tensor:
+    """
+    Frame-difference motion energy: blurred difference of each frame to the
+    next; the last frame repeats the one before it
+
+    Args:
+        frames: Frame batch [B, H, W, C], any transport dtype
+        blur: Gaussian sigma applied to the differences (0 = none)
+        chunk_frames: Frames processed per step
+
+    Returns:
+        Float energy [B, H, W] in [0, 1]
+    """
+    if frames.shape[0] < 2:
+        return torch.zeros(frames.shape[:3], device=frames.device)
+
+    motion = frame_differences(frames, chunk_frames)
+    if blur > 0:
+        motion = gaussian_blur(motion, blur, chunk_frames=chunk_frames)
+    return torch.cat([motion, motion[-1:]])
+
+
+def motion_mask(frames: torch.Tensor, threshold: float, blur: float = 0,
+                chunk_frames: int = CHUNK_FRAMES) -> torch.Tensor:
+    """Float masks [B, H, W]: 1 where motion_energy() exceeds threshold"""
+    return (motion_energy(frames, blur, chunk_frames) > threshold).float()
@@ -0,0 +1,115 @@
+"""
+Persistent decoded-frame cache for GIF Inpainter Studio
+Stores decoded uint8 frames as .npy files keyed by GIF content hash and mtime
+"""
+
+import os
+import hashlib
+import numpy as np
+from typing import Optional
+
+
+DEFAULT_CACHE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "cache", "frames")
+DEFAULT_CACHE_MB = 4096
+
+
+class FrameCache:
+    """
+    On-disk cache of decoded GIF frames with a size cap and LRU eviction.
+
+    Entries are decoded frame arrays ([B, H, W, C] uint8 frames, plus palette
+    indices and palettes for indexed decodes) saved with np.save. Warm loads are
+    memory-mapped copy-on-write, so torch.from_numpy() can wrap them without
+    reading the whole file up front. Recency is tracked through file mtimes.
+    """
+
+    def __init__(self, cache_dir: Optional[str] = None, max_bytes: Optional[int] = None):
+        self.cache_dir = cache_dir or os.environ.get("GIFINPAINT_CACHE_DIR", DEFAULT_CACHE_DIR)
+        if max_bytes is None:
+            max_bytes = int(os.environ.get("GIFINPAINT_CACHE_MB", DEFAULT_CACHE_MB)) * 1024 * 1024
+        self.max_bytes = max_bytes
+
+    @staticmethod
+    def file_hash(path: str) -> str:
+        """SHA-1 of the file contents"""
+        digest = hashlib.sha1()
+        with open(path, "rb") as f:
+            for chunk in iter(lambda: f.read(1 << 20), b""):
+                digest.update(chunk)
+        return digest.hexdigest()
+
+    def key(self, path: str, file_hash: Optional[str] = None) -> str:
+        """
+        Cache key for a GIF file
+
+        Args:
+            path: GIF file path
+            file_hash: Known content hash (e.g. from the metadata index)
+
+        Returns:
+            Key string (content hash and mtime)
+        """
+        mtime_ns = os.stat(path).st_mtime_ns
+        return f"{file_hash or self.file_hash(path)}_{mtime_ns}"
+
+    def _entry_path(self, key: str) -> str:
+        return os.path.join(self.cache_dir, f"{key}.npy")
+
+    def load(self, key: str) -> Optional[np.ndarray]:
+        """
+        Memory-map a cached entry
+
+        Returns:
+            Copy-on-write memmap of the frames, or None on a miss
+        """
+        entry_path = self._entry_path(key)
+        try:
+            frames = np.load(entry_path, mmap_mode="c")
+        except (OSError, ValueError):
+            return None
+
+        # Mark as recently used for LRU eviction
+        os.utime(entry_path)
+        return frames
+
+    def store(self, key: str, frames: np.ndarray) -> None:
+        """Save an array under key, then evict old entries beyond the size cap"""
+        if frames.nbytes > self.max_bytes:
+            return
+
+        os.makedirs(self.cache_dir, exist_ok=True)
+        entry_path = self._entry_path(key)
+
+        # Write to a temporary file first so readers never see partial entries
+        tmp_path = f"{entry_path}.{os.getpid()}.tmp"
+        with open(tmp_path, "wb") as f:
+            np.save(f, np.ascontiguousarray(frames))
+        os.replace(tmp_path, entry_path)
+
+        self.evict()
+
+    def evict(self) -> None:
+        """Remove least recently used entries until the cache fits its cap"""
+        entries = []
+        for entry in os.scandir(self.cache_dir):
+            if entry.name.endswith(".npy"):
+                stat = entry.stat()
+                entries.append((stat.st_mtime, stat.st_size, entry.path))
+
+        total = sum(size for _, size, _ in entries)
+        for _, size, entry_path in sorted(entries):
+            if total <= self.max_bytes:
+                break
+            try:
+                os.remove(entry_path)
+            except OSError:
+                continue
+            total -= size
+
+    def clear(self) -> None:
+        """Remove all cached entries"""
+        if not os.path.isdir(self.cache_dir):
+            return
+        for entry in os.scandir(self.cache_dir):
+            if entry.name.endswith(".npy"):
+                os.remove(entry.path)
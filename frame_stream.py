@@ -0,0 +1,148 @@
+"""
+Streaming frame sources for GIF Inpainter Studio
+Decode GIF frames lazily and hand them out in fixed-size windows
+"""
+
+import torch
+import numpy as np
+from typing import Callable, Iterator, Tuple
+
+try:
+    from .gif_decoder import IndexedGIFDecoder
+except ImportError:
+    from gif_decoder import IndexedGIFDecoder
+
+
+class FrameStream:
+    """
+    Base class for lazily produced frame sequences.
+
+    Subclasses implement iter_frames(); windows() batches those frames into
+    [B, H, W, C] (or [B, H, W] for masks) tensors so that peak memory is
+    bounded by the window size instead of the clip length.
+    """
+
+    def __init__(self, frame_count: int, width: int, height: int,
+                 duration: int = 100, loop: int = 0, window_size: int = 16):
+        self.frame_count = frame_count
+        self.width = width
+        self.height = height
+        self.duration = duration
+        self.loop = loop
+        self.window_size = window_size
+
+    def __len__(self):
+        return self.frame_count
+
+    def iter_frames(self) -> Iterator[torch.Tensor]:
+        raise NotImplementedError
+
+    def windows(self, window_size: int = None, overlap: int = 0) -> Iterator[Tuple[int, torch.Tensor]]:
+        """
+        Yield (start_index, batch) windows over the stream
+
+        Args:
+            window_size: Frames per window (defaults to the stream's window size)
+            overlap: Frames shared between consecutive windows
+
+        Returns:
+            Iterator of (start, tensor) pairs
+        """
+        window_size = window_size or self.window_size
+        if overlap < 0 or overlap >= window_size:
+            raise ValueError(f"overlap must be in [0, {window_size - 1}], got {overlap}")
+
+        step = window_size - overlap
+        buffer = []
+        start = 0
+
+        for frame in self.iter_frames():
+            buffer.append(frame)
+            if len(buffer) == window_size:
+                yield start, torch.stack(buffer)
+                buffer = buffer[step:]
+                start += step
+
+        # Tail window, unless everything left was already covered by the overlap
+        if buffer and (start == 0 or len(buffer) > overlap):
+            yield start, torch.stack(buffer)
+
+    def map(self, fn: Callable[[torch.Tensor, int], torch.Tensor], context: int = 0) -> "MappedFrameStream":
+        """
+        Lazily apply a batch function to every window
+
+        Args:
+            fn: Function taking (window batch, start index) and returning a batch of equal length
+            context: Neighbouring frames fn needs on each side (e.g. temporal radius)
+
+        Returns:
+            New stream producing the mapped frames
+        """
+        return MappedFrameStream(self, fn, context)
+
+    def collect(self, start_frame: int = 0, end_frame: int = -1) -> torch.Tensor:
+        """Materialize a frame range of the stream as a single batch tensor"""
+        if end_frame == -1 or end_frame > self.frame_count:
+            end_frame = self.frame_count
+
+        selected = []
+        for index, frame in enumerate(self.iter_frames()):
+            if index >= end_frame:
+                break
+            if index >= start_frame:
+                selected.append(frame)
+
+        return torch.stack(selected)
+
+
+class GIFFrameStream(FrameStream):
+    """
+    Frame stream decoding a GIF file one frame at a time
+    """
+
+    def __init__(self, path: str, window_size: int = 16):
+        self.decoder = IndexedGIFDecoder.from_file(path)
+        structure = self.decoder.structure
+        if not structure.frames:
+            raise ValueError(f"No frames found in {path}")
+
+        super().__init__(len(structure.frames), structure.width, structure.height,
+                         structure.frames[0].duration, structure.loop or 0, window_size)
+        self.path = path
+
+    def iter_frames(self) -> Iterator[torch.Tensor]:
+        palette = torch.from_numpy(self.decoder.palette.astype(np.float32) / 255.0)
+        for indices in self.decoder.iter_indices():
+            yield palette[torch.from_numpy(indices).long()]
+
+
+class MappedFrameStream(FrameStream):
+    """
+    Stream applying a window function to another stream.
+
+    Windows are read with `context` extra frames on each side so functions
+    that look at neighbouring frames give the same result as on the full
+    batch; only the frames with complete context are emitted from each window.
+    """
+
+    def __init__(self, source: FrameStream, fn: Callable[[torch.Tensor, int], torch.Tensor], context: int = 0):
+        super().__init__(source.frame_count, source.width, source.height,
+                         source.duration, source.loop, source.window_size)
+        self.source = source
+        self.fn = fn
+        self.context = context
+
+    def iter_frames(self) -> Iterator[torch.Tensor]:
+        context = self.context
+        window_size = self.window_size + 2 * context
+
+        for start, window in self.source.windows(window_size, 2 * context):
+            result = self.fn(window, start)
+            count = window.shape[0]
+
+            # Edge frames only have context on one side, exactly as in a full batch
+            lo = 0 if start == 0 else context
+            hi = count if start + count >= self.source.frame_count else count - context
+
+            for frame in result[lo:hi]:
+                yield frame
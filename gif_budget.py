@@ -0,0 +1,275 @@
+"""
+Size-budgeted GIF encoding for GIF Inpainter Studio
+Searches colour count, dithering, frame dropping and delta cropping for the
+highest-quality settings whose output fits a byte budget
+"""
+
+import io
+import copy
+import hashlib
+import multiprocessing
+import numpy as np
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, List, NamedTuple, Optional, Tuple
+
+try:
+    from .gif_encoder import GIFWriter, encode_frames
+    from .gif_quantizer import GlobalPaletteQuantizer
+except ImportError:
+    from gif_encoder import GIFWriter, encode_frames
+    from gif_quantizer import GlobalPaletteQuantizer
+
+
+class BudgetSetting(NamedTuple):
+    frame_step: int
+    colors: int
+    dither: str
+
+
+BUDGET_COLORS = (256, 128, 64, 32, 16, 8)
+
+
+def color_counts(max_colors: int = 256) -> List[int]:
+    """Colour counts to search: max_colors, then the smaller BUDGET_COLORS steps"""
+    return [max_colors] + [colors for colors in BUDGET_COLORS if colors < max_colors]
+
+
+def dither_options(colors: int, dither: str = "none") -> List[str]:
+    """
+    Dither modes tried at one colour count, preferred first
+
+    "bayer" dithers every setting. With "none", Bayer dithering is still
+    tried first below 128 colours, where banding is worse than noise.
+    """
+    if dither != "none" or colors >= 128:
+        return [dither]
+    return ["bayer", "none"]
+
+
+def budget_ladder(max_frame_step: int = 4, max_colors: int = 256, dither: str = "none") -> List[BudgetSetting]:
+    """
+    Candidate settings from best to lowest quality
+
+    Dropping frames costs the most quality, so every colour/dither option is
+    tried at one frame step before moving to the next.
+    """
+    return [BudgetSetting(frame_step, colors, frame_dither)
+            for frame_step in range(1, max_frame_step + 1)
+            for colors in color_counts(max_colors)
+            for frame_dither in dither_options(colors, dither)]
+
+
+class SizeBudgetSearch:
+    """
+    Encode-size search over budget_ladder() for one prepared clip.
+
+    Frame steps are tried in order. At one frame step, encoded size falls
+    with the colour count for either dither mode, so "some dither option
+    fits" holds for every count below the best fitting one: a frame step
+    whose cheapest count does not fit is skipped, otherwise the colour count
+    is bisected. Every dither option of a probed count is measured, since
+    dithering can cost more than the colours it replaces. Delta cropping is
+    lossless, so it is chosen once, by whichever mode is smaller at the first
+    probe.
+
+    The search starts from the caller's settings: max_colors (or the size of
+    a source palette, which is used as-is at the top count) caps the colour
+    count, dither picks the dither options, delta=False turns off delta
+    cropping, and workers > 1 LZW-encodes runs of frames in a process pool.
+
+    Quantized indices are kept per (colours, dither) at the full frame rate;
+    each frame step takes every n-th frame of them. Encoded sizes are kept
+    per clip (content hash, timing, quantize method and source palette)
+    across searches, so rerunning with another budget only encodes the
+    chosen setting.
+    """
+
+    # Quantized index batches kept at once (each is a full [B, H, W] array)
+    MAX_CACHED_INDICES = 4
+    # Clips whose encoded sizes are remembered between searches
+    MAX_CACHED_CLIPS = 16
+    # Shared across instances so a rerun with another budget reuses the sizes
+    known_sizes: "OrderedDict[Tuple, Dict[Tuple[BudgetSetting, bool], int]]" = OrderedDict()
+
+    def __init__(self, frames: np.ndarray, durations: List[int], loop: int = 0,
+                 quantize_method: str = "median_cut", max_frame_step: int = 4, max_colors: int = 256,
+                 dither: str = "none", source: Optional[GlobalPaletteQuantizer] = None,
+                 delta: Optional[bool] = None, workers: int = 1):
+        """
+        Args:
+            frames: uint8 clip [B, H, W, 3]
+            durations: Display time of each frame in ms
+            max_colors: Most colours tried (ignored with a source palette)
+            dither: Dither mode of the caller ("bayer" dithers every setting)
+            source: Quantizer onto the source palette, tried before fitted palettes
+            delta: Delta cropping on/off, or None to pick the smaller mode
+            workers: Encode processes (1 = serial)
+        """
+        self.frames = frames
+        self.durations = list(durations)
+        self.loop = loop
+        self.quantize_method = quantize_method
+        self.max_frame_step = max_frame_step
+        self.dither = dither
+        self.source = source
+        self.workers = workers
+        self.colors = color_counts(len(source.palette) if source is not None else max_colors)
+        self.ladder = budget_ladder(max_frame_step, self.colors[0], dither)
+        self.delta = delta
+        self.sizes = self._clip_sizes()
+        self._quantizers: Dict[int, GlobalPaletteQuantizer] = {}
+        if source is not None:
+            self._quantizers[self.colors[0]] = source
+        self._indices: "OrderedDict[Tuple[int, str], np.ndarray]" = OrderedDict()
+        self._fitting: Dict[Tuple[BudgetSetting, bool], bytes] = {}
+        self._pool: Optional[ProcessPoolExecutor] = None
+
+    def _clip_sizes(self) -> Dict[Tuple[BudgetSetting, bool], int]:
+        """Size cache shared by every search over the same clip"""
+        digest = hashlib.blake2b(np.ascontiguousarray(self.frames), digest_size=16).hexdigest()
+        source_palette = None if self.source is None else self.source.palette.tobytes()
+        key = (digest, self.frames.shape, tuple(self.durations), self.loop, self.quantize_method, source_palette)
+        cache = SizeBudgetSearch.known_sizes
+        if key in cache:
+            cache.move_to_end(key)
+        else:
+            cache[key] = {}
+            while len(cache) > self.MAX_CACHED_CLIPS:
+                cache.popitem(last=False)
+        return cache[key]
+
+    def quantizer(self, colors: int, dither: str = "none") -> GlobalPaletteQuantizer:
+        """Fitted quantizer, one palette fit per colour count"""
+        if colors not in self._quantizers:
+            # One slot stays free for the delta encoder's transparent index
+            quantizer = GlobalPaletteQuantizer(min(colors, 255), self.quantize_method)
+            quantizer.fit(self.frames)
+            self._quantizers[colors] = quantizer
+
+        quantizer = copy.copy(self._quantizers[colors])
+        quantizer.dither = dither
+        return quantizer
+
+    def indices(self, colors: int, dither: str) -> np.ndarray:
+        """Quantized indices of every frame, least recently used evicted first"""
+        key = (colors, dither)
+        if key in self._indices:
+            self._indices.move_to_end(key)
+        else:
+            if len(self._indices) >= self.MAX_CACHED_INDICES:
+                self._indices.popitem(last=False)
+            self._indices[key] = self.quantizer(colors, dither).quantize(self.frames)
+        return self._indices[key]
+
+    def encode(self, setting: BudgetSetting, delta: bool) -> bytes:
+        """Encode the clip with one setting and record its size"""
+        quantizer = self.quantizer(setting.colors)
+        indices = self.indices(setting.colors, setting.dither)[::setting.frame_step]
+
+        # Dropped frames hand their time to the frame kept before them
+        step = setting.frame_step
+        durations = [sum(self.durations[i:i + step]) for i in range(0, len(self.durations), step)]
+
+        palette = quantizer.palette
+        transparent_index = None
+        if delta and len(palette) < 256:
+            transparent_index = len(palette)
+            palette = np.concatenate([palette, np.zeros((1, 3), dtype=np.uint8)])
+
+        if self._pool is None:
+            records = encode_frames(indices, None, delta, transparent_index)
+        else:
+            # Each run deltas against the last frame of the run before it
+            run_length = -(-len(indices) // self.workers)
+            futures = [self._pool.submit(encode_frames, indices[start:start + run_length],
+                                         indices[start - 1] if start else None, delta, transparent_index)
+                       for start in range(0, len(indices), run_length)]
+            records = [record for future in futures for record in future.result()]
+
+        buffer = io.BytesIO()
+        height, width = indices.shape[1:3]
+        with GIFWriter(buffer, width, height, palette, self.loop, delta, transparent_index) as writer:
+            for record, duration in zip(records, durations):
+                writer.write_record(record, duration)
+
+        data = buffer.getvalue()
+        self.sizes[(setting, delta)] = len(data)
+        return data
+
+    def size(self, setting: BudgetSetting, max_bytes: int) -> int:
+        """Encoded size of a setting, from the cache when known"""
+        if self.delta is None:
+            sizes = {delta: self._measure(setting, delta, max_bytes) for delta in (True, False)}
+            self.delta = sizes[True] <= sizes[False]
+        return self._measure(setting, self.delta, max_bytes)
+
+    def _measure(self, setting: BudgetSetting, delta: bool, max_bytes: int) -> int:
+        key = (setting, delta)
+        if key not in self.sizes:
+            data = self.encode(setting, delta)
+            if len(data) <= max_bytes:
+                # Fitting output may be the answer: keep it rather than encode it again
+                self._fitting[key] = data
+        return self.sizes[key]
+
+    def fitting_setting(self, frame_step: int, colors: int, max_bytes: int) -> Optional[BudgetSetting]:
+        """Preferred dither option that fits at one frame step and colour count, or None"""
+        dithers = dither_options(colors, self.dither)
+        if self.source is not None and colors == self.colors[0]:
+            # The source palette keeps untouched pixels exact unless the caller dithers
+            dithers = [self.dither]
+        for dither in dithers:
+            setting = BudgetSetting(frame_step, colors, dither)
+            if self.size(setting, max_bytes) <= max_bytes:
+                return setting
+        return None
+
+    def search(self, max_bytes: int) -> Tuple[BudgetSetting, bool, bytes, bool]:
+        """
+        Best setting whose output fits max_bytes
+
+        Returns:
+            (setting, delta, encoded GIF bytes, fits) - if nothing fits, the
+            smallest setting measured is returned with fits=False
+        """
+        if self.workers > 1:
+            # Fork keeps workers independent of how this package was imported
+            methods = multiprocessing.get_all_start_methods()
+            context = multiprocessing.get_context("fork" if "fork" in methods else None)
+            self._pool = ProcessPoolExecutor(max_workers=self.workers, mp_context=context)
+        try:
+            return self._search(max_bytes)
+        finally:
+            if self._pool is not None:
+                self._pool.shutdown()
+                self._pool = None
+
+    def _search(self, max_bytes: int) -> Tuple[BudgetSetting, bool, bytes, bool]:
+        best = None
+        for frame_step in range(1, self.max_frame_step + 1):
+            # If the fewest colours do not fit, no colour count at this frame step does
+            if self.fitting_setting(frame_step, self.colors[-1], max_bytes) is None:
+                continue
+
+            # Bisect for the most colours that fit (self.colors[high] always fits)
+            low, high = 0, len(self.colors) - 1
+            while low < high:
+                middle = (low + high) // 2
+                if self.fitting_setting(frame_step, self.colors[middle], max_bytes) is None:
+                    low = middle + 1
+                else:
+                    high = middle
+            best = self.fitting_setting(frame_step, self.colors[high], max_bytes)
+            break
+
+        fits = best is not None
+        if not fits:
+            # Nothing fits: fall back to the smallest output measured
+            measured = [setting for setting in self.ladder if (setting, self.delta) in self.sizes]
+            best = min(measured, key=lambda setting: self.sizes[(setting, self.delta)])
+
+        data = self._fitting.get((best, self.delta))
+        if data is None:
+            data = self.encode(best, self.delta)
+        return best, self.delta, data, fits
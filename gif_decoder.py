@@ -0,0 +1,462 @@
+"""
+Palette-indexed GIF decoding for GIF Inpainter Studio
+Parses the GIF block structure, composites frames as palette index arrays
+in NumPy and expands them to RGB with a single palette lookup
+"""
+
+import os
+import struct
+import multiprocessing
+import numpy as np
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import shared_memory
+from PIL import Image
+from typing import Iterator, List, Optional, Sequence, Tuple
+
+
+class GIFFrameInfo:
+    """
+    Block-level description of one GIF frame (no pixel data decoded)
+    """
+
+    def __init__(self, x, y, width, height, interlace, palette, transparency,
+                 disposal, duration, data_start, data_end):
+        self.x = x
+        self.y = y
+        self.width = width
+        self.height = height
+        self.interlace = interlace
+        self.palette = palette            # Local colour table bytes or None
+        self.transparency = transparency  # Transparent index or None
+        self.disposal = disposal          # Disposal method from the GCE (0 = unspecified)
+        self.duration = duration          # Frame delay in ms
+        self.data_start = data_start      # Offset of the LZW minimum code size byte
+        self.data_end = data_end          # Offset just past the block terminator
+
+
+class GIFStructure:
+    """
+    Parsed GIF header and frame table
+    """
+
+    def __init__(self, data, width, height, background, global_palette, loop, frames):
+        self.data = data
+        self.width = width
+        self.height = height
+        self.background = background
+        self.global_palette = global_palette
+        self.loop = loop
+        self.frames: List[GIFFrameInfo] = frames
+
+    def frame_palette(self, index: int) -> bytes:
+        """Colour table used by a frame (local, else global, else grey ramp)"""
+        palette = self.frames[index].palette or self.global_palette
+        if palette is None:
+            palette = bytes(np.repeat(np.arange(256, dtype=np.uint8), 3))
+        return palette
+
+
+def _skip_sub_blocks(data: bytes, pos: int) -> int:
+    """Return the offset just past a chain of data sub-blocks"""
+    size = len(data)
+    while pos < size:
+        length = data[pos]
+        pos += 1
+        if length == 0:
+            break
+        pos += length
+    return min(pos, size)
+
+
+def parse_gif(data: bytes) -> GIFStructure:
+    """
+    Walk the GIF block structure without decoding any pixels
+
+    Args:
+        data: Complete GIF file contents
+
+    Returns:
+        GIFStructure with one GIFFrameInfo per image block
+    """
+    if data[:6] not in (b"GIF87a", b"GIF89a"):
+        raise ValueError("Not a GIF file")
+
+    width, height, flags, background = struct.unpack("<HHBB", data[6:12])
+    pos = 13
+
+    global_palette = None
+    if flags & 0x80:
+        table_size = 3 << ((flags & 7) + 1)
+        global_palette = data[pos:pos + table_size]
+        pos += table_size
+
+    loop = None
+    frames = []
+    transparency, disposal, duration = None, 0, 0
+
+    while pos < len(data):
+        block = data[pos]
+
+        if block == 0x21:
+            # Extension block
+            label = data[pos + 1]
+            pos += 2
+            if label == 0xF9 and data[pos] >= 4:
+                # Graphic control extension
+                packed = data[pos + 1]
+                duration = struct.unpack("<H", data[pos + 2:pos + 4])[0] * 10
+                transparency = data[pos + 4] if packed & 1 else None
+                disposal = (packed >> 2) & 7
+            elif label == 0xFF and data[pos + 1:pos + 12] == b"NETSCAPE2.0":
+                # Looping application extension
+                sub = pos + 1 + data[pos]
+                if data[sub] >= 3 and data[sub + 1] == 1:
+                    loop = struct.unpack("<H", data[sub + 2:sub + 4])[0]
+            pos = _skip_sub_blocks(data, pos)
+
+        elif block == 0x2C:
+            # Image descriptor
+            x, y, w, h, packed = struct.unpack("<HHHHB", data[pos + 1:pos + 10])
+            pos += 10
+            palette = None
+            if packed & 0x80:
+                table_size = 3 << ((packed & 7) + 1)
+                palette = data[pos:pos + table_size]
+                pos += table_size
+
+            data_start = pos
+            pos = _skip_sub_blocks(data, pos + 1)
+            frames.append(GIFFrameInfo(
+                x, y, w, h, bool(packed & 0x40), palette,
+                transparency, disposal, duration, data_start, pos,
+            ))
+            transparency, disposal, duration = None, 0, 0
+
+        else:
+            # Trailer (0x3B) or trailing garbage
+            break
+
+    return GIFStructure(data, width, height, background, global_palette, loop, frames)
+
+
+def read_gif_structure(path: str) -> GIFStructure:
+    """Read and parse a GIF file"""
+    with open(path, "rb") as f:
+        return parse_gif(f.read())
+
+
+class IndexedFrames:
+    """
+    Composited palette indices [B, H, W] with the palette they index into
+    """
+
+    def __init__(self, indices: np.ndarray, palette: np.ndarray):
+        self.indices = indices
+        self.palette = palette
+
+    def to_rgb(self) -> np.ndarray:
+        """Expand to uint8 RGB [B, H, W, 3] with one batched lookup"""
+        return np.take(self.palette, self.indices, axis=0)
+
+
+class IndexedGIFDecoder:
+    """
+    Decode GIF frames as palette indices and composite them in NumPy.
+
+    All frame palettes are concatenated into one combined palette, so a
+    frame's local index i becomes palette_base[frame] + i and the whole
+    clip shares a single index space. Disposal and transparency follow
+    Pillow's interpretation so the RGB result matches frame.convert("RGB").
+    """
+
+    def __init__(self, structure: GIFStructure, path: Optional[str] = None):
+        self.structure = structure
+        self.path = path
+
+        palettes = []
+        palette_offsets = {}
+        self.palette_base = []
+        base = 0
+        for index in range(len(structure.frames)):
+            palette = structure.frame_palette(index)
+            if palette not in palette_offsets:
+                palette_offsets[palette] = base
+                palettes.append(palette)
+                base += len(palette) // 3
+            self.palette_base.append(palette_offsets[palette])
+
+        self.palette = np.frombuffer(b"".join(palettes), dtype=np.uint8).reshape(-1, 3)
+        self.dtype = np.uint8 if len(self.palette) <= 256 else np.uint16
+
+        # Pillow keeps the last specified disposal when a frame leaves it unspecified
+        self.disposals = []
+        disposal = 0
+        for frame in structure.frames:
+            disposal = frame.disposal or disposal
+            self.disposals.append(disposal)
+
+    @classmethod
+    def from_file(cls, path: str) -> "IndexedGIFDecoder":
+        return cls(read_gif_structure(path), path)
+
+    def __len__(self):
+        return len(self.structure.frames)
+
+    def decode_frame(self, index: int) -> np.ndarray:
+        """
+        LZW-decode one frame's raw local palette indices [h, w]
+
+        The frame's data sub-blocks go straight to Pillow's C GIF decoder
+        (Image.frombytes with the "gif" decoder), so there is no container to
+        parse and no compositing.
+        """
+        structure = self.structure
+        frame = structure.frames[index]
+        code_size = structure.data[frame.data_start]
+        image_data = structure.data[frame.data_start + 1:frame.data_end]
+        image = Image.frombytes("L", (frame.width, frame.height), image_data, "gif",
+                                code_size, int(frame.interlace))
+        return np.asarray(image)
+
+    def _frame_region(self, index: int):
+        """Frame extent clipped to the logical screen, as canvas and frame slices"""
+        frame = self.structure.frames[index]
+        x1 = min(frame.x + frame.width, self.structure.width)
+        y1 = min(frame.y + frame.height, self.structure.height)
+        canvas_region = (slice(frame.y, y1), slice(frame.x, x1))
+        frame_region = (slice(0, max(0, y1 - frame.y)), slice(0, max(0, x1 - frame.x)))
+        return canvas_region, frame_region
+
+    def _dispose_value(self, index: int) -> int:
+        """Combined palette index used to clear a frame's extent (disposal 2)"""
+        frame = self.structure.frames[index]
+        color = frame.transparency
+        if color is None:
+            color = self.structure.background
+            if color >= len(self.structure.frame_palette(index)) // 3:
+                color = 0
+        return self.palette_base[index] + color
+
+    def _covers_screen(self, index: int) -> bool:
+        frame = self.structure.frames[index]
+        return (frame.x == 0 and frame.y == 0
+                and frame.width >= self.structure.width
+                and frame.height >= self.structure.height)
+
+    def checkpoints(self) -> List[Tuple[int, int]]:
+        """
+        Find frames whose composited result does not depend on earlier frames
+
+        A frame is a checkpoint when the previous frame's disposal clears the
+        whole screen, or when it paints the whole screen opaquely and is not
+        later restored to the previous canvas (disposal 3).
+
+        Returns:
+            List of (frame index, canvas fill index to start decoding from)
+        """
+        structure = self.structure
+        points = [(0, self.palette_base[0] + (structure.frames[0].transparency or 0))]
+
+        for index in range(1, len(structure.frames)):
+            frame = structure.frames[index]
+            if self.disposals[index - 1] == 2 and self._covers_screen(index - 1):
+                points.append((index, self._dispose_value(index - 1)))
+            elif (self._covers_screen(index) and frame.transparency is None
+                  and self.disposals[index] != 3):
+                points.append((index, self.palette_base[index]))
+
+        return points
+
+    def iter_indices(self, start: int = 0, stop: Optional[int] = None,
+                     fill: Optional[int] = None,
+                     raw: Optional[Sequence[np.ndarray]] = None) -> Iterator[np.ndarray]:
+        """
+        Yield composited index canvases [H, W] for frames start..stop-1
+
+        Decoding from start > 0 is only valid from a checkpoint, using the
+        fill value returned by checkpoints(). Already decoded raw frames can
+        be passed as `raw` (indexable by frame index) to skip LZW decoding.
+        The same canvas array is yielded every time; copy it to keep a frame.
+        """
+        structure = self.structure
+        stop = len(structure.frames) if stop is None else stop
+        if fill is None:
+            fill = self.palette_base[start] + ((structure.frames[0].transparency or 0) if start == 0 else 0)
+        canvas = np.full((structure.height, structure.width), fill, dtype=self.dtype)
+        pending = None
+
+        for index in range(start, stop):
+            frame = structure.frames[index]
+            canvas_region, frame_region = self._frame_region(index)
+
+            # Dispose the previous frame's extent
+            if pending is not None:
+                region, restore = pending
+                canvas[region] = restore
+
+            # Record how this frame's extent is disposed before the next one
+            pending = None
+            disposal = self.disposals[index]
+            if disposal == 2:
+                pending = (canvas_region, self._dispose_value(index))
+            elif disposal == 3:
+                if index > 0:
+                    pending = (canvas_region, canvas[canvas_region].copy())
+                elif frame.transparency is not None:
+                    pending = (canvas_region, self.palette_base[0] + frame.transparency)
+
+            frame_raw = raw[index] if raw is not None else self.decode_frame(index)
+            frame_raw = frame_raw[frame_region]
+            base = self.palette_base[index]
+            indices = frame_raw
+            if base or self.dtype != np.uint8:
+                indices = frame_raw.astype(self.dtype) + self.dtype(base)
+            if index > 0 and frame.transparency is not None:
+                np.copyto(canvas[canvas_region], indices, where=frame_raw != frame.transparency)
+            else:
+                canvas[canvas_region] = indices
+
+            yield canvas
+
+    def decode_indices(self) -> np.ndarray:
+        """Composite every frame into an index array [B, H, W]"""
+        indices = np.empty((len(self), self.structure.height, self.structure.width), dtype=self.dtype)
+        for index, canvas in enumerate(self.iter_indices()):
+            indices[index] = canvas
+        return indices
+
+    def decode_indices_parallel(self, workers: int = 0) -> np.ndarray:
+        """
+        Composite every frame into an index array [B, H, W] using a process pool
+
+        LZW decoding is independent per frame, so workers first decode runs
+        of frames into a shared raw buffer at the offsets found by the block
+        parser. Segments between checkpoints are then composited in parallel
+        straight into a shared-memory output buffer. The result is identical
+        to decode_indices(); decoders not backed by a file decode serially.
+
+        Args:
+            workers: Worker processes (0 = one per CPU core)
+        """
+        workers = workers or os.cpu_count() or 1
+        frames = self.structure.frames
+        if workers < 2 or len(frames) < 2 or self.path is None:
+            return self.decode_indices()
+
+        shape = (len(frames), self.structure.height, self.structure.width)
+        raw_sizes = [frame.width * frame.height for frame in frames]
+        raw_offsets = np.concatenate([[0], np.cumsum(raw_sizes)]).tolist()
+
+        # Decode runs of roughly equal pixel counts
+        decode_tasks = _split_runs(list(range(len(frames))), raw_sizes, workers * 4)
+
+        # Composite runs of whole checkpoint segments
+        points = self.checkpoints()
+        segment_sizes = np.diff([start for start, _ in points] + [len(frames)]).tolist()
+        composite_tasks = [
+            (points[first][0], points[last][0] + segment_sizes[last], points[first][1])
+            for first, last in _split_runs(list(range(len(points))), segment_sizes, workers * 4)
+        ]
+
+        dtype = np.dtype(self.dtype)
+        raw_shm = shared_memory.SharedMemory(create=True, size=max(1, raw_offsets[-1]))
+        out_shm = shared_memory.SharedMemory(create=True, size=max(1, int(np.prod(shape)) * dtype.itemsize))
+        try:
+            # Fork keeps workers independent of how this package was imported
+            methods = multiprocessing.get_all_start_methods()
+            context = multiprocessing.get_context("fork" if "fork" in methods else None)
+            with ProcessPoolExecutor(max_workers=workers, mp_context=context) as pool:
+                futures = [
+                    pool.submit(_decode_raw_run, self.path, raw_shm.name, raw_offsets, first, last)
+                    for first, last in decode_tasks
+                ]
+                for future in futures:
+                    future.result()
+
+                futures = [
+                    pool.submit(_composite_run, self.path, raw_shm.name, raw_offsets,
+                                out_shm.name, shape, dtype.str, start, stop, fill)
+                    for start, stop, fill in composite_tasks
+                ]
+                for future in futures:
+                    future.result()
+
+            indices = np.ndarray(shape, dtype=dtype, buffer=out_shm.buf).copy()
+        finally:
+            for shm in (raw_shm, out_shm):
+                shm.close()
+                shm.unlink()
+
+        return indices
+
+    def decode(self, workers: int = 1) -> IndexedFrames:
+        """
+        Decode the whole clip as palette indices plus combined palette
+
+        Args:
+            workers: Decode processes (1 = serial, 0 = one per CPU core)
+        """
+        if workers == 1:
+            indices = self.decode_indices()
+        else:
+            indices = self.decode_indices_parallel(workers)
+        return IndexedFrames(indices, self.palette)
+
+
+def _split_runs(items: List[int], sizes: List[int], max_runs: int) -> List[Tuple[int, int]]:
+    """
+    Group consecutive items into runs of roughly equal total size
+
+    Returns:
+        List of (first item, last item) pairs, both inclusive
+    """
+    target = sum(sizes) / max(1, min(max_runs, len(items)))
+    runs = []
+    first, total = None, 0
+    for item, size in zip(items, sizes):
+        if first is None:
+            first, total = item, 0
+        total += size
+        if total >= target:
+            runs.append((first, item))
+            first = None
+    if first is not None:
+        runs.append((first, items[-1]))
+    return runs
+
+
+def _raw_views(buffer, offsets, structure):
+    """Per-frame [h, w] views into a shared raw index buffer"""
+    return [
+        np.ndarray((frame.height, frame.width), dtype=np.uint8, buffer=buffer, offset=offset)
+        for frame, offset in zip(structure.frames, offsets)
+    ]
+
+
+def _decode_raw_run(path, raw_name, raw_offsets, first, last):
+    """Process pool worker: LZW-decode frames first..last into shared memory"""
+    decoder = IndexedGIFDecoder.from_file(path)
+    shm = shared_memory.SharedMemory(name=raw_name)
+    try:
+        raw = _raw_views(shm.buf, raw_offsets, decoder.structure)
+        for index in range(first, last + 1):
+            raw[index][...] = decoder.decode_frame(index)
+        del raw
+    finally:
+        shm.close()
+
+
+def _composite_run(path, raw_name, raw_offsets, out_name, shape, dtype, start, stop, fill):
+    """Process pool worker: composite frames start..stop-1 from decoded raw indices"""
+    decoder = IndexedGIFDecoder.from_file(path)
+    raw_shm = shared_memory.SharedMemory(name=raw_name)
+    out_shm = shared_memory.SharedMemory(name=out_name)
+    try:
+        raw = _raw_views(raw_shm.buf, raw_offsets, decoder.structure)
+        output = np.ndarray(shape, dtype=np.dtype(dtype), buffer=out_shm.buf)
+        for index, canvas in enumerate(decoder.iter_indices(start, stop, fill, raw), start):
+            output[index] = canvas
+        del raw, output
+    finally:
+        raw_shm.close()
+        out_shm.close()
@@ -0,0 +1,328 @@
+"""
+GIF writer for GIF Inpainter Studio
+Writes palette-index frames with a single global colour table, cropping each
+frame to the region that changed since the previous one
+"""
+
+import io
+import os
+import struct
+import multiprocessing
+import numpy as np
+from concurrent.futures import ProcessPoolExecutor
+from PIL import Image
+from typing import BinaryIO, List, Optional, Tuple, Union
+
+try:
+    from .gif_decoder import parse_gif
+    from .gif_quantizer import GlobalPaletteQuantizer, frames_to_uint8
+except ImportError:
+    from gif_decoder import parse_gif
+    from gif_quantizer import GlobalPaletteQuantizer, frames_to_uint8
+
+# Graphics control disposal methods
+DISPOSAL_NONE = 1  # leave the frame in place for the next one to draw over
+
+
+def encode_image_data(indices: np.ndarray) -> bytes:
+    """
+    LZW-compress a uint8 index image into GIF image data
+
+    Returns:
+        Minimum code size byte, data sub-blocks and block terminator
+    """
+    image = Image.fromarray(np.ascontiguousarray(indices, dtype=np.uint8))
+    buffer = io.BytesIO()
+    # Pillow's GIF writer does the LZW coding (no palette optimization or interlacing,
+    # so the indices are written as they are); only its image data block is kept
+    image.save(buffer, format="GIF", optimize=False, interlace=False)
+    data = buffer.getvalue()
+    frame = parse_gif(data).frames[0]
+    return data[frame.data_start:frame.data_end]
+
+
+def delta_region(previous: np.ndarray, current: np.ndarray,
+                 transparent_index: Optional[int] = None) -> Optional[Tuple[int, int, np.ndarray]]:
+    """
+    Smallest region of current that differs from previous
+
+    Args:
+        previous: Index canvas shown before this frame [H, W]
+        current: Index frame [H, W]
+        transparent_index: If set, unchanged pixels inside the region become transparent
+
+    Returns:
+        (x, y, region) or None when the frames are identical
+    """
+    changed = previous != current
+    rows = np.flatnonzero(changed.any(axis=1))
+    if rows.size == 0:
+        return None
+    cols = np.flatnonzero(changed.any(axis=0))
+
+    y0, y1 = rows[0], rows[-1] + 1
+    x0, x1 = cols[0], cols[-1] + 1
+    region = current[y0:y1, x0:x1]
+    if transparent_index is not None:
+        region = np.where(changed[y0:y1, x0:x1], region, np.uint8(transparent_index))
+
+    return int(x0), int(y0), region
+
+
+def encode_frame(previous: Optional[np.ndarray], indices: np.ndarray, delta: bool = True,
+                 transparent_index: Optional[int] = None) -> Optional[tuple]:
+    """
+    Encode one index frame against the previous one
+
+    Args:
+        previous: Previous frame's indices, or None for the first frame
+        indices: Index frame [H, W]
+        delta: Crop to the changed region
+        transparent_index: Index for unchanged pixels inside the region
+
+    Returns:
+        (x, y, width, height, transparent, data) record, or None if the frame
+        repeats the previous one (delta only)
+    """
+    if previous is None or not delta:
+        x, y, region = 0, 0, indices
+        transparent = False
+    else:
+        changed = delta_region(previous, indices, transparent_index)
+        if changed is None:
+            return None
+        x, y, region = changed
+        transparent = transparent_index is not None
+
+    return x, y, region.shape[1], region.shape[0], transparent, encode_image_data(region)
+
+
+def encode_frames(indices: np.ndarray, previous: Optional[np.ndarray] = None, delta: bool = True,
+                  transparent_index: Optional[int] = None) -> List[Optional[tuple]]:
+    """
+    encode_frame() over a run of index frames [B, H, W]
+
+    Args:
+        previous: Index frame before the run, or None at the start of the clip
+    """
+    records = []
+    for frame_indices in indices:
+        records.append(encode_frame(previous, frame_indices, delta, transparent_index))
+        previous = frame_indices
+    return records
+
+
+class GIFWriter:
+    """
+    Animated GIF writer for palette-index frames.
+
+    All frames share one global palette. With delta encoding, each frame is
+    cropped to the bounding box of pixels that changed since the previously
+    emitted frame, unchanged pixels inside the box are written as the
+    transparent index, and frames are left in place (disposal 1) so the
+    decoder's canvas supplies the rest. Frames identical to the previous one
+    are not written; their duration is added to the previous frame instead.
+    """
+
+    def __init__(self, path: Union[str, BinaryIO], width: int, height: int, palette: np.ndarray,
+                 loop: int = 0, delta: bool = True, transparent_index: Optional[int] = None):
+        """
+        Args:
+            path: Output file path or writable binary file object
+            width: Canvas width
+            height: Canvas height
+            palette: uint8 palette [K, 3], K <= 256
+            loop: Loop count (0 = infinite)
+            delta: Crop frames to changed regions
+            transparent_index: Palette slot reserved for unchanged pixels (delta only)
+        """
+        self.width = width
+        self.height = height
+        self.delta = delta
+        self.transparent_index = transparent_index if delta else None
+        self.frame_count = 0
+        self._previous: Optional[np.ndarray] = None
+        self._pending: Optional[list] = None
+
+        # File objects (e.g. BytesIO) are left open for the caller
+        self._owns_file = isinstance(path, str)
+        self._file = open(path, "wb") if self._owns_file else path
+        self._closed = False
+        self._write_header(palette, loop)
+
+    def _write_header(self, palette: np.ndarray, loop: int) -> None:
+        # Global colour table size is a power of two (2 to 256 entries)
+        size_bits = max(1, int(np.ceil(np.log2(max(len(palette), 2)))))
+        table = np.zeros((1 << size_bits, 3), dtype=np.uint8)
+        table[:len(palette)] = palette
+
+        self._file.write(b"GIF89a" + struct.pack("<HHBBB", self.width, self.height,
+                                                 0xF0 | (size_bits - 1), 0, 0))
+        self._file.write(table.tobytes())
+        # NETSCAPE2.0 application extension (loop count)
+        self._file.write(b"!\xff\x0bNETSCAPE2.0\x03\x01" + struct.pack("<H", loop) + b"\x00")
+
+    def write_frame(self, indices: np.ndarray, duration: int = 100) -> None:
+        """
+        Add one uint8 index frame [H, W]
+
+        Args:
+            indices: Palette indices for the full canvas
+            duration: Display time in ms
+        """
+        self.write_record(encode_frame(self._previous, indices, self.delta, self.transparent_index), duration)
+        self._previous = indices
+
+    def write_record(self, record: Optional[tuple], duration: int = 100) -> None:
+        """Add a frame already encoded by encode_frame()"""
+        if record is None:
+            # Nothing changed: show the previous frame for longer
+            self._pending[0] += duration
+            return
+
+        self._flush()
+        self._pending = [duration, *record]
+
+    def _flush(self) -> None:
+        """Write the pending frame now that its final duration is known"""
+        if self._pending is None:
+            return
+        duration, x, y, width, height, transparent, data = self._pending
+
+        # Graphics control extension: disposal, transparency flag, delay (1/100 s)
+        packed = (DISPOSAL_NONE << 2) | (1 if transparent else 0)
+        self._file.write(b"!\xf9\x04" + struct.pack("<BHB", packed, int(duration / 10),
+                                                    self.transparent_index if transparent else 0) + b"\x00")
+        # Image descriptor without a local colour table, then the LZW data
+        self._file.write(b"," + struct.pack("<HHHHB", x, y, width, height, 0))
+        self._file.write(data)
+
+        self.frame_count += 1
+        self._pending = None
+
+    def close(self) -> None:
+        """Write the last frame and the trailer"""
+        if self._closed:
+            return
+        self._flush()
+        self._file.write(b";")
+        self._closed = True
+        if self._owns_file:
+            self._file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+class GIFStreamWriter:
+    """
+    Streaming GIF sink for RGB frames.
+
+    write() accepts single frames or windows, quantizes them with a shared
+    GlobalPaletteQuantizer and appends them to the file immediately, so only
+    the current window is ever held as uint8/index data. If the quantizer has
+    no palette yet, it is fitted on the first window written.
+
+    With workers > 1, each window is split into runs that are quantized and
+    LZW-encoded in a process pool; records are written back in order, so the
+    file is byte-identical to the serial writer's.
+    """
+
+    def __init__(self, path: str, quantizer: GlobalPaletteQuantizer, loop: int = 0, delta: bool = True,
+                 workers: int = 1):
+        self.path = path
+        self.quantizer = quantizer
+        self.loop = loop
+        self.delta = delta
+        self.workers = workers or os.cpu_count() or 1
+        self.writer: Optional[GIFWriter] = None
+        self._pool: Optional[ProcessPoolExecutor] = None
+        self._last_frame: Optional[np.ndarray] = None
+
+    def _open(self, frames: np.ndarray) -> None:
+        if self.quantizer.palette is None:
+            self.quantizer.fit(frames)
+        palette = self.quantizer.palette
+
+        transparent_index = None
+        if self.delta and len(palette) < 256:
+            # Unused slot after the palette marks unchanged pixels
+            transparent_index = len(palette)
+            palette = np.concatenate([palette, np.zeros((1, 3), dtype=np.uint8)])
+
+        height, width = frames.shape[1:3]
+        self.writer = GIFWriter(self.path, width, height, palette, self.loop, self.delta, transparent_index)
+
+        if self.workers > 1:
+            # Fork keeps workers independent of how this package was imported
+            methods = multiprocessing.get_all_start_methods()
+            context = multiprocessing.get_context("fork" if "fork" in methods else None)
+            self._pool = ProcessPoolExecutor(max_workers=self.workers, mp_context=context)
+
+    def write(self, frames, duration: Union[int, List[int]] = 100) -> None:
+        """
+        Quantize and append frames
+
+        Args:
+            frames: Float [0, 1] tensor or uint8 array, [B, H, W, C] or [H, W, C]
+            duration: Frame duration in ms, or one duration per frame
+        """
+        if frames.ndim == 3:
+            frames = frames[None]
+        if not isinstance(frames, np.ndarray):
+            frames = frames_to_uint8(frames)
+        if self.writer is None:
+            self._open(frames)
+
+        durations = duration if isinstance(duration, (list, tuple)) else [duration] * len(frames)
+        if self._pool is None:
+            for frame_indices, frame_duration in zip(self.quantizer.quantize(frames), durations):
+                self.writer.write_frame(frame_indices, frame_duration)
+        else:
+            self._write_parallel(frames, durations)
+        self._last_frame = frames[-1]
+
+    def _write_parallel(self, frames: np.ndarray, durations: List[int]) -> None:
+        run_length = -(-len(frames) // self.workers)
+        futures = []
+        for start in range(0, len(frames), run_length):
+            # Each run re-quantizes the frame before it to delta against
+            previous = frames[start - 1] if start else self._last_frame
+            futures.append(self._pool.submit(
+                _encode_run, frames[start:start + run_length], previous, self.quantizer,
+                self.delta, self.writer.transparent_index))
+
+        records = [record for future in futures for record in future.result()]
+        for record, frame_duration in zip(records, durations):
+            self.writer.write_record(record, frame_duration)
+
+    @property
+    def frame_count(self) -> int:
+        return self.writer.frame_count if self.writer else 0
+
+    def close(self) -> None:
+        if self._pool is not None:
+            self._pool.shutdown()
+            self._pool = None
+        if self.writer is not None:
+            self.writer.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+def _encode_run(frames, previous_frame, quantizer, delta, transparent_index):
+    """Process pool worker: quantize and encode a run of uint8 frames"""
+    if previous_frame is not None:
+        frames = np.concatenate([previous_frame[None], frames])
+    indices = quantizer.quantize(frames)
+
+    if previous_frame is None:
+        return encode_frames(indices, None, delta, transparent_index)
+    return encode_frames(indices[1:], indices[0], delta, transparent_index)
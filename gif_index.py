@@ -0,0 +1,160 @@
+"""
+Input-directory metadata index for GIF Inpainter Studio
+Keeps frame count, size, timing, loop and palette information for every GIF
+in a directory, parsed from the block structure without decoding pixels
+"""
+
+import os
+import json
+import hashlib
+from typing import Dict, List, Optional
+
+try:
+    from .gif_decoder import parse_gif
+except ImportError:
+    from gif_decoder import parse_gif
+
+
+DEFAULT_INDEX_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "cache", "index")
+
+
+def read_gif_metadata(path: str) -> dict:
+    """
+    Collect metadata for one GIF from its headers and block structure
+
+    Returns:
+        Dictionary with frame_count, width, height, durations, loop,
+        palette_size, local_palettes and hash
+    """
+    with open(path, "rb") as f:
+        data = f.read()
+
+    structure = parse_gif(data)
+    frames = structure.frames
+    palette = structure.global_palette or (frames[0].palette if frames else None)
+
+    return {
+        "frame_count": len(frames),
+        "width": structure.width,
+        "height": structure.height,
+        "durations": [frame.duration for frame in frames],
+        "loop": structure.loop,
+        "palette_size": len(palette) // 3 if palette else 0,
+        "local_palettes": sum(1 for frame in frames if frame.palette is not None),
+        "hash": hashlib.sha1(data).hexdigest(),
+    }
+
+
+class GIFIndex:
+    """
+    Persistent, incrementally updated metadata index of a directory.
+
+    The file list is only rescanned when the directory mtime changes, and a
+    GIF is only re-parsed when its own mtime or size changes.
+    """
+
+    _instances: Dict[str, "GIFIndex"] = {}
+
+    def __init__(self, directory: str, index_path: Optional[str] = None):
+        self.directory = os.path.abspath(directory)
+        if index_path is None:
+            directory_hash = hashlib.sha1(self.directory.encode("utf-8")).hexdigest()[:16]
+            index_path = os.path.join(DEFAULT_INDEX_DIR, f"{directory_hash}.json")
+        self.index_path = index_path
+        self.directory_mtime_ns = None
+        self.entries: Dict[str, dict] = {}
+        self._load()
+
+    @classmethod
+    def for_directory(cls, directory: str) -> "GIFIndex":
+        """Shared index instance for a directory"""
+        directory = os.path.abspath(directory)
+        if directory not in cls._instances:
+            cls._instances[directory] = cls(directory)
+        return cls._instances[directory]
+
+    def _load(self) -> None:
+        try:
+            with open(self.index_path, "r", encoding="utf-8") as f:
+                stored = json.load(f)
+        except (OSError, ValueError):
+            return
+
+        if stored.get("directory") == self.directory:
+            self.directory_mtime_ns = stored.get("directory_mtime_ns")
+            self.entries = stored.get("entries", {})
+
+    def save(self) -> None:
+        """Write the index atomically"""
+        os.makedirs(os.path.dirname(self.index_path), exist_ok=True)
+        tmp_path = f"{self.index_path}.{os.getpid()}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump({
+                "directory": self.directory,
+                "directory_mtime_ns": self.directory_mtime_ns,
+                "entries": self.entries,
+            }, f)
+        os.replace(tmp_path, self.index_path)
+
+    def _update_entry(self, filename: str, stat: os.stat_result) -> bool:
+        """Re-parse a GIF if its mtime or size changed; returns True if updated"""
+        entry = self.entries.get(filename)
+        if entry and entry["mtime_ns"] == stat.st_mtime_ns and entry["size"] == stat.st_size:
+            return False
+
+        try:
+            metadata = read_gif_metadata(os.path.join(self.directory, filename))
+        except (OSError, ValueError, IndexError) as e:
+            print(f"Could not index {filename}: {e}")
+            metadata = {}
+
+        self.entries[filename] = {"mtime_ns": stat.st_mtime_ns, "size": stat.st_size, **metadata}
+        return True
+
+    def filenames(self) -> List[str]:
+        """
+        Sorted GIF filenames in the directory
+
+        The directory is only listed again when its mtime changes.
+        """
+        directory_mtime_ns = os.stat(self.directory).st_mtime_ns
+        if directory_mtime_ns != self.directory_mtime_ns:
+            names = {
+                entry.name for entry in os.scandir(self.directory)
+                if entry.name.endswith(".gif") and entry.is_file()
+            }
+            for name in set(self.entries) - names:
+                del self.entries[name]
+            for name in names - set(self.entries):
+                self.entries[name] = {"mtime_ns": None, "size": None}
+
+            self.directory_mtime_ns = directory_mtime_ns
+            self.save()
+
+        return sorted(self.entries)
+
+    def get(self, filename: str) -> dict:
+        """
+        Metadata for one GIF, re-parsed only if the file changed
+
+        Returns:
+            Metadata dictionary (see read_gif_metadata) plus mtime_ns and size
+        """
+        stat = os.stat(os.path.join(self.directory, filename))
+        if self._update_entry(filename, stat):
+            self.save()
+        return self.entries[filename]
+
+    def refresh(self) -> Dict[str, dict]:
+        """Bring metadata for every GIF up to date, parsing only changed files"""
+        changed = False
+        for filename in self.filenames():
+            try:
+                stat = os.stat(os.path.join(self.directory, filename))
+            except OSError:
+                continue
+            changed |= self._update_entry(filename, stat)
+
+        if changed:
+            self.save()
+        return self.entries
@@ -0,0 +1,342 @@
+"""
+Global-palette quantizer for GIF Inpainter Studio
+Builds one palette for a whole frame batch and maps every frame through a
+precomputed RGB lookup table, instead of quantizing frame by frame in PIL
+"""
+
+import torch
+import numpy as np
+from typing import Optional
+
+# 8x8 Bayer threshold matrix, normalized to [-0.5, 0.5)
+BAYER_8X8 = (np.array([
+    [0, 32, 8, 40, 2, 34, 10, 42],
+    [48, 16, 56, 24, 50, 18, 58, 26],
+    [12, 44, 4, 36, 14, 46, 6, 38],
+    [60, 28, 52, 20, 62, 30, 54, 22],
+    [3, 35, 11, 43, 1, 33, 9, 41],
+    [51, 19, 59, 27, 49, 17, 57, 25],
+    [15, 47, 7, 39, 13, 45, 5, 37],
+    [63, 31, 55, 23, 61, 29, 53, 21],
+], dtype=np.float32) + 0.5) / 64.0 - 0.5
+
+
+def frames_to_uint8(frames: torch.Tensor) -> np.ndarray:
+    """Float [B, H, W, C] frames in [0, 1] (or uint8 frames) to a uint8 RGB array"""
+    if frames.dtype == torch.uint8:
+        return frames[..., :3].cpu().numpy()
+    if frames.dtype == torch.float16:
+        # float16 cannot hold k/255 exactly, so round instead of truncating
+        return (frames[..., :3].float() * 255).round_().clamp_(0, 255).to(torch.uint8).cpu().numpy()
+    return (frames[..., :3] * 255).clamp_(0, 255).to(torch.uint8).cpu().numpy()
+
+
+def sample_pixels(frames: np.ndarray, max_samples: int = 262144) -> np.ndarray:
+    """
+    Strided pixel sample of a frame batch
+
+    Args:
+        frames: Array or tensor [B, H, W, C] (C >= 3)
+        max_samples: Upper bound on sampled pixels
+
+    Returns:
+        Array or tensor [N, 3] of the same dtype; only the sample is copied
+    """
+    pixels = frames.reshape(-1, frames.shape[-1])
+    step = max(1, len(pixels) // max_samples)
+    # An odd step avoids sampling the same columns when width divides it
+    if step > 1 and step % 2 == 0:
+        step += 1
+    return pixels[::step, :3]
+
+
+def _pack(rgb: np.ndarray) -> np.ndarray:
+    """Pack uint8 RGB triples [..., 3] into int32 values"""
+    return (rgb[..., 0].astype(np.int32) << 16) | (rgb[..., 1].astype(np.int32) << 8) | rgb[..., 2]
+
+
+def _nearest(points: torch.Tensor, palette: torch.Tensor, chunk: int = 65536) -> torch.Tensor:
+    """Index of the nearest palette colour for each point, in chunks"""
+    result = torch.empty(points.shape[0], dtype=torch.long)
+    for start in range(0, points.shape[0], chunk):
+        result[start:start + chunk] = torch.cdist(points[start:start + chunk], palette).argmin(dim=1)
+    return result
+
+
+def median_cut_palette(pixels: np.ndarray, colors: int = 256) -> np.ndarray:
+    """
+    Median-cut palette from sampled pixels
+
+    Args:
+        pixels: uint8 array [N, 3]
+        colors: Maximum palette size
+
+    Returns:
+        uint8 palette [K, 3] with K <= colors
+    """
+    # Few enough distinct colours (e.g. an already-paletted GIF): keep them exactly
+    unique = np.unique(_pack(pixels))
+    if len(unique) <= colors:
+        return np.stack([(unique >> 16) & 255, (unique >> 8) & 255, unique & 255], axis=1).astype(np.uint8)
+
+    def spread(box):
+        return int(np.ptp(box, axis=0).max()) * len(box) if len(box) > 1 else -1
+
+    boxes = [pixels]
+    scores = [spread(pixels)]
+    while len(boxes) < colors:
+        i = int(np.argmax(scores))
+        if scores[i] <= 0:
+            break
+        box = boxes.pop(i)
+        scores.pop(i)
+
+        # Split at the median of the widest channel
+        channel = int(np.ptp(box, axis=0).argmax())
+        half = len(box) // 2
+        order = np.argpartition(box[:, channel], half)
+        for part in (box[order[:half]], box[order[half:]]):
+            boxes.append(part)
+            scores.append(spread(part))
+
+    return np.stack([box.mean(axis=0) for box in boxes]).round().astype(np.uint8)
+
+
+def kmeans_palette(pixels: np.ndarray, colors: int = 256, iterations: int = 8) -> np.ndarray:
+    """
+    K-means palette, initialized with median cut
+
+    Args:
+        pixels: uint8 array [N, 3]
+        colors: Maximum palette size
+        iterations: Lloyd iterations
+
+    Returns:
+        uint8 palette [K, 3] with K <= colors
+    """
+    centers = torch.from_numpy(median_cut_palette(pixels, colors)).float()
+    if len(centers) < colors:
+        # Exact palette, nothing to refine
+        return centers.to(torch.uint8).numpy()
+
+    points = torch.from_numpy(pixels).float()
+    for _ in range(iterations):
+        labels = _nearest(points, centers)
+        counts = torch.bincount(labels, minlength=len(centers)).float()
+        sums = torch.zeros_like(centers).index_add_(0, labels, points)
+        # Empty clusters keep their previous centre
+        filled = counts > 0
+        centers[filled] = sums[filled] / counts[filled, None]
+
+    return centers.round().clamp(0, 255).to(torch.uint8).numpy()
+
+
+class GlobalPaletteQuantizer:
+    """
+    Shared-palette quantizer for a frame batch.
+
+    fit() builds the palette from a strided pixel sample; quantize() maps
+    frames to palette indices through a 2^(3*lut_bits) entry RGB lookup table,
+    optionally with ordered (Bayer) dithering, so the cost is a few array
+    operations per pixel regardless of the frame count. Without dithering,
+    pixels that are exactly a palette colour always map to that colour, so
+    with a source GIF's own palette (see from_palette) untouched pixels keep
+    their colour and only edited pixels are matched to their nearest colour.
+    """
+
+    METHODS = ["median_cut", "kmeans"]
+    DITHERS = ["none", "bayer"]
+
+    def __init__(self, colors: int = 256, method: str = "median_cut", dither: str = "none",
+                 lut_bits: int = 6, max_samples: int = 262144):
+        if method not in self.METHODS:
+            raise ValueError(f"Unknown quantize method: {method}")
+        if dither not in self.DITHERS:
+            raise ValueError(f"Unknown dither: {dither}")
+        self.colors = max(2, min(256, colors))
+        self.method = method
+        self.dither = dither
+        self.lut_bits = lut_bits
+        self.max_samples = max_samples
+        self.palette: Optional[np.ndarray] = None
+        self.lut: Optional[np.ndarray] = None
+        self.fixed = False
+        self._shared_bins: Optional[np.ndarray] = None
+        self._packed_sorted: Optional[np.ndarray] = None
+        self._packed_order: Optional[np.ndarray] = None
+        self._refine_bins: Optional[np.ndarray] = None
+
+    @classmethod
+    def from_palette(cls, palette: np.ndarray, dither: str = "none") -> "GlobalPaletteQuantizer":
+        """
+        Quantizer for a fixed palette, e.g. the source GIF's
+
+        Args:
+            palette: uint8 palette [K, 3]; duplicate colours are merged
+            dither: Dither mode for quantize()
+
+        Returns:
+            Quantizer whose fit() keeps this palette
+
+        Raises:
+            ValueError: If the palette has more than 256 distinct colours
+        """
+        colors = len(np.unique(palette, axis=0))
+        if colors > 256:
+            raise ValueError(f"Palette has {colors} distinct colours, a GIF can hold 256")
+        quantizer = cls(colors, dither=dither)
+        quantizer.set_palette(palette, exact=True)
+        quantizer.fixed = True
+        return quantizer
+
+    def fit(self, frames) -> np.ndarray:
+        """
+        Build the palette and lookup table from uint8 frames [B, H, W, 3]
+        (or float [0, 1] frame tensors, converting only the sample)
+
+        Returns:
+            uint8 palette [K, 3]
+        """
+        if self.fixed:
+            return self.palette
+        pixels = sample_pixels(frames, self.max_samples)
+        if isinstance(pixels, torch.Tensor):
+            pixels = frames_to_uint8(pixels)
+        if self.method == "kmeans":
+            palette = kmeans_palette(pixels, self.colors)
+        else:
+            palette = median_cut_palette(pixels, self.colors)
+        return self.set_palette(palette)
+
+    def set_palette(self, palette: np.ndarray, exact: bool = False) -> np.ndarray:
+        """
+        Use a given uint8 palette [K, 3] and build its lookup table
+
+        Args:
+            palette: uint8 palette [K, 3]
+            exact: Map every pixel to its true nearest colour. The table holds
+                the colour nearest to each bin's centre; with exact, quantize()
+                matches pixels in bins where that can be wrong against the
+                whole palette, once per distinct colour
+        """
+        # Duplicate entries would only waste palette slots
+        _, first = np.unique(palette, axis=0, return_index=True)
+        self.palette = np.ascontiguousarray(palette[np.sort(first)], dtype=np.uint8)
+
+        # Nearest palette entry for the centre of every RGB bin
+        bits = self.lut_bits
+        shift = 8 - bits
+        levels = (np.arange(1 << bits, dtype=np.float32) * (1 << shift)) + ((1 << shift) - 1) / 2.0
+        grid = np.stack(np.meshgrid(levels, levels, levels, indexing="ij"), axis=-1).reshape(-1, 3)
+        self.lut = _nearest(torch.from_numpy(grid), torch.from_numpy(self.palette).float()).to(torch.uint8).numpy()
+
+        # Each palette colour owns its own bin, so exact colours map to themselves
+        binned = self.palette.astype(np.int32) >> shift
+        own_bins = (binned[:, 0] << (2 * bits)) | (binned[:, 1] << bits) | binned[:, 2]
+        self.lut[own_bins] = np.arange(len(self.palette), dtype=np.uint8)
+
+        # Bins holding several palette colours need an exact lookup
+        shared = np.bincount(own_bins, minlength=len(self.lut)) > 1
+        self._shared_bins = shared if shared.any() else None
+        packed = _pack(self.palette)
+        self._packed_order = np.argsort(packed).astype(np.uint8)
+        self._packed_sorted = packed[self._packed_order]
+
+        self._refine_bins = self._ambiguous_bins() if exact else None
+        return self.palette
+
+    def _ambiguous_bins(self) -> np.ndarray:
+        """
+        Table bins where some RGB value is nearer to another colour than to the entry
+
+        A colour can be nearest inside a bin only if its distance to the bin's
+        box is at most the smallest distance any colour has to the box's
+        farthest corner; a bin is ambiguous if more than one colour passes.
+        Both distances are sums of per-channel terms, so they are built one red
+        level at a time.
+
+        Returns:
+            bool array over the table's bins
+        """
+        bits = self.lut_bits
+        levels = 1 << bits
+        low = (torch.arange(levels, dtype=torch.int32) << (8 - bits))[:, None]
+        high = low + ((1 << (8 - bits)) - 1)
+        palette = torch.from_numpy(self.palette.astype(np.int32))
+
+        # Per-channel squared distances [3, levels, K] from each bin level to each colour
+        nearest = torch.stack([torch.maximum(low - channel, channel - high).clamp_min(0) ** 2
+                               for channel in palette.T])
+        farthest = torch.stack([torch.maximum(channel - low, high - channel) ** 2 for channel in palette.T])
+
+        ambiguous = torch.empty(levels, levels * levels, dtype=torch.bool)
+        for red in range(levels):
+            near = nearest[0, red] + nearest[1][:, None] + nearest[2][None]
+            bound = (farthest[0, red] + farthest[1][:, None] + farthest[2][None]).amin(dim=-1, keepdim=True)
+            ambiguous[red] = (near <= bound).sum(dim=-1).reshape(-1) > 1
+        return ambiguous.reshape(-1).numpy()
+
+    def _nearest_colors(self, colors: np.ndarray) -> np.ndarray:
+        """True nearest palette index of each uint8 colour [N, 3]"""
+        packed = _pack(colors)
+        # Palette colours (e.g. untouched source pixels) by exact lookup
+        pos = np.searchsorted(self._packed_sorted, packed).clip(max=len(self._packed_sorted) - 1)
+        exact = self._packed_sorted[pos] == packed
+        result = self._packed_order[pos]
+
+        rest = np.nonzero(~exact)[0]
+        if rest.size:
+            # Each distinct colour is matched once
+            unique, inverse = np.unique(packed[rest], return_inverse=True)
+            rgb = np.stack([unique >> 16, (unique >> 8) & 255, unique & 255], axis=-1)
+            nearest = _nearest(torch.from_numpy(rgb).float(), torch.from_numpy(self.palette).float())
+            result[rest] = nearest.to(torch.uint8).numpy()[inverse]
+        return result
+
+    def quantize(self, frames: np.ndarray, chunk_frames: int = 16) -> np.ndarray:
+        """
+        Map uint8 frames [B, H, W, 3] to palette indices
+
+        Returns:
+            uint8 index array [B, H, W]
+        """
+        if self.lut is None:
+            self.fit(frames)
+
+        bits = self.lut_bits
+        shift = 8 - bits
+        batch, height, width = frames.shape[:3]
+        indices = np.empty((batch, height, width), dtype=np.uint8)
+
+        if self.dither == "bayer":
+            # Threshold offsets scaled to the typical spacing between palette colours
+            spacing = 255.0 / len(self.palette) ** (1.0 / 3.0)
+            tiles = np.tile(BAYER_8X8, ((height + 7) // 8, (width + 7) // 8))[:height, :width]
+            offsets = np.rint(tiles * spacing).astype(np.int16)[None, :, :, None]
+
+        for start in range(0, batch, chunk_frames):
+            chunk = frames[start:start + chunk_frames, :, :, :3]
+            if self.dither == "bayer":
+                chunk = np.clip(chunk.astype(np.int16) + offsets, 0, 255).astype(np.uint8)
+            binned = chunk >> shift
+            lut_index = ((binned[..., 0].astype(np.int32) << (2 * bits))
+                         | (binned[..., 1].astype(np.int32) << bits)
+                         | binned[..., 2])
+            mapped = self.lut[lut_index]
+
+            if self._refine_bins is not None:
+                refine = np.nonzero(self._refine_bins[lut_index])
+                if refine[0].size:
+                    mapped[refine] = self._nearest_colors(chunk[refine])
+            elif self._shared_bins is not None and self.dither == "none":
+                shared = np.nonzero(self._shared_bins[lut_index])
+                if shared[0].size:
+                    mapped[shared] = self._exact_or(_pack(chunk[shared]), mapped[shared])
+            indices[start:start + chunk_frames] = mapped
+
+        return indices
+
+    def _exact_or(self, packed: np.ndarray, fallback: np.ndarray) -> np.ndarray:
+        """Palette index of each packed colour that is in the palette, else fallback"""
+        pos = np.searchsorted(self._packed_sorted, packed).clip(max=len(self._packed_sorted) - 1)
+        return np.where(self._packed_sorted[pos] == packed, self._packed_order[pos], fallback)
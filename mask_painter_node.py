@@ -10,6 +10,12 @@ import base64
 import io
 import json
 
+try:
+    from .utils import float_frames_input
+except ImportError:
+    from utils import float_frames_input
+
+
 class ManualMaskPainter:
     """
     Node that allows manual mask painting in ComfyUI.
@@ -289,6 +295,7 @@ class ImageToMask:
     FUNCTION = "image_to_mask"
     CATEGORY = "GifInpaint"
     
+    @float_frames_input("image")
     def image_to_mask(self, image, channel, invert):
         """Convert image to mask based on selected channel."""
         
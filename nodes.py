@@ -9,48 +9,283 @@ import io
 import folder_paths
 import os
 
+from .batch_filters import CHUNK_FRAMES, color_distance_mask, edge_mask, gaussian_blur, max_filter
+from .frame_cache import FrameCache
+from .frame_stream import GIFFrameStream
+from .gif_budget import SizeBudgetSearch
+from .gif_decoder import IndexedFrames, IndexedGIFDecoder
+from .gif_index import GIFIndex
+from .gif_quantizer import GlobalPaletteQuantizer, frames_to_uint8
+from .output_backends import OUTPUT_BACKENDS, parse_formats
+from .packed_masks import PackedMasks, pack_frames
+from .utils import (FRAME_DTYPES, box_reduce_frames, crop_windows, crop_windows_for_boxes, deduplicate_frames, float_frames_input,
+                    get_bounding_box, get_bounding_boxes, map_mask_planes, mask_plane, merge_frame_runs,
+                    paste_windows, resize_frames, resize_masks, static_mask, to_float_frames, to_frame_dtype)
+
 
 class LoadGIF:
     """
     Load animated GIF and extract frames as batch
     """
     
+    # Shared across instances so repeated queue runs hit the same cache
+    frame_cache = FrameCache()
+    
     @classmethod
     def INPUT_TYPES(cls):
         input_dir = folder_paths.get_input_directory()
-        files = [f for f in os.listdir(input_dir) if f.endswith('.gif')]
+        files = GIFIndex.for_directory(input_dir).filenames()
         return {
             "required": {
-                "gif": (sorted(files), {"image_upload": True}),
+                "gif": (files, {"image_upload": True}),
+            },
+            "optional": {
+                "use_cache": ("BOOLEAN", {"default": True}),
+                # Decode processes for long clips (1 = serial, 0 = one per CPU core)
+                "decode_workers": ("INT", {"default": 1, "min": 0, "max": 256}),
+                # uint8 / float16 frames use 1/4 / 1/2 the memory; convert before nodes that need float32
+                "frame_dtype": (list(FRAME_DTYPES), {"default": "float32"}),
             },
         }
     
-    RETURN_TYPES = ("IMAGE", "INT", "INT", "INT")
-    RETURN_NAMES = ("frames", "frame_count", "width", "height")
+    RETURN_TYPES = ("IMAGE", "INT", "INT", "INT", "GIF_PALETTE", "GIF_DURATIONS")
+    RETURN_NAMES = ("frames", "frame_count", "width", "height", "palette", "durations")
     FUNCTION = "load_gif"
     CATEGORY = "GifInpaint"
     
-    def load_gif(self, gif):
+    def load_gif(self, gif, use_cache=True, decode_workers=1, frame_dtype="float32"):
+        input_dir = folder_paths.get_input_directory()
+        gif_path = os.path.join(input_dir, gif)
+        
+        frames = indexed = None
+        cached = False
+        if use_cache:
+            cache_key = self.cache_key(gif)
+            # Warm load: memory-mapped uint8 frames, no PIL decode
+            frames = self.frame_cache.load(cache_key)
+            indexed = self.load_cached_indexed(cache_key)
+            cached = frames is not None and (indexed is not None or self.cached_without_indices(cache_key))
+        
+        if not cached:
+            frames, indexed = self.decode_frames(gif_path, decode_workers)
+            if use_cache:
+                self.frame_cache.store(cache_key, frames)
+                if indexed is not None:
+                    self.frame_cache.store(f"{cache_key}_indices", indexed.indices)
+                    self.frame_cache.store(f"{cache_key}_palette", indexed.palette)
+                else:
+                    # PIL fallback: an empty palette records that there are no indices to cache
+                    self.frame_cache.store(f"{cache_key}_palette", np.zeros((0, 3), dtype=np.uint8))
+        
+        # uint8 frames are passed on without a copy; float dtypes are normalized to [0, 1]
+        frames_tensor = to_frame_dtype(torch.from_numpy(frames), frame_dtype)
+        
+        frame_count, height, width = frames.shape[:3]
+        durations = self.frame_durations(gif, frame_count)
+        
+        return (frames_tensor, frame_count, width, height, indexed, durations)
+    
+    def cache_key(self, gif):
+        """Frame-cache key, reusing the content hash from the metadata index"""
+        input_dir = folder_paths.get_input_directory()
+        metadata = GIFIndex.for_directory(input_dir).get(gif)
+        return self.frame_cache.key(os.path.join(input_dir, gif), metadata.get("hash"))
+    
+    def load_cached_indexed(self, cache_key):
+        """Cached palette indices and palette, or None on a miss"""
+        indices = self.frame_cache.load(f"{cache_key}_indices")
+        palette = self.frame_cache.load(f"{cache_key}_palette")
+        if indices is None or palette is None:
+            return None
+        return IndexedFrames(indices, palette)
+    
+    def frame_durations(self, gif, frame_count):
+        """Per-frame durations in ms, from the metadata index (PIL if it has none for this GIF)"""
+        input_dir = folder_paths.get_input_directory()
+        durations = GIFIndex.for_directory(input_dir).get(gif).get("durations")
+        if durations is None or len(durations) != frame_count:
+            with Image.open(os.path.join(input_dir, gif)) as img:
+                durations = [frame.info.get("duration", 100) for frame in ImageSequence.Iterator(img)]
+        return list(durations)
+    
+    def cached_without_indices(self, cache_key):
+        """Whether the cached frames came from the PIL fallback, which has no indices"""
+        palette = self.frame_cache.load(f"{cache_key}_palette")
+        return palette is not None and len(palette) == 0
+    
+    @staticmethod
+    def decode_frames(gif_path, workers=1):
+        """
+        Decode all frames of a GIF
+        
+        Frames are composited as palette indices and expanded to RGB with one
+        lookup over the whole clip; GIFs the indexed decoder cannot parse fall
+        back to PIL's per-frame conversion.
+        
+        Args:
+            gif_path: GIF file path
+            workers: Decode processes (1 = serial, 0 = one per CPU core)
+        
+        Returns:
+            (uint8 array [B, H, W, 3], IndexedFrames or None)
+        """
+        try:
+            indexed = IndexedGIFDecoder.from_file(gif_path).decode(workers)
+            return indexed.to_rgb(), indexed
+        except (ValueError, OSError, IndexError) as e:
+            print(f"Indexed GIF decode failed ({e}), falling back to PIL")
+        
+        with Image.open(gif_path) as img:
+            frames = [
+                # Convert to RGB (GIFs might be in palette mode)
+                np.asarray(frame.convert("RGB"))
+                for frame in ImageSequence.Iterator(img)
+            ]
+        
+        return np.stack(frames), None
+
+
+class LoadGIFProxy(LoadGIF):
+    """
+    Load a downscaled proxy of an animated GIF for fast mask tuning.
+    Each proxy pixel is the average of a reduce x reduce block, so proxy
+    masks line up when upscaled. Frames are expanded to RGB and averaged a
+    chunk at a time, so the full-size clip is never held as RGB or float.
+    """
+    
+    @classmethod
+    def INPUT_TYPES(cls):
+        input_types = LoadGIF.INPUT_TYPES()
+        input_types["required"]["reduce"] = ("INT", {"default": 4, "min": 1, "max": 16})
+        return input_types
+    
+    RETURN_TYPES = ("IMAGE", "INT", "INT", "INT")
+    RETURN_NAMES = ("proxy_frames", "frame_count", "width", "height")
+    FUNCTION = "load_proxy"
+    
+    def load_proxy(self, gif, reduce=4, use_cache=True, decode_workers=1, frame_dtype="float32"):
         input_dir = folder_paths.get_input_directory()
         gif_path = os.path.join(input_dir, gif)
         
-        img = Image.open(gif_path)
-        frames = []
+        proxy = None
+        if use_cache:
+            # Full-size indices from an earlier Load GIF run: average straight from the memmap
+            indexed = self.load_cached_indexed(self.cache_key(gif))
+            if indexed is not None:
+                height, width = indexed.indices.shape[1:3]
+                proxy = self.reduce_rgb((np.take(indexed.palette, canvas, axis=0) for canvas in indexed.indices),
+                                        reduce)
         
-        for frame in ImageSequence.Iterator(img):
-            # Convert to RGB (GIFs might be in palette mode)
-            frame_rgb = frame.convert("RGB")
-            # Convert to numpy array and normalize to [0, 1]
-            frame_np = np.array(frame_rgb).astype(np.float32) / 255.0
-            frames.append(frame_np)
+        if proxy is None:
+            try:
+                decoder = IndexedGIFDecoder.from_file(gif_path)
+                height, width = decoder.structure.height, decoder.structure.width
+                if decode_workers == 1:
+                    # Canvases are averaged as they are composited
+                    canvases = decoder.iter_indices()
+                else:
+                    canvases = decoder.decode(decode_workers).indices
+                proxy = self.reduce_rgb((np.take(decoder.palette, canvas, axis=0) for canvas in canvases), reduce)
+            except (ValueError, OSError, IndexError) as e:
+                print(f"Indexed GIF decode failed ({e}), falling back to PIL")
         
-        # Stack frames into batch tensor [B, H, W, C]
-        frames_tensor = torch.from_numpy(np.stack(frames))
+        if proxy is None:
+            with Image.open(gif_path) as img:
+                width, height = img.size
+                proxy = self.reduce_rgb((np.asarray(frame.convert("RGB")) for frame in ImageSequence.Iterator(img)),
+                                        reduce)
+        
+        # width/height are the full-size dimensions, for upscaling proxy masks
+        proxy_tensor = to_frame_dtype(proxy, frame_dtype)
+        
+        return (proxy_tensor, proxy.shape[0], width, height)
+    
+    @staticmethod
+    def reduce_rgb(frames, reduce):
+        """Box-average uint8 RGB frames [H, W, 3] from an iterable, CHUNK_FRAMES at a time"""
+        chunks, chunk = [], []
+        for frame in frames:
+            chunk.append(frame)
+            if len(chunk) == CHUNK_FRAMES:
+                chunks.append(box_reduce_frames(torch.from_numpy(np.stack(chunk)), reduce))
+                chunk = []
+        if chunk:
+            chunks.append(box_reduce_frames(torch.from_numpy(np.stack(chunk)), reduce))
+        return torch.cat(chunks)
+
+
+class LoadGIFStream:
+    """
+    Open animated GIF as a lazily decoded frame stream.
+    Frames are decoded window by window by the nodes consuming the stream,
+    so memory use is bounded by the window size rather than the clip length.
+    """
+    
+    @classmethod
+    def INPUT_TYPES(cls):
+        input_types = LoadGIF.INPUT_TYPES()
+        del input_types["optional"]
+        input_types["required"]["window_size"] = ("INT", {"default": 16, "min": 1, "max": 1024})
+        return input_types
+    
+    RETURN_TYPES = ("GIF_STREAM", "INT", "INT", "INT")
+    RETURN_NAMES = ("frame_stream", "frame_count", "width", "height")
+    FUNCTION = "load_stream"
+    CATEGORY = "GifInpaint/Stream"
+    
+    def load_stream(self, gif, window_size=16):
+        input_dir = folder_paths.get_input_directory()
+        gif_path = os.path.join(input_dir, gif)
         
-        frame_count = len(frames)
-        height, width = frames[0].shape[:2]
+        stream = GIFFrameStream(gif_path, window_size=window_size)
         
-        return (frames_tensor, frame_count, width, height)
+        return (stream, stream.frame_count, stream.width, stream.height)
+
+
+class CollectStream:
+    """
+    Materialize a frame range of a stream as a regular batch
+    """
+    
+    @classmethod
+    def INPUT_TYPES(cls):
+        return {
+            "required": {
+                "frame_stream": ("GIF_STREAM",),
+                "start_frame": ("INT", {"default": 0, "min": 0, "max": 10000}),
+                "end_frame": ("INT", {"default": -1, "min": -1, "max": 10000}),
+            },
+        }
+    
+    RETURN_TYPES = ("IMAGE", "INT")
+    RETURN_NAMES = ("frames", "frame_count")
+    FUNCTION = "collect"
+    CATEGORY = "GifInpaint/Stream"
+    
+    def collect(self, frame_stream, start_frame=0, end_frame=-1):
+        frames = frame_stream.collect(start_frame, end_frame)
+        return (frames, frames.shape[0])
+
+
+class CollectMaskStream(CollectStream):
+    """
+    Materialize a frame range of a mask stream as a regular mask batch
+    """
+    
+    @classmethod
+    def INPUT_TYPES(cls):
+        input_types = CollectStream.INPUT_TYPES()
+        input_types["required"] = {"mask_stream": ("MASK_STREAM",), **{
+            k: v for k, v in input_types["required"].items() if k != "frame_stream"
+        }}
+        return input_types
+    
+    RETURN_TYPES = ("MASK", "INT")
+    RETURN_NAMES = ("masks", "frame_count")
+    FUNCTION = "collect_masks"
+    
+    def collect_masks(self, mask_stream, start_frame=0, end_frame=-1):
+        return self.collect(mask_stream, start_frame, end_frame)
 
 
 class SaveGIF:
@@ -68,6 +303,30 @@ class SaveGIF:
                 "loop": ("INT", {"default": 0, "min": 0, "max": 100}),
                 "optimize": ("BOOLEAN", {"default": True}),
             },
+            "optional": {
+                # From Frame Deduplicator: rebuild the original timing
+                "frame_map": ("FRAME_MAP",),
+                # From Load GIF: per-frame durations of the source (replace duration)
+                "durations": ("GIF_DURATIONS",),
+                # From Load GIF: write with the source palette instead of fitting a new one
+                "palette": ("GIF_PALETTE",),
+                # "global" builds one palette for the whole batch; "pil" quantizes each frame
+                "quantizer": (["global", "pil"], {"default": "global"}),
+                "colors": ("INT", {"default": 256, "min": 2, "max": 256}),
+                "quantize_method": (GlobalPaletteQuantizer.METHODS, {"default": "median_cut"}),
+                "dither": (GlobalPaletteQuantizer.DITHERS, {"default": "none"}),
+                # Global quantizer only: write just the changed region of each frame
+                "delta_encode": ("BOOLEAN", {"default": True}),
+                # Quantize/encode processes (1 = serial, 0 = one per CPU core)
+                "encode_workers": ("INT", {"default": 1, "min": 0, "max": 256}),
+                # Comma-separated, all written from one pass: gif, webp, apng
+                "formats": ("STRING", {"default": "gif"}),
+                "webp_quality": ("INT", {"default": 90, "min": 0, "max": 100}),
+                "webp_lossless": ("BOOLEAN", {"default": False}),
+                # Global-quantizer GIF: search colours/dither/frame drop for the best fit (0 = off),
+                # starting from palette (or colors), dither, delta_encode and encode_workers above
+                "max_bytes": ("INT", {"default": 0, "min": 0, "max": 1 << 30, "step": 1024}),
+            },
         }
     
     RETURN_TYPES = ()
@@ -75,39 +334,200 @@ class SaveGIF:
     OUTPUT_NODE = True
     CATEGORY = "GifInpaint"
     
-    def save_gif(self, frames, filename_prefix="inpainted", duration=100, loop=0, optimize=True):
-        output_dir = folder_paths.get_output_directory()
+    # Frames converted to uint8 and quantized per step of the global-palette writer
+    WRITE_WINDOW = 16
+    
+    def save_gif(self, frames, filename_prefix="inpainted", duration=100, loop=0, optimize=True, frame_map=None,
+                 durations=None, **options):
+        frame_indices, durations = self.frame_timing(frames.shape[0], duration, frame_map, durations)
         
-        # Convert tensor frames to PIL Images
-        pil_frames = []
-        for frame in frames:
-            # Convert from [H, W, C] tensor to numpy array
-            frame_np = frame.cpu().numpy()
-            # Denormalize from [0, 1] to [0, 255]
-            frame_np = (frame_np * 255).astype(np.uint8)
-            pil_frame = Image.fromarray(frame_np)
-            pil_frames.append(pil_frame)
+        max_bytes = options.pop("max_bytes", 0)
+        formats = parse_formats(options.pop("formats", "gif"))
+        budget_result = None
+        if max_bytes > 0 and "gif" in formats and options.get("quantizer", "global") == "global":
+            formats.remove("gif")
+            budget_result = self.write_budget_gif(frames, frame_indices, durations, filename_prefix, loop, max_bytes,
+                                                  **options)
+            if not formats:
+                return budget_result
+        
+        # Windows of uint8 frames (one per worker) shared by every output format
+        step = self.WRITE_WINDOW * (options.get("encode_workers", 1) or os.cpu_count() or 1)
+        windows = (
+            (frames_to_uint8(frames[frame_indices[start:start + step]]), durations[start:start + step])
+            for start in range(0, len(frame_indices), step)
+        )
+        
+        # The global palette comes from a strided sample of the whole batch
+        result = self.write_outputs(windows, filename_prefix, loop, optimize, fit_frames=frames,
+                                    formats=",".join(formats), **options)
+        if budget_result is not None:
+            budget_result["ui"]["gifs"] += result["ui"]["gifs"]
+            return budget_result
+        return result
+    
+    @staticmethod
+    def frame_timing(frame_count, duration, frame_map=None, durations=None):
+        """
+        Frames to write and their durations
+        
+        Source frame durations come from the durations input, else from the
+        frame map, else duration for every frame. With a frame map, each run
+        of repeats of one unique frame is written as one longer frame.
+        
+        Returns:
+            (frame_indices, durations in ms)
+        
+        Raises:
+            ValueError: If the durations do not match the source frame count
+        """
+        source_count = len(frame_map["index_map"]) if frame_map is not None else frame_count
+        if durations is None and frame_map is not None:
+            durations = frame_map["durations"]
+        if durations is None:
+            durations = [duration] * source_count
+        elif len(durations) != source_count:
+            raise ValueError(f"Got {len(durations)} durations for {source_count} source frames")
+        
+        if frame_map is None:
+            return list(range(frame_count)), list(durations)
+        # Deduplicated frames: each run of repeats becomes one longer frame
+        return merge_frame_runs(frame_map["index_map"], durations)
+    
+    def write_budget_gif(self, frames, frame_indices, durations, filename_prefix, loop, max_bytes, palette=None,
+                         colors=256, quantize_method="median_cut", dither="none", delta_encode=True, encode_workers=1,
+                         **options):
+        """
+        Write the best-quality GIF that fits max_bytes
+        
+        The source palette (or colors), dither, delta_encode and encode_workers
+        are the starting point of the search; see SizeBudgetSearch.
+        
+        Returns:
+            Node UI result with the file and the chosen settings
+        """
+        # The clip, palettes and quantized indices live only for this call; encoded sizes are kept per clip
+        search = SizeBudgetSearch(frames_to_uint8(frames[frame_indices]), durations, loop, quantize_method,
+                                  max_colors=colors, dither=dither, source=self.source_quantizer(palette, dither),
+                                  delta=None if delta_encode else False,
+                                  workers=encode_workers or os.cpu_count() or 1)
+        setting, delta, data, fits = search.search(max_bytes)
+        filename, filepath = self.next_output_path(filename_prefix)
+        with open(filepath, "wb") as f:
+            f.write(data)
+        
+        summary = (f"colors={setting.colors}, dither={setting.dither}, frame_step={setting.frame_step}, "
+                   f"delta={delta}: {len(data)} bytes "
+                   f"({'within' if fits else 'OVER'} budget of {max_bytes})")
+        
+        return {"ui": {"gifs": [{"filename": filename, "type": "output"}], "text": [summary]}}
+    
+    def write_outputs(self, windows, filename_prefix, loop, optimize, fit_frames=None, formats="gif",
+                      palette=None, quantizer="global", colors=256, quantize_method="median_cut", dither="none",
+                      delta_encode=True, encode_workers=1, webp_quality=90, webp_lossless=False):
+        """
+        Feed (uint8 frames, durations) windows to one backend per requested format
+        
+        Returns:
+            Node UI result listing the written files
+        """
+        outputs = []
+        try:
+            for name in parse_formats(formats):
+                if name == "gif" and quantizer == "pil":
+                    name = "gif_pil"
+                backend_class = OUTPUT_BACKENDS[name]
+                filename, filepath = self.next_output_path(filename_prefix, backend_class.extension)
+                
+                if name == "gif":
+                    palette_quantizer = self.source_quantizer(palette, dither)
+                    if palette_quantizer is None:
+                        palette_quantizer = self.make_quantizer(colors, quantize_method, dither, delta_encode)
+                    if fit_frames is not None:
+                        palette_quantizer.fit(fit_frames)
+                    backend = backend_class(filepath, loop, palette_quantizer, delta_encode, encode_workers)
+                elif name == "gif_pil":
+                    backend = backend_class(filepath, loop, optimize=optimize)
+                elif name == "webp":
+                    backend = backend_class(filepath, loop, quality=webp_quality, lossless=webp_lossless)
+                else:
+                    backend = backend_class(filepath, loop)
+                outputs.append((filename, backend))
+            
+            for frames, durations in windows:
+                for _, backend in outputs:
+                    backend.write(frames, durations)
+        finally:
+            for _, backend in outputs:
+                backend.close()
+        
+        return {"ui": {"gifs": [{"filename": filename, "type": "output"} for filename, _ in outputs]}}
+    
+    @staticmethod
+    def make_quantizer(colors, quantize_method, dither, delta_encode):
+        if delta_encode:
+            # Keep a palette slot free for the transparent "unchanged" index
+            colors = min(colors, 255)
+        return GlobalPaletteQuantizer(colors, quantize_method, dither)
+    
+    @staticmethod
+    def source_quantizer(palette, dither):
+        """Quantizer mapping onto the source GIF's palette, or None if it cannot be used"""
+        if palette is None:
+            return None
+        try:
+            return GlobalPaletteQuantizer.from_palette(palette.palette, dither)
+        except ValueError as e:
+            # Local palettes can add up to more colours than one global table holds
+            print(f"Source palette not used ({e}), fitting a new palette")
+            return None
+    
+    @staticmethod
+    def next_output_path(filename_prefix, extension="gif"):
+        output_dir = folder_paths.get_output_directory()
         
         # Generate filename
         counter = 1
         while True:
-            filename = f"{filename_prefix}_{counter:04d}.gif"
+            filename = f"{filename_prefix}_{counter:04d}.{extension}"
             filepath = os.path.join(output_dir, filename)
             if not os.path.exists(filepath):
-                break
+                return filename, filepath
             counter += 1
-        
-        # Save as animated GIF
-        pil_frames[0].save(
-            filepath,
-            save_all=True,
-            append_images=pil_frames[1:],
-            duration=duration,
-            loop=loop,
-            optimize=optimize
+
+
+class SaveGIFStream(SaveGIF):
+    """
+    Save a GIF stream, converting frames window by window
+    """
+    
+    @classmethod
+    def INPUT_TYPES(cls):
+        # Same quantizer and format options as Save GIF; frame maps, per-frame durations
+        # and the size budget need the whole batch
+        optional = {k: v for k, v in SaveGIF.INPUT_TYPES()["optional"].items()
+                    if k not in ("frame_map", "durations", "max_bytes")}
+        return {
+            "required": {
+                "frame_stream": ("GIF_STREAM",),
+                "filename_prefix": ("STRING", {"default": "inpainted"}),
+                "duration": ("INT", {"default": 100, "min": 10, "max": 1000, "step": 10}),
+                "loop": ("INT", {"default": 0, "min": 0, "max": 100}),
+                "optimize": ("BOOLEAN", {"default": True}),
+            },
+            "optional": optional,
+        }
+    
+    FUNCTION = "save_stream"
+    
+    def save_stream(self, frame_stream, filename_prefix="inpainted", duration=100, loop=0, optimize=True, **options):
+        windows = (
+            (frames_to_uint8(window), [duration] * window.shape[0])
+            for _, window in frame_stream.windows()
         )
         
-        return {"ui": {"gifs": [{"filename": filename, "type": "output"}]}}
+        # Each window is written as it arrives; the global palette is fitted on the first window
+        return self.write_outputs(windows, filename_prefix, loop, optimize, **options)
 
 
 class GIFFrameSelector:
@@ -162,6 +582,14 @@ class BatchMaskGenerator:
                 "width": ("INT", {"default": 100, "min": 1, "max": 4096}),
                 "height": ("INT", {"default": 100, "min": 1, "max": 4096}),
                 "feather": ("INT", {"default": 0, "min": 0, "max": 100}),
+                # color_range: key colour and RGB distance
+                "red": ("FLOAT", {"default": 0.0, "min": 0.0, "max": 1.0, "step": 0.01}),
+                "green": ("FLOAT", {"default": 1.0, "min": 0.0, "max": 1.0, "step": 0.01}),
+                "blue": ("FLOAT", {"default": 0.0, "min": 0.0, "max": 1.0, "step": 0.01}),
+                "tolerance": ("FLOAT", {"default": 0.2, "min": 0.0, "max": 1.0, "step": 0.01}),
+                # edge_detection: hysteresis thresholds on Sobel magnitude (full step edge = 1)
+                "edge_low": ("FLOAT", {"default": 0.1, "min": 0.0, "max": 1.5, "step": 0.01}),
+                "edge_high": ("FLOAT", {"default": 0.3, "min": 0.0, "max": 1.5, "step": 0.01}),
             },
         }
     
@@ -169,20 +597,24 @@ class BatchMaskGenerator:
     FUNCTION = "generate_mask"
     CATEGORY = "GifInpaint"
     
-    def generate_mask(self, frames, mask_type, mask=None, x=0, y=0, width=100, height=100, feather=0):
+    def generate_mask(self, frames, mask_type, mask=None, x=0, y=0, width=100, height=100, feather=0,
+                      red=0.0, green=1.0, blue=0.0, tolerance=0.2, edge_low=0.1, edge_high=0.3, packed=False):
         batch_size, h, w, _ = frames.shape
         
+        # Frame-invariant masks are built as one plane and expanded as a view
         if mask_type == "manual" and mask is not None:
             # Use provided mask for all frames
             if mask.dim() == 2:
                 # Single mask, broadcast to all frames
-                masks = mask.unsqueeze(0).repeat(batch_size, 1, 1)
+                masks = static_mask(mask, batch_size)
+            elif mask.shape[0] == 1:
+                masks = static_mask(mask[0], batch_size)
             else:
                 masks = mask
         
         elif mask_type == "center_box":
             # Create box mask in center or at specified position
-            masks = torch.zeros((batch_size, h, w))
+            plane = torch.zeros((h, w))
             
             # Clamp coordinates
             x1 = max(0, min(x, w))
@@ -190,33 +622,91 @@ class BatchMaskGenerator:
             x2 = max(0, min(x + width, w))
             y2 = max(0, min(y + height, h))
             
-            masks[:, y1:y2, x1:x2] = 1.0
+            plane[y1:y2, x1:x2] = 1.0
             
-            # Apply feathering if requested
+            # Apply feathering if requested (once, on the shared plane)
             if feather > 0:
-                from scipy.ndimage import gaussian_filter
-                for i in range(batch_size):
-                    masks[i] = torch.from_numpy(
-                        gaussian_filter(masks[i].numpy(), sigma=feather)
-                    )
+                plane = gaussian_blur(plane, feather)
+            
+            masks = static_mask(plane, batch_size)
         
         elif mask_type == "color_range":
-            # Simple edge-based mask (fallback)
-            masks = torch.zeros((batch_size, h, w))
-            masks[:, h//4:3*h//4, w//4:3*w//4] = 1.0
+            # Colour key over the whole batch
+            if packed:
+                # Packed chunk by chunk, never holding float masks for the whole clip
+                return (pack_frames(lambda chunk: color_distance_mask(chunk, (red, green, blue), tolerance), frames),)
+            masks = color_distance_mask(frames, (red, green, blue), tolerance)
+        
+        elif mask_type == "edge_detection":
+            # Sobel edges with hysteresis, batched
+            if packed:
+                return (pack_frames(lambda chunk: edge_mask(chunk, edge_low, edge_high), frames),)
+            masks = edge_mask(frames, edge_low, edge_high)
         
         else:
             # Default: small center box
-            masks = torch.zeros((batch_size, h, w))
+            plane = torch.zeros((h, w))
             center_x, center_y = w // 2, h // 2
             box_size = min(w, h) // 4
-            masks[:, 
-                  center_y - box_size:center_y + box_size,
+            plane[center_y - box_size:center_y + box_size,
                   center_x - box_size:center_x + box_size] = 1.0
+            masks = static_mask(plane, batch_size)
         
+        if packed:
+            masks = PackedMasks.pack(masks)
         return (masks,)
 
 
+class PackedMaskGenerator(BatchMaskGenerator):
+    """
+    Generate binary masks at one bit per pixel (feather them with Unpack Masks)
+    """
+    
+    @classmethod
+    def INPUT_TYPES(cls):
+        input_types = BatchMaskGenerator.INPUT_TYPES()
+        # Soft edges cannot be packed
+        del input_types["optional"]["feather"]
+        return input_types
+    
+    RETURN_TYPES = ("PACKED_MASK",)
+    RETURN_NAMES = ("packed_masks",)
+    FUNCTION = "generate_packed_mask"
+    CATEGORY = "GifInpaint"
+    
+    def generate_packed_mask(self, frames, mask_type, **kwargs):
+        return self.generate_mask(frames, mask_type, packed=True, **kwargs)
+
+
+class StreamMaskGenerator(BatchMaskGenerator):
+    """
+    Generate masks window by window from a GIF stream
+    """
+    
+    @classmethod
+    def INPUT_TYPES(cls):
+        input_types = BatchMaskGenerator.INPUT_TYPES()
+        input_types["required"] = {"frame_stream": ("GIF_STREAM",), **{
+            k: v for k, v in input_types["required"].items() if k != "frames"
+        }}
+        return input_types
+    
+    RETURN_TYPES = ("MASK_STREAM",)
+    RETURN_NAMES = ("mask_stream",)
+    FUNCTION = "generate_mask_stream"
+    CATEGORY = "GifInpaint/Stream"
+    
+    def generate_mask_stream(self, frame_stream, mask_type, mask=None, **kwargs):
+        def mask_window(window, start):
+            window_mask = mask
+            if window_mask is not None and window_mask.dim() == 3 and window_mask.shape[0] > 1:
+                # Per-frame manual masks: take the slice matching this window
+                window_mask = window_mask[start:start + window.shape[0]]
+            return self.generate_mask(window, mask_type, mask=window_mask, **kwargs)[0]
+        
+        return (frame_stream.map(mask_window),)
+
+
 class GIFInfo:
     """
     Display information about loaded GIF
@@ -224,9 +714,14 @@ class GIFInfo:
     
     @classmethod
     def INPUT_TYPES(cls):
+        input_dir = folder_paths.get_input_directory()
+        files = GIFIndex.for_directory(input_dir).filenames()
         return {
-            "required": {
+            "required": {},
+            "optional": {
                 "frames": ("IMAGE",),
+                # Read from the metadata index, without decoding the GIF
+                "gif": (["none"] + files, {"default": "none"}),
             },
         }
     
@@ -235,13 +730,29 @@ class GIFInfo:
     CATEGORY = "GifInpaint"
     OUTPUT_NODE = True
     
-    def get_info(self, frames):
-        batch_size, height, width, channels = frames.shape
+    def get_info(self, frames=None, gif="none"):
+        info = "GIF Information:\n"
         
-        info = f"""GIF Information:
-- Frame Count: {batch_size}
-- Dimensions: {width}x{height}
+        if gif and gif != "none":
+            input_dir = folder_paths.get_input_directory()
+            metadata = GIFIndex.for_directory(input_dir).get(gif)
+            durations = metadata.get("durations") or [0]
+            loop = metadata.get("loop")
+            info += f"""- File: {gif}
+- Frame Count: {metadata.get("frame_count", 0)}
+- Dimensions: {metadata.get("width", 0)}x{metadata.get("height", 0)}
+- Duration: {sum(durations)} ms ({min(durations)}-{max(durations)} ms per frame)
+- Loop: {"none" if loop is None else "infinite" if loop == 0 else loop}
+- Palette Size: {metadata.get("palette_size", 0)} colors ({metadata.get("local_palettes", 0)} local palettes)
+- File Hash: {metadata.get("hash", "")}
+"""
+        
+        if frames is not None:
+            batch_size, height, width, channels = frames.shape
+            info += f"""- Batch Frame Count: {batch_size}
+- Batch Dimensions: {width}x{height}
 - Channels: {channels}
+- Dtype: {str(frames.dtype).replace("torch.", "")}
 - Total Pixels: {batch_size * height * width * channels:,}
 - Memory Size: {frames.element_size() * frames.nelement() / 1024 / 1024:.2f} MB
 """
@@ -249,6 +760,114 @@ class GIFInfo:
         return {"ui": {"text": [info]}, "result": (info,)}
 
 
+class ProxyMaskUpscaler:
+    """
+    Upscale masks tuned on a proxy batch to full-resolution masks
+    """
+    
+    @classmethod
+    def INPUT_TYPES(cls):
+        return {
+            "required": {
+                "masks": ("MASK",),
+                "width": ("INT", {"default": 512, "min": 1, "max": 8192}),
+                "height": ("INT", {"default": 512, "min": 1, "max": 8192}),
+                "method": (["bilinear", "nearest"], {"default": "bilinear"}),
+                # Re-binarize after interpolation (0 = keep soft edges)
+                "threshold": ("FLOAT", {"default": 0.0, "min": 0.0, "max": 1.0, "step": 0.05}),
+            },
+        }
+    
+    RETURN_TYPES = ("MASK",)
+    FUNCTION = "upscale"
+    CATEGORY = "GifInpaint"
+    
+    def upscale(self, masks, width, height, method="bilinear", threshold=0.0):
+        upscaled = resize_masks(masks, (width, height), method)
+        if threshold > 0:
+            upscaled = map_mask_planes(lambda m: (m >= threshold).float(), upscaled)
+        return (upscaled,)
+
+
+class FrameDeduplicator:
+    """
+    Collapse duplicate frames so each unique frame is inpainted only once
+    """
+    
+    @classmethod
+    def INPUT_TYPES(cls):
+        return {
+            "required": {
+                "frames": ("IMAGE",),
+                "tolerance": ("FLOAT", {"default": 0.0, "min": 0.0, "max": 0.2, "step": 0.001}),
+            },
+            "optional": {
+                "masks": ("MASK",),
+                # From Load GIF: source frame timing carried in the frame map
+                "durations": ("GIF_DURATIONS",),
+            },
+        }
+    
+    RETURN_TYPES = ("IMAGE", "MASK", "FRAME_MAP", "INT")
+    RETURN_NAMES = ("frames", "masks", "frame_map", "unique_count")
+    FUNCTION = "deduplicate"
+    CATEGORY = "GifInpaint"
+    
+    def deduplicate(self, frames, tolerance=0.0, masks=None, durations=None):
+        if durations is not None and len(durations) != frames.shape[0]:
+            raise ValueError(f"Got {len(durations)} durations for {frames.shape[0]} frames")
+        
+        # Per-frame masks take part in matching; a single mask applies to every frame
+        frame_masks = None
+        if (masks is not None and masks.dim() == 3 and masks.shape[0] == frames.shape[0] > 1
+                and mask_plane(masks) is None):
+            frame_masks = masks
+        
+        unique_indices, index_map = deduplicate_frames(frames, tolerance, frame_masks)
+        
+        unique_frames = frames[unique_indices]
+        if frame_masks is not None:
+            unique_masks = frame_masks[unique_indices]
+        elif masks is not None:
+            # A static mask keeps its plane, with one view per unique frame
+            plane = mask_plane(masks)
+            unique_masks = masks if plane is None else static_mask(plane, len(unique_indices))
+        else:
+            unique_masks = torch.zeros(unique_frames.shape[:3])
+        
+        # Without source durations, Save GIF times every source frame with its own duration
+        frame_map = {
+            "index_map": index_map,
+            "durations": list(durations) if durations is not None else None,
+        }
+        
+        return (unique_frames, unique_masks, frame_map, len(unique_indices))
+
+
+class FrameExpander:
+    """
+    Expand deduplicated frames back to the original frame sequence
+    """
+    
+    @classmethod
+    def INPUT_TYPES(cls):
+        return {
+            "required": {
+                "frames": ("IMAGE",),
+                "frame_map": ("FRAME_MAP",),
+            },
+        }
+    
+    RETURN_TYPES = ("IMAGE", "INT")
+    RETURN_NAMES = ("frames", "frame_count")
+    FUNCTION = "expand"
+    CATEGORY = "GifInpaint"
+    
+    def expand(self, frames, frame_map):
+        expanded = frames[frame_map["index_map"]]
+        return (expanded, expanded.shape[0])
+
+
 class FrameInterpolator:
     """
     Interpolate frames to increase frame count (smooth animation)
@@ -269,6 +888,7 @@ class FrameInterpolator:
     FUNCTION = "interpolate_frames"
     CATEGORY = "GifInpaint"
     
+    @float_frames_input("frames")
     def interpolate_frames(self, frames, interpolation_factor=2, method="linear"):
         import torch.nn.functional as F
         
@@ -295,6 +915,219 @@ class FrameInterpolator:
         return (result, new_count)
 
 
+class FrameDtypeConverter:
+    """
+    Convert frames between uint8, float16 and float32 transport
+    """
+    
+    @classmethod
+    def INPUT_TYPES(cls):
+        return {
+            "required": {
+                "frames": ("IMAGE",),
+                # float32 before nodes outside this pack (e.g. VAE Encode)
+                "dtype": (list(FRAME_DTYPES), {"default": "float32"}),
+            },
+        }
+    
+    RETURN_TYPES = ("IMAGE",)
+    RETURN_NAMES = ("frames",)
+    FUNCTION = "convert"
+    CATEGORY = "GifInpaint"
+    
+    def convert(self, frames, dtype="float32"):
+        return (to_frame_dtype(frames, dtype),)
+
+
+class PackMasks:
+    """
+    Store binary masks at one bit per pixel, cropped to the masked region
+    """
+    
+    @classmethod
+    def INPUT_TYPES(cls):
+        return {
+            "required": {
+                "masks": ("MASK",),
+                "threshold": ("FLOAT", {"default": 0.5, "min": 0.01, "max": 1.0, "step": 0.01}),
+                "crop": ("BOOLEAN", {"default": True}),
+            },
+        }
+    
+    RETURN_TYPES = ("PACKED_MASK", "STRING")
+    RETURN_NAMES = ("packed_masks", "info")
+    FUNCTION = "pack"
+    CATEGORY = "GifInpaint"
+    
+    def pack(self, masks, threshold=0.5, crop=True):
+        packed = PackedMasks.pack(masks, threshold, crop)
+        float_bytes = packed.frame_count * packed.height * packed.width * 4
+        info = (f"{packed.frame_count} masks {packed.width}x{packed.height}: "
+                f"{packed.nbytes / 1024:.1f} KB packed ({float_bytes / 1024:.1f} KB as float32)")
+        return (packed, info)
+
+
+class UnpackMasks:
+    """
+    Convert packed masks back to float masks, optionally feathered
+    """
+    
+    @classmethod
+    def INPUT_TYPES(cls):
+        return {
+            "required": {
+                "packed_masks": ("PACKED_MASK",),
+                "feather": ("INT", {"default": 0, "min": 0, "max": 100}),
+            },
+        }
+    
+    RETURN_TYPES = ("MASK",)
+    FUNCTION = "unpack"
+    CATEGORY = "GifInpaint"
+    
+    def unpack(self, packed_masks, feather=0):
+        masks = packed_masks.unpack()
+        if feather > 0:
+            masks = gaussian_blur(masks, feather)
+        return (masks,)
+
+
+class CropToMask:
+    """
+    Crop frames and masks to the masked region, so inpainting runs on the region only
+    """
+    
+    @classmethod
+    def INPUT_TYPES(cls):
+        return {
+            "required": {
+                "frames": ("IMAGE",),
+                "masks": ("MASK",),
+                # union: one window for the clip; per_frame: equal-size windows following the mask
+                "mode": (["union", "per_frame"], {"default": "union"}),
+                "margin": ("INT", {"default": 32, "min": 0, "max": 512}),
+                "multiple": ("INT", {"default": 8, "min": 1, "max": 64}),
+            },
+        }
+    
+    RETURN_TYPES = ("IMAGE", "MASK", "CROP_REGION", "STRING")
+    RETURN_NAMES = ("frames", "masks", "crop_region", "info")
+    FUNCTION = "crop"
+    CATEGORY = "GifInpaint"
+    
+    def crop(self, frames, masks, mode="union", margin=32, multiple=8):
+        batch_size, height, width = frames.shape[:3]
+        if masks.dim() == 2 or masks.shape[0] == 1:
+            masks = static_mask(masks.reshape(masks.shape[-2:]), batch_size)
+        if masks.shape != (batch_size, height, width):
+            raise ValueError(f"Masks {tuple(masks.shape)} do not match frames {(batch_size, height, width)}")
+        
+        plane = mask_plane(masks)
+        union_box = torch.tensor([get_bounding_box(masks if plane is None else plane)])
+        if mode == "per_frame" and plane is None:
+            boxes = get_bounding_boxes(masks)
+            # Frames without mask pixels get a point box at the union centre
+            empty = (boxes == 0).all(dim=1) & (masks[:, 0, 0] <= 0)
+            centre = (union_box[:, :2] + union_box[:, 2:]) // 2
+            boxes[empty] = torch.cat([centre, centre], dim=1)
+        else:
+            boxes = union_box.expand(batch_size, 4)
+        origins, crop_width, crop_height = crop_windows_for_boxes(boxes, width, height, margin, multiple)
+        
+        cropped_frames = crop_windows(frames, origins, crop_width, crop_height)
+        if plane is not None:
+            x, y = origins[0].tolist()
+            cropped_masks = static_mask(plane[y:y + crop_height, x:x + crop_width].contiguous(), batch_size)
+        else:
+            cropped_masks = crop_windows(masks, origins, crop_width, crop_height)
+        
+        crop_region = {
+            "origins": origins.tolist(),
+            "crop_width": crop_width,
+            "crop_height": crop_height,
+            "width": width,
+            "height": height,
+        }
+        info = (f"Cropped {width}x{height} frames to {crop_width}x{crop_height} "
+                f"({100.0 * crop_width * crop_height / (width * height):.1f}% of the area)")
+        
+        return (cropped_frames, cropped_masks, crop_region, info)
+
+
+class PasteCrop:
+    """
+    Paste inpainted crops back into the original frames with a feathered blend
+    """
+    
+    @classmethod
+    def INPUT_TYPES(cls):
+        return {
+            "required": {
+                "frames": ("IMAGE",),
+                "crops": ("IMAGE",),
+                "crop_region": ("CROP_REGION",),
+                "feather": ("INT", {"default": 8, "min": 0, "max": 128}),
+            },
+            "optional": {
+                # Blend only around the mask (crop-sized or full-frame); default is the whole window
+                "masks": ("MASK",),
+            },
+        }
+    
+    RETURN_TYPES = ("IMAGE",)
+    FUNCTION = "paste"
+    CATEGORY = "GifInpaint"
+    
+    def paste(self, frames, crops, crop_region, feather=8, masks=None):
+        origins = torch.tensor(crop_region["origins"])
+        crop_width, crop_height = crop_region["crop_width"], crop_region["crop_height"]
+        if frames.shape[0] != len(origins) or crops.shape[0] != len(origins):
+            raise ValueError(f"Crop region has {len(origins)} frames, got {frames.shape[0]} frames "
+                             f"and {crops.shape[0]} crops")
+        
+        # VAE round trips can trim sizes that are not multiples of 8
+        if crops.shape[1:3] != (crop_height, crop_width):
+            crops = resize_frames(crops, (crop_width, crop_height))
+        
+        alpha = self.window_alpha(origins, crop_width, crop_height, crop_region["width"],
+                                  crop_region["height"], feather)
+        if masks is not None:
+            if masks.dim() == 2 or masks.shape[0] == 1:
+                masks = static_mask(masks.reshape(masks.shape[-2:]), len(origins))
+            if masks.shape[1:] != (crop_height, crop_width):
+                masks = crop_windows(masks, origins, crop_width, crop_height)
+            # Grow the mask by the feather width, then blur within it (4 sigma = feather),
+            # so masked pixels stay fully replaced
+            if feather > 0:
+                masks = gaussian_blur(max_filter(masks, feather), feather / 4)
+            alpha = torch.minimum(alpha, masks.clamp(0, 1))
+        
+        # Blend in float on the windows only; the frames keep their transport dtype
+        region = to_float_frames(crop_windows(frames, origins, crop_width, crop_height))
+        blended = region + (to_float_frames(crops) - region) * alpha[..., None]
+        result = paste_windows(frames.clone(), to_frame_dtype(blended, frames.dtype), origins)
+        
+        return (result,)
+    
+    @staticmethod
+    def window_alpha(origins, crop_width, crop_height, width, height, feather):
+        """Blend weights [B, h, w] ramping to 0 over feather pixels at window edges inside the frame"""
+        def ramp(starts, size, limit):
+            steps = torch.arange(size, dtype=torch.float32)
+            low = (steps + 1) / (feather + 1)
+            high = (size - steps) / (feather + 1)
+            # Edges on the frame border have nothing to blend with
+            low = torch.where(starts[:, None] > 0, low, torch.ones_like(low))
+            high = torch.where(starts[:, None] + size < limit, high, torch.ones_like(high))
+            return torch.minimum(low, high).clamp(max=1.0)
+        
+        if feather == 0:
+            return torch.ones((len(origins), crop_height, crop_width))
+        ramp_x = ramp(origins[:, 0], crop_width, width)
+        ramp_y = ramp(origins[:, 1], crop_height, height)
+        return torch.minimum(ramp_y[:, :, None], ramp_x[:, None, :])
+
+
 class BatchInpaintPreview:
     """
     Preview frames with mask overlay
@@ -319,8 +1152,14 @@ class BatchInpaintPreview:
         batch_size = frames.shape[0]
         frame_index = min(frame_index, batch_size - 1)
         
-        frame = frames[frame_index].clone()
-        mask = masks[frame_index] if masks.dim() > 2 else masks
+        # Only the previewed frame is converted to float
+        frame = to_float_frames(frames[frame_index])
+        # Static masks are read from their shared plane
+        plane = mask_plane(masks)
+        if plane is not None:
+            mask = plane
+        else:
+            mask = masks[frame_index] if masks.dim() > 2 else masks
         
         # Create red overlay for mask
         mask_overlay = torch.zeros_like(frame)
@@ -342,6 +1181,21 @@ NODE_CLASS_MAPPINGS = {
     "GIFInfo": GIFInfo,
     "FrameInterpolator": FrameInterpolator,
     "BatchInpaintPreview": BatchInpaintPreview,
+    "LoadGIFProxy": LoadGIFProxy,
+    "ProxyMaskUpscaler": ProxyMaskUpscaler,
+    "FrameDeduplicator": FrameDeduplicator,
+    "FrameExpander": FrameExpander,
+    "LoadGIFStream": LoadGIFStream,
+    "CollectStream": CollectStream,
+    "CollectMaskStream": CollectMaskStream,
+    "StreamMaskGenerator": StreamMaskGenerator,
+    "SaveGIFStream": SaveGIFStream,
+    "FrameDtypeConverter": FrameDtypeConverter,
+    "PackMasks": PackMasks,
+    "PackedMaskGenerator": PackedMaskGenerator,
+    "UnpackMasks": UnpackMasks,
+    "CropToMask": CropToMask,
+    "PasteCrop": PasteCrop,
 }
 
 NODE_DISPLAY_NAME_MAPPINGS = {
@@ -352,4 +1206,19 @@ NODE_DISPLAY_NAME_MAPPINGS = {
     "GIFInfo": "GIF Info ℹ️",
     "FrameInterpolator": "Frame Interpolator 🔄",
     "BatchInpaintPreview": "Batch Inpaint Preview 👁️",
+    "LoadGIFProxy": "Load GIF Proxy 🔍",
+    "ProxyMaskUpscaler": "Proxy Mask Upscaler 🔍",
+    "FrameDeduplicator": "Frame Deduplicator 🧬",
+    "FrameExpander": "Frame Expander 🧬",
+    "LoadGIFStream": "Load GIF Stream 🌊",
+    "CollectStream": "Collect Stream 📥",
+    "CollectMaskStream": "Collect Mask Stream 📥",
+    "StreamMaskGenerator": "Stream Mask Generator 🎭",
+    "SaveGIFStream": "Save GIF Stream 💾",
+    "FrameDtypeConverter": "Frame Dtype Converter 🔢",
+    "PackMasks": "Pack Masks 🗜️",
+    "PackedMaskGenerator": "Packed Mask Generator 🗜️",
+    "UnpackMasks": "Unpack Masks 🗜️",
+    "CropToMask": "Crop To Mask ✂️",
+    "PasteCrop": "Paste Crop ✂️",
 }
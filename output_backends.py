@@ -0,0 +1,143 @@
+"""
+Animated output backends for GIF Inpainter Studio
+Streaming sinks that take uint8 RGB frame windows, so one conversion and
+timing pass can feed several output formats at once
+"""
+
+import numpy as np
+from PIL import Image
+from typing import Dict, List, Optional, Type
+
+try:
+    from .gif_encoder import GIFStreamWriter
+    from .gif_quantizer import GlobalPaletteQuantizer
+except ImportError:
+    from gif_encoder import GIFStreamWriter
+    from gif_quantizer import GlobalPaletteQuantizer
+
+
+class OutputBackend:
+    """
+    Base class for animated output writers.
+
+    write() receives uint8 frames [B, H, W, 3] with one duration (ms) per
+    frame; close() finishes the file.
+    """
+
+    extension = ""
+
+    def __init__(self, path: str, loop: int = 0):
+        self.path = path
+        self.loop = loop
+
+    def write(self, frames: np.ndarray, durations: List[int]) -> None:
+        raise NotImplementedError
+
+    def close(self) -> None:
+        pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+class GIFBackend(OutputBackend):
+    """
+    Global-palette GIF, appended window by window
+    """
+
+    extension = "gif"
+
+    def __init__(self, path: str, loop: int = 0, quantizer: Optional[GlobalPaletteQuantizer] = None,
+                 delta: bool = True, workers: int = 1):
+        super().__init__(path, loop)
+        self.writer = GIFStreamWriter(path, quantizer or GlobalPaletteQuantizer(), loop, delta, workers)
+
+    def write(self, frames: np.ndarray, durations: List[int]) -> None:
+        self.writer.write(frames, list(durations))
+
+    def close(self) -> None:
+        self.writer.close()
+
+
+class PILBackend(OutputBackend):
+    """
+    Formats written with Pillow's save_all.
+
+    Pillow needs every frame at save time, so frames are kept as PIL images
+    until close().
+    """
+
+    format = ""
+
+    def __init__(self, path: str, loop: int = 0, **save_options):
+        super().__init__(path, loop)
+        self.save_options = save_options
+        self.images: List[Image.Image] = []
+        self.durations: List[int] = []
+
+    def write(self, frames: np.ndarray, durations: List[int]) -> None:
+        self.images.extend(Image.fromarray(frame) for frame in frames)
+        self.durations.extend(durations)
+
+    def close(self) -> None:
+        if not self.images:
+            return
+        self.images[0].save(
+            self.path,
+            format=self.format,
+            save_all=True,
+            append_images=self.images[1:],
+            duration=self.durations,
+            loop=self.loop,
+            **self.save_options
+        )
+        self.images = []
+
+
+class PILGIFBackend(PILBackend):
+    """GIF with Pillow's per-frame quantization"""
+
+    extension = "gif"
+    format = "GIF"
+
+
+class WebPBackend(PILBackend):
+    """Animated WebP (options: quality, lossless, method)"""
+
+    extension = "webp"
+    format = "WEBP"
+
+
+class APNGBackend(PILBackend):
+    """Animated PNG"""
+
+    extension = "png"
+    format = "PNG"
+
+
+OUTPUT_BACKENDS: Dict[str, Type[OutputBackend]] = {
+    "gif": GIFBackend,
+    "gif_pil": PILGIFBackend,
+    "webp": WebPBackend,
+    "apng": APNGBackend,
+}
+
+
+def parse_formats(formats: str) -> List[str]:
+    """
+    Split a comma-separated format list ("gif, webp")
+
+    Returns:
+        Unique format names in order
+    """
+    names = []
+    for name in formats.replace(" ", "").lower().split(","):
+        if not name or name in names:
+            continue
+        if name not in OUTPUT_BACKENDS:
+            raise ValueError(f"Unknown output format: {name} (expected one of {', '.join(OUTPUT_BACKENDS)})")
+        names.append(name)
+    return names or ["gif"]
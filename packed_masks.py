@@ -0,0 +1,286 @@
+"""
+Bit-packed masks for GIF Inpainter Studio
+Binary mask batches stored at one bit per pixel, optionally cropped to the
+region that is set in any frame, with boolean algebra on the packed bytes
+"""
+
+import numpy as np
+import torch
+from typing import Callable, List, Optional, Sequence, Tuple
+
+try:
+    from .batch_filters import CHUNK_FRAMES
+    from .utils import mask_plane, static_mask
+except ImportError:
+    from batch_filters import CHUNK_FRAMES
+    from utils import mask_plane, static_mask
+
+# Bit weights within a byte, most significant bit = leftmost pixel
+_SHIFTS = torch.arange(7, -1, -1, dtype=torch.uint8)
+
+
+def pack_bits(bits: torch.Tensor) -> torch.Tensor:
+    """
+    Pack a bool tensor [..., W] along its last axis
+
+    Returns:
+        uint8 tensor [..., ceil(W / 8)]; padding bits are 0
+    """
+    if bits.device.type == "cpu":
+        # Same big-endian bit order as below, in one numpy pass
+        return torch.from_numpy(np.packbits(bits.numpy(), axis=-1))
+    width = bits.shape[-1]
+    padded_width = -(-width // 8) * 8
+    if padded_width != width:
+        bits = torch.nn.functional.pad(bits, (0, padded_width - width))
+    bits = bits.reshape(*bits.shape[:-1], padded_width // 8, 8).to(torch.uint8)
+
+    words = bits[..., 0] << 7
+    for bit in range(1, 8):
+        words |= bits[..., bit] << (7 - bit)
+    return words
+
+
+def unpack_bits(words: torch.Tensor, width: int) -> torch.Tensor:
+    """Inverse of pack_bits(): bool tensor [..., width]"""
+    if words.device.type == "cpu":
+        return torch.from_numpy(np.unpackbits(words.numpy(), axis=-1, count=width)).view(torch.bool)
+    shifts = _SHIFTS.to(words.device)
+    bits = ((words[..., None] >> shifts) & 1).view(torch.bool)
+    return bits.reshape(*words.shape[:-1], -1)[..., :width]
+
+
+def popcount(words: torch.Tensor) -> torch.Tensor:
+    """Set bits in each uint8 word (SWAR bit counting, no lookup table)"""
+    words = words - ((words >> 1) & 0x55)
+    words = (words & 0x33) + ((words >> 2) & 0x33)
+    return (words + (words >> 4)) & 0x0F
+
+
+def union_region(regions: Sequence[Tuple[int, int, int, int]]) -> Tuple[int, int, int, int]:
+    """Smallest (top, left, height, width) region covering all non-empty regions"""
+    regions = [r for r in regions if r[2] and r[3]]
+    if not regions:
+        return (0, 0, 0, 0)
+    top = min(r[0] for r in regions)
+    left = min(r[1] for r in regions)
+    bottom = max(r[0] + r[2] for r in regions)
+    right = max(r[1] + r[3] for r in regions)
+    return (top, left, bottom - top, right - left)
+
+
+class PackedMasks:
+    """
+    Binary mask batch [B, H, W] at one bit per pixel.
+
+    Only the region top:top + region_height, left:left + region_width is
+    stored (left is a multiple of 8 so bytes line up); pixels outside it are
+    0. A static mask (the same on every frame) stores a single plane. Packed
+    masks travel through their own PACKED_MASK sockets: Pack Masks and the
+    packed generators produce them, the packed nodes work on the bytes, and
+    Unpack Masks turns them back into float MASK tensors.
+    """
+
+    def __init__(self, words: torch.Tensor, frame_count: int, height: int, width: int,
+                 region: Optional[Tuple[int, int, int, int]] = None):
+        """
+        Args:
+            words: uint8 [N, region_height, ceil(region_width / 8)], N = frame_count or 1
+            frame_count: Frames B
+            height: Frame height
+            width: Frame width
+            region: (top, left, region_height, region_width), default the whole frame
+        """
+        self.words = words
+        self.frame_count = frame_count
+        self.height = height
+        self.width = width
+        self.region = region or (0, 0, height, width)
+
+    @classmethod
+    def pack(cls, masks: torch.Tensor, threshold: float = 0.5, crop: bool = True) -> "PackedMasks":
+        """
+        Pack float or bool masks
+
+        Args:
+            masks: Masks [B, H, W] or [H, W]; static masks are packed once
+            threshold: Float masks are set where mask >= threshold
+            crop: Store only the bounding box of pixels set in any frame
+
+        Returns:
+            PackedMasks with the same frame count
+        """
+        if isinstance(masks, PackedMasks):
+            return masks
+        frame_count = masks.shape[0] if masks.dim() == 3 else 1
+        plane = mask_plane(masks)
+        batch = plane[None] if plane is not None else masks if masks.dim() == 3 else masks[None]
+        bits = batch if batch.dtype == torch.bool else batch >= threshold
+        height, width = bits.shape[1:]
+
+        region = (0, 0, height, width)
+        if crop:
+            rows = torch.nonzero(bits.any(dim=2).any(dim=0)).flatten()
+            columns = torch.nonzero(bits.any(dim=1).any(dim=0)).flatten()
+            if len(rows) == 0:
+                region = (0, 0, 0, 0)
+            else:
+                top, bottom = int(rows[0]), int(rows[-1]) + 1
+                left, right = int(columns[0]) // 8 * 8, int(columns[-1]) + 1
+                region = (top, left, bottom - top, right - left)
+            top, left, region_height, region_width = region
+            bits = bits[:, top:top + region_height, left:left + region_width]
+
+        return cls(pack_bits(bits), frame_count, height, width, region)
+
+    @classmethod
+    def concatenate(cls, parts: List["PackedMasks"]) -> "PackedMasks":
+        """
+        Join packed batches along the frame axis
+
+        Raises:
+            ValueError: If the parts have different frame sizes
+        """
+        height, width = parts[0].height, parts[0].width
+        if any((part.height, part.width) != (height, width) for part in parts):
+            raise ValueError("Cannot concatenate masks of different sizes")
+        region = union_region([part.region for part in parts])
+        words = []
+        for part in parts:
+            part_words = part._expanded(region)
+            words.append(part_words.expand(part.frame_count, -1, -1) if part.static else part_words)
+        return cls(torch.cat(words), sum(part.frame_count for part in parts), height, width, region)
+
+    @property
+    def static(self) -> bool:
+        return self.words.shape[0] == 1
+
+    @property
+    def shape(self) -> Tuple[int, int, int]:
+        return (self.frame_count, self.height, self.width)
+
+    @property
+    def nbytes(self) -> int:
+        return self.words.numel()
+
+    def __len__(self) -> int:
+        return self.frame_count
+
+    def unpack(self, dtype: torch.dtype = torch.float32) -> torch.Tensor:
+        """
+        Masks as a [B, H, W] tensor (a static_mask() view for static masks)
+
+        Args:
+            dtype: torch.float32 for 0/1 masks, torch.bool for bits
+        """
+        top, left, region_height, region_width = self.region
+        masks = torch.zeros((self.words.shape[0], self.height, self.width), dtype=dtype, device=self.words.device)
+        if region_height and region_width:
+            bits = unpack_bits(self.words, region_width)
+            masks[:, top:top + region_height, left:left + region_width] = bits.to(dtype)
+        return static_mask(masks[0], self.frame_count) if self.static else masks
+
+    def frame(self, index: int, dtype: torch.dtype = torch.float32) -> torch.Tensor:
+        """One frame [H, W], unpacking only that frame"""
+        single = PackedMasks(self.words[0 if self.static else index][None], 1,
+                             self.height, self.width, self.region)
+        return single.unpack(dtype)[0]
+
+    def count(self) -> torch.Tensor:
+        """Set pixels per frame (int64 [B])"""
+        counts = popcount(self.words).sum(dim=(1, 2), dtype=torch.int64)
+        return counts.expand(self.frame_count) if self.static else counts
+
+    def select(self, indices) -> "PackedMasks":
+        """Frames at indices (slice, list or tensor), still packed"""
+        count = len(range(self.frame_count)[indices]) if isinstance(indices, slice) else len(indices)
+        words = self.words if self.static else self.words[indices]
+        return PackedMasks(words, count, self.height, self.width, self.region)
+
+    def _expanded(self, region: Tuple[int, int, int, int]) -> torch.Tensor:
+        """Words re-laid onto a larger byte-aligned region"""
+        if region == self.region:
+            return self.words
+        top, left, region_height, region_width = region
+        words = torch.zeros((self.words.shape[0], region_height, -(-region_width // 8)),
+                            dtype=torch.uint8, device=self.words.device)
+        own_top, own_left, own_height, own_width = self.region
+        if own_height and own_width:
+            y = own_top - top
+            x = (own_left - left) // 8
+            words[:, y:y + own_height, x:x + self.words.shape[2]] = self.words
+        return words
+
+    def _combine(self, other: "PackedMasks", op) -> "PackedMasks":
+        if (self.height, self.width) != (other.height, other.width):
+            raise ValueError(f"Mask sizes differ: {self.width}x{self.height} and {other.width}x{other.height}")
+        if self.frame_count != other.frame_count and not (self.static or other.static):
+            raise ValueError(f"Frame counts differ: {self.frame_count} and {other.frame_count}")
+        region = union_region([self.region, other.region])
+        words = op(self._expanded(region), other._expanded(region))
+        return PackedMasks(words, max(self.frame_count, other.frame_count), self.height, self.width, region)
+
+    def __and__(self, other: "PackedMasks") -> "PackedMasks":
+        return self._combine(other, torch.bitwise_and)
+
+    def __or__(self, other: "PackedMasks") -> "PackedMasks":
+        return self._combine(other, torch.bitwise_or)
+
+    def __xor__(self, other: "PackedMasks") -> "PackedMasks":
+        return self._combine(other, torch.bitwise_xor)
+
+    def __sub__(self, other: "PackedMasks") -> "PackedMasks":
+        """Set in self and not in other"""
+        return self._combine(other, lambda a, b: a & ~b)
+
+    def __invert__(self) -> "PackedMasks":
+        # Pixels outside the stored region become set, so the result covers the frame
+        region = (0, 0, self.height, self.width)
+        words = ~self._expanded(region)
+        if self.width % 8:
+            # Keep the padding bits of the last byte clear
+            words[..., -1] &= (0xFF << (8 - self.width % 8)) & 0xFF
+        return PackedMasks(words, self.frame_count, self.height, self.width, region)
+
+
+def pack_frames(mask_fn: Callable[[torch.Tensor], torch.Tensor], frames: torch.Tensor,
+                threshold: float = 0.5, halo: int = 0, chunk_frames: int = CHUNK_FRAMES) -> PackedMasks:
+    """
+    Packed masks of mask_fn(frames), computed chunk by chunk (in order)
+
+    Only one chunk of float masks exists at a time, so a long clip never
+    holds its masks at more than one bit per pixel. mask_fn sees halo extra
+    frames on each side of a chunk where the clip has them.
+    """
+    parts = []
+    for start in range(0, len(frames), chunk_frames):
+        end = min(start + chunk_frames, len(frames))
+        lo, hi = max(0, start - halo), min(len(frames), end + halo)
+        masks = mask_fn(frames[lo:hi])
+        parts.append(PackedMasks.pack(masks[start - lo:end - lo], threshold))
+    return PackedMasks.concatenate(parts)
+
+
+def map_packed(mask_fn: Callable[[torch.Tensor], torch.Tensor], masks: PackedMasks, halo: int = 0,
+               chunk_frames: int = CHUNK_FRAMES) -> PackedMasks:
+    """
+    Apply a binary float-mask operation to packed masks chunk by chunk
+
+    Args:
+        mask_fn: Operation on float masks [B, H, W] that returns binary masks
+        masks: Packed masks
+        halo: Neighbouring frames the operation reads on each side
+        chunk_frames: Frames unpacked at a time (plus the halo)
+    """
+    if masks.static:
+        plane = mask_fn(masks.frame(0)[None])[0]
+        return PackedMasks.pack(static_mask(plane, masks.frame_count))
+
+    parts = []
+    for start in range(0, masks.frame_count, chunk_frames):
+        end = min(start + chunk_frames, masks.frame_count)
+        lo, hi = max(0, start - halo), min(masks.frame_count, end + halo)
+        result = mask_fn(masks.select(slice(lo, hi)).unpack())
+        parts.append(PackedMasks.pack(result[start - lo:end - lo]))
+    return PackedMasks.concatenate(parts)
+
@@ -0,0 +1,529 @@
+"""
+FFT phase-correlation tracking for GIF Inpainter Studio
+Estimates translations for a whole clip with one batched FFT, so masks can
+follow moving content without per-frame painting, and global camera motion
+so whole clips can be stabilized
+"""
+
+import math
+import torch
+import torch.nn.functional as F
+from typing import List, Tuple
+
+try:
+    from .batch_filters import CHUNK_FRAMES, gaussian_blur, gaussian_kernel1d, luminance, max_filter
+    from .utils import (crop_windows, crop_windows_for_boxes, get_bounding_box, paste_windows,
+                        to_float_frames, to_frame_dtype)
+except ImportError:
+    from batch_filters import CHUNK_FRAMES, gaussian_blur, gaussian_kernel1d, luminance, max_filter
+    from utils import (crop_windows, crop_windows_for_boxes, get_bounding_box, paste_windows,
+                       to_float_frames, to_frame_dtype)
+
+STABILIZE_MOTIONS = ["translation", "similarity"]
+
+# Cross-power magnitudes below this fraction of the largest are not fully whitened
+WHITENING_FLOOR = 1e-3
+
+# Block-matching cells whose correlation peak is below this fraction of the keyframe's
+# follow the whole mask
+MIN_CELL_CONFIDENCE = 0.3
+
+# Camera motion is estimated on frames downscaled to this size on the long side
+ANALYSIS_SIZE = 256
+
+# Angle samples over [0, pi) of the log-polar spectrum (0.5 degree steps)
+POLAR_ANGLES = 360
+
+# Rotation / scale estimates per frame pair; each pass measures what the previous one left
+SIMILARITY_PASSES = 4
+
+# Smallest spectrum radius (in frequency samples) of the log-polar resampling
+MIN_POLAR_RADIUS = 4
+
+
+def hann_window2d(height: int, width: int, device=None) -> torch.Tensor:
+    """Separable Hann taper [H, W]; keeps window borders out of the correlation"""
+    rows = torch.hann_window(height, periodic=False, device=device)
+    cols = torch.hann_window(width, periodic=False, device=device)
+    return rows[:, None] * cols[None, :]
+
+
+def phase_correlation(references: torch.Tensor, windows: torch.Tensor,
+                      subpixel: bool = False) -> Tuple[torch.Tensor, torch.Tensor]:
+    """
+    Translation of each window relative to its reference
+
+    Args:
+        references: Float [..., H, W], broadcastable to windows (already tapered)
+        windows: Float [..., H, W] (already tapered)
+        subpixel: Refine the peak with a parabola fit per axis (float shifts)
+
+    Returns:
+        (shifts [..., 2] of (dy, dx) - content at p in the reference is at
+        p + shift in the window; int64 unless subpixel -, peak height [...]
+        in [0, 1] as a confidence)
+    """
+    height, width = windows.shape[-2:]
+    cross = torch.fft.rfft2(windows) * torch.fft.rfft2(references).conj()
+    # Whitening keeps only the phase, so the peak is sharp whatever the contrast; the
+    # floor stops near-empty frequencies (noise) from getting full weight and smearing the peak
+    magnitude = cross.abs()
+    cross /= magnitude + WHITENING_FLOOR * magnitude.flatten(-2).amax(dim=-1)[..., None, None] + 1e-12
+    surface = torch.fft.irfft2(cross, s=(height, width))
+
+    flat = surface.flatten(-2)
+    peak, index = flat.max(dim=-1)
+    dy = index // width
+    dx = index % width
+    offsets = []
+    if subpixel:
+        for neighbours in (((dy - 1) % height) * width + dx, ((dy + 1) % height) * width + dx,
+                           dy * width + (dx - 1) % width, dy * width + (dx + 1) % width):
+            offsets.append(flat.gather(-1, neighbours.unsqueeze(-1)).squeeze(-1))
+    # Peaks past the middle are negative shifts (the correlation wraps around)
+    dy = torch.where(dy > height // 2, dy - height, dy)
+    dx = torch.where(dx > width // 2, dx - width, dx)
+    if not subpixel:
+        return torch.stack([dy, dx], dim=-1), peak
+
+    def vertex(before, after):
+        # Parabola through the peak and its neighbours; flat tops stay on the peak
+        curvature = before - 2 * peak + after
+        offset = torch.where(curvature < -1e-12, 0.5 * (before - after) / curvature, torch.zeros_like(peak))
+        return offset.clamp(-0.5, 0.5)
+
+    up, down, left, right = offsets
+    return torch.stack([dy + vertex(up, down), dx + vertex(left, right)], dim=-1), peak
+
+
+def block_boxes(box: Tuple[int, int, int, int], blocks: int) -> List[Tuple[int, int, int, int]]:
+    """Split an (x1, y1, x2, y2) box into a blocks x blocks grid of boxes"""
+    x1, y1, x2, y2 = box
+    xs = torch.linspace(x1, x2 + 1, blocks + 1).round().long().tolist()
+    ys = torch.linspace(y1, y2 + 1, blocks + 1).round().long().tolist()
+    return [(xs[i], ys[j], xs[i + 1] - 1, ys[j + 1] - 1)
+            for j in range(blocks) for i in range(blocks)
+            if xs[i + 1] > xs[i] and ys[j + 1] > ys[j]]
+
+
+def track_mask(frames: torch.Tensor, mask: torch.Tensor, keyframe: int = 0, search_radius: int = 32,
+               blocks: int = 1) -> Tuple[torch.Tensor, torch.Tensor]:
+    """
+    Propagate a mask painted on one frame to every frame
+
+    The masked patch of the keyframe (tapered, weighted by the feathered
+    mask) is phase-correlated with the same search window in every frame in
+    one batched FFT. With blocks > 1 the mask's bounding box is split into a
+    blocks x blocks grid and each cell is matched separately, so parts that
+    move differently (or separate regions) follow their own content. A cell
+    whose match is weak or lies past search_radius takes the whole mask's
+    shift for that frame instead.
+
+    Args:
+        frames: Frame batch [B, H, W, C], any transport dtype
+        mask: Keyframe mask [H, W]
+        keyframe: Index of the frame the mask was painted on
+        search_radius: Largest displacement from the keyframe position, in pixels
+        blocks: Grid cells per side for block matching (1 = whole patch)
+
+    Returns:
+        (masks [B, H, W] - each cell's part of the mask translated by its
+        shift, shifts [B, cells, 2] of (dy, dx))
+    """
+    batch_size, height, width = frames.shape[:3]
+    box = get_bounding_box(mask)
+    if not bool((mask > 0).any()):
+        return torch.zeros((batch_size, height, width), device=mask.device), \
+            torch.zeros((batch_size, 0, 2), dtype=torch.long)
+
+    cells = torch.tensor(block_boxes(box, blocks))
+    cell_masks = []
+    for x1, y1, x2, y2 in cells.tolist():
+        part = torch.zeros_like(mask)
+        part[y1:y2 + 1, x1:x2 + 1] = mask[y1:y2 + 1, x1:x2 + 1]
+        cell_masks.append(part)
+    cell_masks = torch.stack(cell_masks)
+    # Cells without mask pixels have nothing to track
+    keep = cell_masks.flatten(1).amax(dim=1) > 0
+    cells, cell_masks = cells[keep], cell_masks[keep]
+
+    shifts, confidence = match_cells(frames, cells, cell_masks, keyframe, search_radius)
+    if len(cells) > 1:
+        # A cell with little texture of its own can lock onto the wrong peak, usually a weak
+        # one or one past the search radius: such cells follow the whole mask instead
+        whole, _ = match_cells(frames, torch.tensor([box]), mask[None], keyframe, search_radius)
+        unreliable = (confidence < MIN_CELL_CONFIDENCE) | (shifts.abs() > search_radius).any(dim=-1)
+        shifts = torch.where(unreliable[..., None], whole, shifts)
+    shifts = shifts.clamp(-search_radius, search_radius)
+
+    return shift_cells(cell_masks, shifts), shifts
+
+
+def match_cells(frames: torch.Tensor, cells: torch.Tensor, cell_masks: torch.Tensor, keyframe: int,
+                search_radius: int) -> Tuple[torch.Tensor, torch.Tensor]:
+    """
+    Phase-correlate the keyframe content of each cell with its search window in every frame
+
+    Args:
+        frames: Frame batch [B, H, W, C]
+        cells: (x1, y1, x2, y2) boxes [cells, 4]
+        cell_masks: Masks [cells, H, W], each holding one cell's part
+        keyframe: Index of the reference frame
+        search_radius: Search window margin around each cell, in pixels
+
+    Returns:
+        (shifts [B, cells, 2] of (dy, dx), not clamped to search_radius,
+        confidence [B, cells] - peak height relative to the keyframe's own)
+    """
+    height, width = frames.shape[1:3]
+    origins, window_width, window_height = crop_windows_for_boxes(cells, width, height, search_radius)
+    taper = hann_window2d(window_height, window_width, frames.device)
+
+    # Luminance of each cell's window grown by search_radius (inside the frame), so windows
+    # moved by up to search_radius are cropped from it
+    regions = []
+    for x, y in origins.tolist():
+        x0, y0 = max(0, x - search_radius), max(0, y - search_radius)
+        x1 = min(width, x + window_width + search_radius)
+        y1 = min(height, y + window_height + search_radius)
+        regions.append((x0, y0, luminance(frames[:, y0:y1, x0:x1])))
+    no_offsets = torch.zeros((frames.shape[0], len(cells), 2), dtype=torch.long)
+    windows, _ = search_windows(regions, origins, no_offsets, window_width, window_height, taper)
+
+    # Reference: keyframe content under the (slightly grown, feathered) mask of each cell
+    weights = crop_windows(cell_masks, origins, window_width, window_height)
+    weights = gaussian_blur(max_filter(weights, 3), 2)
+    references = windows[keyframe] * weights
+    shifts, _ = phase_correlation(references, windows)
+
+    # The taper weighs moved content by where it lands in the window, which pulls the peak
+    # towards the centre (far shifts come out a pixel or two short); windows re-centred on
+    # the first estimate leave only a small residual to measure
+    windows, offsets = search_windows(regions, origins, shifts.clamp(-search_radius, search_radius),
+                                      window_width, window_height, taper)
+    residuals, peaks = phase_correlation(references, windows)
+    return offsets + residuals, peaks / peaks[keyframe].clamp(min=1e-12)
+
+
+def search_windows(regions: List[tuple], origins: torch.Tensor, offsets: torch.Tensor, window_width: int,
+                   window_height: int, taper: torch.Tensor) -> Tuple[torch.Tensor, torch.Tensor]:
+    """
+    Tapered, zero-mean luminance windows of every frame and cell
+
+    Args:
+        regions: (x, y, luminance [B, h, w]) per cell, covering its window at any offset
+        origins: Window (x, y) per cell [cells, 2]
+        offsets: (dy, dx) per frame and cell [B, cells, 2] moving the windows
+
+    Returns:
+        (windows [B, cells, h, w], offsets actually applied - windows stay inside the regions)
+    """
+    windows, applied = [], []
+    for (x0, y0, region), (x, y), cell_offsets in zip(regions, origins.tolist(), offsets.unbind(dim=1)):
+        region_height, region_width = region.shape[1:]
+        dx = (x + cell_offsets[:, 1]).clamp(x0, x0 + region_width - window_width) - x
+        dy = (y + cell_offsets[:, 0]).clamp(y0, y0 + region_height - window_height) - y
+        windows.append(crop_windows(region, torch.stack([x - x0 + dx, y - y0 + dy], dim=1),
+                                    window_width, window_height))
+        applied.append(torch.stack([dy, dx], dim=-1))
+    windows = torch.stack(windows, dim=1)
+    windows = (windows - windows.mean(dim=(-2, -1), keepdim=True)) * taper
+    return windows, torch.stack(applied, dim=1)
+
+
+def shift_cells(cell_masks: torch.Tensor, shifts: torch.Tensor) -> torch.Tensor:
+    """
+    Translate cell masks per frame and merge them
+
+    Args:
+        cell_masks: Masks [cells, H, W], each holding one cell's part
+        shifts: Integer (dy, dx) per frame and cell [B, cells, 2]
+
+    Returns:
+        Masks [B, H, W], the maximum of all translated cells
+    """
+    batch_size = shifts.shape[0]
+    height, width = cell_masks.shape[1:]
+    pad = int(shifts.abs().max()) if shifts.numel() else 0
+    # Cells are written into a padded canvas so shifts past the frame edge just fall off
+    canvas = torch.zeros((batch_size, height + 2 * pad, width + 2 * pad), device=cell_masks.device)
+    for cell, cell_mask in enumerate(cell_masks):
+        x1, y1, x2, y2 = get_bounding_box(cell_mask)
+        part = cell_mask[y1:y2 + 1, x1:x2 + 1].expand(batch_size, -1, -1)
+        origins = torch.stack([x1 + pad + shifts[:, cell, 1], y1 + pad + shifts[:, cell, 0]], dim=1)
+        current = crop_windows(canvas, origins, x2 - x1 + 1, y2 - y1 + 1)
+        paste_windows(canvas, torch.maximum(current, part), origins)
+    return canvas[:, pad:pad + height, pad:pad + width].contiguous()
+
+
+def analysis_frames(frames: torch.Tensor, size: int = ANALYSIS_SIZE,
+                    chunk_frames: int = CHUNK_FRAMES) -> Tuple[torch.Tensor, torch.Tensor]:
+    """
+    Luminance of frames, downscaled (antialiased) to at most size pixels on the long side
+
+    Returns:
+        (gray [B, h, w], 3x3 matrix taking analysis pixel coordinates (x, y)
+        to frame pixel coordinates)
+    """
+    batch_size, height, width = frames.shape[:3]
+    scale = min(1.0, size / max(height, width))
+    small_height, small_width = max(1, round(height * scale)), max(1, round(width * scale))
+    gray = torch.empty((batch_size, small_height, small_width), device=frames.device)
+    for start in range(0, batch_size, chunk_frames):
+        chunk = luminance(frames[start:start + chunk_frames])
+        if (small_height, small_width) != (height, width):
+            chunk = F.interpolate(chunk[:, None], size=(small_height, small_width), mode="bilinear",
+                                  align_corners=False, antialias=True)[:, 0]
+        gray[start:start + chunk_frames] = chunk
+
+    # Pixel centres sit at integer coordinates on both grids
+    fx, fy = width / small_width, height / small_height
+    to_frame = torch.tensor([[fx, 0.0, (fx - 1) / 2], [0.0, fy, (fy - 1) / 2], [0.0, 0.0, 1.0]],
+                            dtype=torch.float64)
+    return gray, to_frame
+
+
+def similarity_matrices(angles: torch.Tensor, scales: torch.Tensor, shifts: torch.Tensor,
+                        centre: Tuple[float, float] = (0.0, 0.0)) -> torch.Tensor:
+    """
+    3x3 matrices for p -> scale * R(angle) (p - centre) + centre + shift
+
+    Args:
+        angles: Rotation [N] in radians (positive turns clockwise on screen, y points down)
+        scales: Scale factors [N]
+        shifts: (x, y) translations [N, 2]
+        centre: (x, y) fixed point of rotation and scale
+
+    Returns:
+        float64 [N, 3, 3]
+    """
+    angles, scales, shifts = angles.double(), scales.double(), shifts.double()
+    cos, sin = scales * torch.cos(angles), scales * torch.sin(angles)
+    cx, cy = centre
+    matrices = torch.zeros((len(angles), 3, 3), dtype=torch.float64)
+    matrices[:, 0, 0], matrices[:, 0, 1] = cos, -sin
+    matrices[:, 1, 0], matrices[:, 1, 1] = sin, cos
+    matrices[:, 0, 2] = cx - cos * cx + sin * cy + shifts[:, 0]
+    matrices[:, 1, 2] = cy - sin * cx - cos * cy + shifts[:, 1]
+    matrices[:, 2, 2] = 1.0
+    return matrices
+
+
+def similarity_parameters(matrices: torch.Tensor) -> torch.Tensor:
+    """(angle, log scale, tx, ty) [N, 4] of similarity matrices about the origin"""
+    a, b = matrices[:, 0, 0], matrices[:, 1, 0]
+    return torch.stack([torch.atan2(b, a), torch.log(torch.hypot(a, b)),
+                        matrices[:, 0, 2], matrices[:, 1, 2]], dim=1)
+
+
+def sample_points(images: torch.Tensor, points: torch.Tensor) -> torch.Tensor:
+    """
+    Bilinearly sample images [N, H, W] at pixel coordinates points [N, h, w, 2] of (x, y)
+
+    Points outside the image read 0.
+    """
+    height, width = images.shape[-2:]
+    scale = torch.tensor([2.0 / width, 2.0 / height], dtype=points.dtype, device=points.device)
+    grid = (points * scale + scale / 2 - 1).to(images.dtype)
+    return F.grid_sample(images[:, None], grid, mode="bilinear", padding_mode="zeros", align_corners=False)[:, 0]
+
+
+def pixel_grid(height: int, width: int, device=None) -> torch.Tensor:
+    """Homogeneous pixel coordinates [H, W, 3] of (x, y, 1), float64"""
+    ys, xs = torch.meshgrid(torch.arange(height, dtype=torch.float64, device=device),
+                            torch.arange(width, dtype=torch.float64, device=device), indexing="ij")
+    return torch.stack([xs, ys, torch.ones_like(xs)], dim=-1)
+
+
+def log_polar_spectra(gray: torch.Tensor, angles: int = POLAR_ANGLES) -> Tuple[torch.Tensor, float]:
+    """
+    Log-polar resampled magnitude spectra of the centre square of each frame
+
+    The magnitude spectrum ignores translation; in log-polar coordinates a
+    rotation of the frame is a shift along the angle axis and a scale change
+    a shift along the log-radius axis, so both come out of one more phase
+    correlation (Fourier-Mellin).
+
+    Returns:
+        (spectra [B, radii, angles] - zero-mean, tapered along the radius -,
+        log-radius step per row)
+    """
+    height, width = gray.shape[-2:]
+    side = min(height, width)
+    top, left = (height - side) // 2, (width - side) // 2
+    square = gray[:, top:top + side, left:left + side]
+    # A circular taper: a separable one leaves a fixed cross in the spectrum that does not rotate
+    offsets = torch.arange(side, dtype=torch.float32, device=gray.device) - (side - 1) / 2
+    distance = torch.hypot(offsets[:, None], offsets[None, :]) / (side / 2)
+    taper = 0.5 + 0.5 * torch.cos(math.pi * distance.clamp(max=1))
+    square = (square - square.mean(dim=(-2, -1), keepdim=True)) * taper
+    magnitude = torch.fft.fftshift(torch.fft.fft2(square).abs(), dim=(-2, -1))
+
+    # High-pass emphasis: low frequencies dominate the magnitude but carry little angle information
+    frequencies = torch.fft.fftshift(torch.fft.fftfreq(side, device=gray.device))
+    radius = torch.hypot(frequencies[:, None], frequencies[None, :])
+    magnitude = torch.log1p(magnitude) * radius
+
+    # Radii from MIN_POLAR_RADIUS (the few samples nearer DC say nothing about angle) to Nyquist
+    radii = side // 2
+    log_step = math.log(radii / MIN_POLAR_RADIUS) / radii
+    rho = MIN_POLAR_RADIUS * torch.exp(torch.arange(radii, dtype=torch.float64) * log_step)
+    theta = torch.arange(angles, dtype=torch.float64) * (math.pi / angles)
+    centre = side // 2
+    points = torch.stack([centre + rho[:, None] * torch.cos(theta)[None, :],
+                          centre + rho[:, None] * torch.sin(theta)[None, :]], dim=-1)
+    spectra = sample_points(magnitude, points.to(gray.device).expand(len(gray), -1, -1, -1))
+    radial_taper = torch.hann_window(radii, periodic=False, device=gray.device)[:, None]
+    return (spectra - spectra.mean(dim=(-2, -1), keepdim=True)) * radial_taper, log_step
+
+
+def estimate_camera_path(frames: torch.Tensor, motion: str = "translation",
+                         size: int = ANALYSIS_SIZE) -> torch.Tensor:
+    """
+    Global motion of every frame relative to the first one
+
+    Consecutive frames are phase-correlated in one batched FFT (on
+    luminance downscaled to size), and the pairwise motions are chained.
+    "similarity" first recovers rotation and scale per pair from the
+    log-polar magnitude spectra, undoes them, then correlates for the
+    translation.
+
+    Args:
+        frames: Frame batch [B, H, W, C], any transport dtype
+        motion: "translation" or "similarity"
+        size: Long side of the analysis frames
+
+    Returns:
+        float64 [B, 3, 3]: matrix i takes frame-0 pixel coordinates (x, y, 1)
+        to the coordinates where that content is in frame i
+    """
+    if motion not in STABILIZE_MOTIONS:
+        raise ValueError(f"Unknown motion model: {motion}")
+    batch_size = frames.shape[0]
+    gray, to_frame = analysis_frames(frames, size)
+    height, width = gray.shape[-2:]
+    if batch_size < 2:
+        return torch.eye(3, dtype=torch.float64).expand(batch_size, 3, 3).clone()
+
+    taper = hann_window2d(height, width, gray.device)
+    previous, current = gray[:-1], gray[1:]
+    centre = ((width - 1) / 2, (height - 1) / 2)
+    pairs = batch_size - 1
+    angles = torch.zeros(pairs, dtype=torch.float64)
+    scales = torch.ones(pairs, dtype=torch.float64)
+
+    if motion == "similarity":
+        spectra, log_step = log_polar_spectra(gray)
+        references, moved = spectra[:-1], spectra[1:]
+        resampled = current
+        for _ in range(SIMILARITY_PASSES):
+            # Angle axis covers [0, pi): the magnitude spectrum is point-symmetric, so it wraps seamlessly
+            polar_shifts, _ = phase_correlation(references, moved, subpixel=True)
+            polar_shifts = polar_shifts.double().cpu()
+            angles += polar_shifts[:, 1] * (math.pi / POLAR_ANGLES)
+            scales *= torch.exp(-polar_shifts[:, 0] * log_step)
+
+            # Resample frame i into frame i-1's rotation and scale; later passes measure what is left
+            undo = similarity_matrices(angles, scales, torch.zeros(pairs, 2), centre)
+            points = pixel_grid(height, width) @ undo[:, None].transpose(-1, -2)
+            resampled = sample_points(current, points[..., :2].to(gray.device))
+            moved, _ = log_polar_spectra(resampled)
+        current = resampled
+
+    def tapered(images):
+        return (images - images.mean(dim=(-2, -1), keepdim=True)) * taper
+
+    shifts, _ = phase_correlation(tapered(previous), tapered(current), subpixel=True)
+    shifts = shifts.double().cpu().flip(-1)
+
+    # Pair motion D_i(p) = A(p + t): translate by t, then rotate and scale about the centre
+    rotation = similarity_matrices(angles, scales, torch.zeros(pairs, 2), centre)
+    steps = rotation @ similarity_matrices(torch.zeros(pairs), torch.ones(pairs), shifts)
+
+    path = torch.empty((batch_size, 3, 3), dtype=torch.float64)
+    path[0] = torch.eye(3, dtype=torch.float64)
+    for i in range(pairs):
+        path[i + 1] = steps[i] @ path[i]
+    # Same motion in full-resolution pixel coordinates
+    return to_frame @ path @ torch.linalg.inv(to_frame)
+
+
+def stabilizing_transforms(path: torch.Tensor, reference_frame: int = 0, smoothing: float = 0) -> torch.Tensor:
+    """
+    Per-frame transforms that cancel camera motion
+
+    With smoothing = 0 every frame is locked to reference_frame; otherwise
+    only the motion that deviates from a Gaussian-smoothed camera path
+    (sigma = smoothing frames) is removed, which keeps intentional pans but
+    takes out shake.
+
+    Args:
+        path: Camera path [B, 3, 3] from estimate_camera_path()
+
+    Returns:
+        float64 [B, 3, 3]: matrix i takes stabilized pixel coordinates to
+        the coordinates in frame i they are read from
+    """
+    batch_size = path.shape[0]
+    if smoothing <= 0:
+        target = path[reference_frame].expand(batch_size, 3, 3)
+    else:
+        parameters = similarity_parameters(path)
+        parameters[:, 0] = unwrap_angles(parameters[:, 0])
+        kernel = gaussian_kernel1d(smoothing).double()
+        radius = min(len(kernel) // 2, batch_size - 1)
+        kernel = kernel[len(kernel) // 2 - radius:len(kernel) // 2 + radius + 1]
+        # Point reflection about the end frames, so a steady pan is left as it is
+        offsets = torch.arange(-radius, batch_size + radius)
+        before, after = offsets < 0, offsets >= batch_size
+        padded = parameters[torch.where(after, 2 * (batch_size - 1) - offsets, offsets.abs())]
+        padded[before] = 2 * parameters[0] - padded[before]
+        padded[after] = 2 * parameters[-1] - padded[after]
+        smoothed = padded.unfold(0, len(kernel), 1) @ (kernel / kernel.sum())
+        target = similarity_matrices(smoothed[:, 0], smoothed[:, 1].exp(), smoothed[:, 2:])
+    return path @ torch.linalg.inv(target)
+
+
+def unwrap_angles(angles: torch.Tensor) -> torch.Tensor:
+    """Remove 2 pi jumps between consecutive angles"""
+    steps = torch.diff(angles, prepend=angles[:1])
+    steps = torch.remainder(steps + math.pi, 2 * math.pi) - math.pi
+    return angles[:1] + torch.cumsum(steps, dim=0)
+
+
+def warp_frames(frames: torch.Tensor, matrices: torch.Tensor,
+                chunk_frames: int = CHUNK_FRAMES) -> torch.Tensor:
+    """
+    Resample frame i at matrices[i] @ p for every output pixel p
+
+    Bilinear, zeros outside the source frame. Frames [B, H, W, C] keep
+    their transport dtype; masks [B, H, W] are warped as float.
+
+    Args:
+        frames: Frames [B, H, W, C] or masks [B, H, W]
+        matrices: [B, 3, 3] from output pixel coordinates to source coordinates
+        chunk_frames: Frames warped per grid_sample call
+    """
+    is_mask = frames.dim() == 3
+    batch_size, height, width = frames.shape[:3]
+    points = pixel_grid(height, width)
+    scale = torch.tensor([2.0 / width, 2.0 / height], dtype=torch.float64)
+    warped = torch.empty_like(frames, dtype=torch.float32) if is_mask else torch.empty_like(frames)
+    for start in range(0, batch_size, chunk_frames):
+        chunk = frames[start:start + chunk_frames]
+        source = points @ matrices[start:start + chunk_frames, None].transpose(-1, -2)
+        grid = (source[..., :2] * scale + scale / 2 - 1).float().to(frames.device)
+        pixels = chunk.float()[:, None] if is_mask else to_float_frames(chunk).permute(0, 3, 1, 2)
+        result = F.grid_sample(pixels, grid, mode="bilinear", padding_mode="zeros", align_corners=False)
+        if is_mask:
+            warped[start:start + chunk_frames] = result[:, 0]
+        else:
+            warped[start:start + chunk_frames] = to_frame_dtype(result.permute(0, 2, 3, 1), frames.dtype)
+    return warped
+
+
+def coverage_masks(matrices: torch.Tensor, height: int, width: int,
+                   chunk_frames: int = CHUNK_FRAMES) -> torch.Tensor:
+    """Float [B, H, W]: how much of each output pixel warp_frames() reads from inside the frame"""
+    ones = torch.ones((1, height, width)).expand(len(matrices), -1, -1)
+    return warp_frames(ones, matrices, chunk_frames)
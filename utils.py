@@ -3,37 +3,219 @@ Utility functions for GIF processing
 """
 
 import torch
+import inspect
+import functools
 import numpy as np
 from PIL import Image
 from typing import List, Tuple, Optional
 
+# Frame transport dtypes: uint8 keeps 0-255 values, float dtypes keep [0, 1]
+FRAME_DTYPES = {"float32": torch.float32, "float16": torch.float16, "uint8": torch.uint8}
 
-def resize_frames(frames: torch.Tensor, target_size: Tuple[int, int]) -> torch.Tensor:
+
+def to_float_frames(frames: torch.Tensor, dtype: torch.dtype = torch.float32) -> torch.Tensor:
+    """
+    Frames in any transport dtype as float in [0, 1]
+    
+    Args:
+        frames: uint8, float16 or float32 frame tensor
+        dtype: Float dtype to return
+        
+    Returns:
+        The input itself when it already has dtype, else a converted copy
+    """
+    if frames.dtype == torch.uint8:
+        return frames.to(dtype).div_(255.0)
+    return frames.to(dtype)
+
+
+def to_frame_dtype(frames: torch.Tensor, dtype) -> torch.Tensor:
+    """
+    Convert frames to a transport dtype
+    
+    Args:
+        frames: uint8, float16 or float32 frame tensor
+        dtype: torch dtype or a FRAME_DTYPES name
+        
+    Returns:
+        Converted frames (uint8 values are rounded), or the input if it already matches
+    """
+    dtype = FRAME_DTYPES.get(dtype, dtype)
+    if frames.dtype == dtype:
+        return frames
+    if dtype == torch.uint8:
+        return (frames.float() * 255.0).round_().clamp_(0, 255).to(torch.uint8)
+    return to_float_frames(frames, dtype)
+
+
+def float_frames_input(*names: str):
+    """
+    Decorator for node functions whose math needs float32 frames
+    
+    The named IMAGE arguments are passed through to_float_frames() before the
+    call, so nodes written for float32 also accept uint8 and float16 frames.
+    Float32 inputs are passed through unchanged.
+    """
+    def decorator(fn):
+        signature = inspect.signature(fn)
+        
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            bound = signature.bind(*args, **kwargs)
+            for name in names:
+                value = bound.arguments.get(name)
+                if isinstance(value, torch.Tensor):
+                    bound.arguments[name] = to_float_frames(value)
+            return fn(*bound.args, **bound.kwargs)
+        
+        return wrapper
+    
+    return decorator
+
+
+def static_mask(plane: torch.Tensor, frame_count: int) -> torch.Tensor:
+    """
+    Mask that is the same on every frame, as a [B, H, W] view of one plane
+    
+    The batch dimension has stride 0, so no per-frame data is allocated until
+    a consumer writes to or copies the mask.
+    
+    Args:
+        plane: Mask plane [H, W]
+        frame_count: Number of frames B
+        
+    Returns:
+        Read-only [B, H, W] view of plane
+    """
+    return plane.unsqueeze(0).expand(frame_count, *plane.shape)
+
+
+def mask_plane(mask: torch.Tensor) -> Optional[torch.Tensor]:
+    """
+    The shared [H, W] plane of a static mask batch
+    
+    Returns:
+        The plane for [B, H, W] masks built by static_mask() (or with B = 1),
+        None for per-frame masks and [H, W] masks
+    """
+    if mask.dim() == 3 and (mask.shape[0] == 1 or mask.stride(0) == 0):
+        return mask[0]
+    return None
+
+
+def map_mask_planes(fn, *masks: torch.Tensor) -> torch.Tensor:
+    """
+    Apply a mask operation on single planes where possible
+    
+    If no input is a per-frame [B, H, W] mask, fn runs once on the [H, W]
+    planes and a static result is expanded back to the frame count.
+    Otherwise fn gets the masks unchanged.
+    
+    Args:
+        fn: Operation taking and returning mask tensors
+        masks: [B, H, W] or [H, W] masks
+    """
+    planes = []
+    frame_count = None
+    for mask in masks:
+        plane = mask_plane(mask)
+        if plane is None and mask.dim() == 3:
+            return fn(*masks)
+        if plane is not None:
+            frame_count = max(frame_count or 0, mask.shape[0])
+        planes.append(mask if plane is None else plane)
+    
+    result = fn(*planes)
+    return result if frame_count is None else static_mask(result, frame_count)
+
+
+def resize_frames(frames: torch.Tensor, target_size: Tuple[int, int], mode: str = 'bilinear',
+                  chunk_frames: int = 16) -> torch.Tensor:
     """
     Resize batch of frames to target size
     
     Args:
-        frames: Tensor of shape [B, H, W, C]
+        frames: Tensor of shape [B, H, W, C], any transport dtype
+        target_size: (width, height) tuple
+        mode: 'bilinear', 'bicubic' or 'nearest'
+        chunk_frames: Frames interpolated at once
+        
+    Returns:
+        Resized frames tensor in the input's dtype
+    """
+    import torch.nn.functional as F
+    
+    batch, _, _, channels = frames.shape
+    resized = torch.empty((batch, target_size[1], target_size[0], channels), dtype=frames.dtype,
+                          device=frames.device)
+    
+    # Interpolate in float32 a chunk at a time, so compact frames stay compact
+    for start in range(0, batch, chunk_frames):
+        # Convert to [B, C, H, W] for torch resize
+        chunk = to_float_frames(frames[start:start + chunk_frames]).permute(0, 3, 1, 2)
+        chunk = F.interpolate(
+            chunk,
+            size=(target_size[1], target_size[0]),
+            mode=mode,
+            align_corners=False if mode != 'nearest' else None
+        )
+        # Convert back to [B, H, W, C]
+        resized[start:start + chunk_frames] = to_frame_dtype(chunk.permute(0, 2, 3, 1), frames.dtype)
+    
+    return resized
+
+
+def box_reduce_frames(frames: torch.Tensor, reduce: int) -> torch.Tensor:
+    """
+    Downscale frames by an integer factor, averaging each reduce x reduce block
+    
+    Output pixel i covers input pixels i * reduce .. i * reduce + reduce - 1,
+    so its centre is where resize_masks() expects it when upscaling back.
+    Blocks cut off by the frame edge average the pixels they have.
+    
+    Args:
+        frames: Tensor of shape [B, H, W, C], any transport dtype
+        reduce: Block size
+        
+    Returns:
+        Frames [B, ceil(H / reduce), ceil(W / reduce), C] in the input's dtype
+    """
+    import torch.nn.functional as F
+    
+    chunk = to_float_frames(frames).permute(0, 3, 1, 2)
+    reduced = F.avg_pool2d(chunk, reduce, ceil_mode=True)
+    return to_frame_dtype(reduced.permute(0, 2, 3, 1), frames.dtype)
+
+
+def resize_masks(masks: torch.Tensor, target_size: Tuple[int, int], mode: str = 'bilinear') -> torch.Tensor:
+    """
+    Resize a mask batch in one interpolation call
+    
+    Args:
+        masks: Mask tensor [B, H, W] or [H, W]
         target_size: (width, height) tuple
+        mode: 'bilinear' or 'nearest'
         
     Returns:
-        Resized frames tensor
+        Resized masks with the same number of dimensions
     """
     import torch.nn.functional as F
     
-    # Convert to [B, C, H, W] for torch resize
-    frames_transposed = frames.permute(0, 3, 1, 2)
+    if mask_plane(masks) is not None:
+        # Static mask: resize the shared plane once
+        return map_mask_planes(lambda plane: resize_masks(plane, target_size, mode), masks)
+    
+    single = masks.dim() == 2
+    batch = masks.unsqueeze(0) if single else masks
     
-    # Resize
     resized = F.interpolate(
-        frames_transposed,
+        batch.unsqueeze(1).float(),
         size=(target_size[1], target_size[0]),
-        mode='bilinear',
-        align_corners=False
-    )
+        mode=mode,
+        align_corners=False if mode != 'nearest' else None
+    ).squeeze(1)
     
-    # Convert back to [B, H, W, C]
-    return resized.permute(0, 2, 3, 1)
+    return resized[0] if single else resized
 
 
 def apply_mask_smoothing(mask: torch.Tensor, kernel_size: int = 5) -> torch.Tensor:
@@ -47,19 +229,13 @@ def apply_mask_smoothing(mask: torch.Tensor, kernel_size: int = 5) -> torch.Tens
     Returns:
         Smoothed mask
     """
-    from scipy.ndimage import gaussian_filter
+    try:
+        from .batch_filters import gaussian_blur
+    except ImportError:
+        from batch_filters import gaussian_blur
     
-    if mask.dim() == 2:
-        # Single mask
-        smoothed = gaussian_filter(mask.numpy(), sigma=kernel_size/2)
-        return torch.from_numpy(smoothed)
-    else:
-        # Batch of masks
-        smoothed_batch = []
-        for m in mask:
-            smoothed = gaussian_filter(m.numpy(), sigma=kernel_size/2)
-            smoothed_batch.append(torch.from_numpy(smoothed))
-        return torch.stack(smoothed_batch)
+    # Whole batch at once
+    return gaussian_blur(mask, kernel_size / 2)
 
 
 def create_gradient_mask(
@@ -118,21 +294,13 @@ def detect_motion_mask(
     Returns:
         Motion masks [B, H, W]
     """
-    masks = []
-    
-    for i in range(len(frames) - 1):
-        # Calculate frame difference
-        diff = torch.abs(frames[i + 1] - frames[i])
-        motion = torch.mean(diff, dim=2)  # Average across channels
-        
-        # Threshold
-        mask = (motion > threshold).float()
-        masks.append(mask)
-    
-    # Add last frame (copy of second-to-last)
-    masks.append(masks[-1] if masks else torch.zeros(frames.shape[1:3]))
+    try:
+        from .batch_filters import motion_mask
+    except ImportError:
+        from batch_filters import motion_mask
     
-    return torch.stack(masks)
+    # All frame pairs differenced in batched ops; the last frame repeats the one before
+    return motion_mask(frames, threshold)
 
 
 def color_range_mask(
@@ -169,6 +337,12 @@ def combine_masks(masks: List[torch.Tensor], method: str = 'union') -> torch.Ten
     Returns:
         Combined mask
     """
+    planes = [mask_plane(mask) for mask in masks]
+    if any(plane is not None for plane in planes) and all(
+            plane is not None or mask.dim() == 2 for plane, mask in zip(planes, masks)):
+        # Static masks: combine the planes once
+        return map_mask_planes(lambda *planes: combine_masks(list(planes), method), *masks)
+    
     if method == 'union':
         combined = torch.zeros_like(masks[0])
         for mask in masks:
@@ -189,48 +363,45 @@ def dilate_mask(mask: torch.Tensor, iterations: int = 1) -> torch.Tensor:
     """
     Expand mask boundaries (dilation)
     
+    Same result as scipy's binary_dilation: nonzero pixels are set and each
+    iteration grows the mask by a 4-connected cross. Advanced Mask Editor
+    uses batch_filters.morphology() (square windows, soft edges) instead.
+    
     Args:
-        mask: Input mask
+        mask: Input mask [B, H, W] or [H, W]
         iterations: Number of dilation iterations
         
     Returns:
-        Dilated mask
+        Dilated 0/1 mask
     """
-    from scipy.ndimage import binary_dilation
+    try:
+        from .batch_filters import diamond_morphology
+    except ImportError:
+        from batch_filters import diamond_morphology
     
-    if mask.dim() == 2:
-        dilated = binary_dilation(mask.numpy(), iterations=iterations)
-        return torch.from_numpy(dilated.astype(np.float32))
-    else:
-        dilated_batch = []
-        for m in mask:
-            dilated = binary_dilation(m.numpy(), iterations=iterations)
-            dilated_batch.append(torch.from_numpy(dilated.astype(np.float32)))
-        return torch.stack(dilated_batch)
+    return diamond_morphology(mask, "dilate", iterations)
 
 
 def erode_mask(mask: torch.Tensor, iterations: int = 1) -> torch.Tensor:
     """
     Shrink mask boundaries (erosion)
     
+    Same result as scipy's binary_erosion: each iteration removes a
+    4-connected cross, and the frame border erodes masks that touch it.
+    
     Args:
-        mask: Input mask
+        mask: Input mask [B, H, W] or [H, W]
         iterations: Number of erosion iterations
         
     Returns:
-        Eroded mask
+        Eroded 0/1 mask
     """
-    from scipy.ndimage import binary_erosion
+    try:
+        from .batch_filters import diamond_morphology
+    except ImportError:
+        from batch_filters import diamond_morphology
     
-    if mask.dim() == 2:
-        eroded = binary_erosion(mask.numpy(), iterations=iterations)
-        return torch.from_numpy(eroded.astype(np.float32))
-    else:
-        eroded_batch = []
-        for m in mask:
-            eroded = binary_erosion(m.numpy(), iterations=iterations)
-            eroded_batch.append(torch.from_numpy(eroded.astype(np.float32)))
-        return torch.stack(eroded_batch)
+    return diamond_morphology(mask, "erode", iterations)
 
 
 def get_bounding_box(mask: torch.Tensor) -> Tuple[int, int, int, int]:
@@ -238,13 +409,16 @@ def get_bounding_box(mask: torch.Tensor) -> Tuple[int, int, int, int]:
     Get bounding box of mask region
     
     Args:
-        mask: Mask tensor [H, W]
+        mask: Mask tensor [H, W], or [B, H, W] for the union over all frames
         
     Returns:
         (x1, y1, x2, y2) bounding box coordinates
     """
-    rows = torch.any(mask > 0, dim=1)
-    cols = torch.any(mask > 0, dim=0)
+    active = mask > 0
+    if active.dim() == 3:
+        active = active.any(dim=0)
+    rows = torch.any(active, dim=1)
+    cols = torch.any(active, dim=0)
     
     if not torch.any(rows) or not torch.any(cols):
         return (0, 0, 0, 0)
@@ -255,6 +429,109 @@ def get_bounding_box(mask: torch.Tensor) -> Tuple[int, int, int, int]:
     return (int(x1), int(y1), int(x2), int(y2))
 
 
+def get_bounding_boxes(masks: torch.Tensor) -> torch.Tensor:
+    """
+    Per-frame bounding boxes of mask regions, for all frames at once
+    
+    Args:
+        masks: Mask tensor [B, H, W]
+        
+    Returns:
+        int64 tensor [B, 4] of (x1, y1, x2, y2); (0, 0, 0, 0) for empty frames
+    """
+    active = masks > 0
+    rows = active.any(dim=2).to(torch.uint8)
+    cols = active.any(dim=1).to(torch.uint8)
+    height, width = masks.shape[1:]
+    
+    # First and last set row/column of every frame
+    y1 = rows.argmax(dim=1)
+    y2 = height - 1 - rows.flip(1).argmax(dim=1)
+    x1 = cols.argmax(dim=1)
+    x2 = width - 1 - cols.flip(1).argmax(dim=1)
+    
+    boxes = torch.stack([x1, y1, x2, y2], dim=1)
+    boxes[rows.amax(dim=1) == 0] = 0
+    return boxes
+
+
+def crop_windows_for_boxes(
+    boxes: torch.Tensor,
+    width: int,
+    height: int,
+    margin: int = 0,
+    multiple: int = 8
+) -> Tuple[torch.Tensor, int, int]:
+    """
+    Equal-size crop windows around bounding boxes
+    
+    The window covers the largest box plus margin on every side, rounded up to
+    a multiple of `multiple` (so it encodes to whole latents) and capped at the
+    frame size. Each window is centred on its box and shifted to stay inside
+    the frame.
+    
+    Args:
+        boxes: Tensor [N, 4] of (x1, y1, x2, y2) from get_bounding_box(es)
+        width: Frame width
+        height: Frame height
+        margin: Context pixels around each box
+        multiple: Window size granularity
+        
+    Returns:
+        (origins [N, 2] of window (x, y), window width, window height)
+    """
+    boxes = boxes.long()
+    box_width = int((boxes[:, 2] - boxes[:, 0]).max()) + 1
+    box_height = int((boxes[:, 3] - boxes[:, 1]).max()) + 1
+    crop_width = min(width, -(-(box_width + 2 * margin) // multiple) * multiple)
+    crop_height = min(height, -(-(box_height + 2 * margin) // multiple) * multiple)
+    
+    x = ((boxes[:, 0] + boxes[:, 2] + 1) // 2 - crop_width // 2).clamp(0, width - crop_width)
+    y = ((boxes[:, 1] + boxes[:, 3] + 1) // 2 - crop_height // 2).clamp(0, height - crop_height)
+    return torch.stack([x, y], dim=1), crop_width, crop_height
+
+
+def crop_windows(batch: torch.Tensor, origins: torch.Tensor, crop_width: int, crop_height: int) -> torch.Tensor:
+    """
+    Crop one window per frame
+    
+    Args:
+        batch: Frames [B, H, W, C] or masks [B, H, W]
+        origins: Window (x, y) per frame [B, 2]
+        crop_width: Window width
+        crop_height: Window height
+        
+    Returns:
+        Windows [B, crop_height, crop_width, ...] (a copy, not a view)
+    """
+    if bool((origins == origins[0]).all()):
+        x, y = origins[0].tolist()
+        return batch[:, y:y + crop_height, x:x + crop_width].contiguous()
+    
+    # Different window per frame: one gather over the whole batch
+    frame_index, rows, cols = _window_index(origins, crop_width, crop_height)
+    return batch[frame_index, rows, cols]
+
+
+def paste_windows(batch: torch.Tensor, windows: torch.Tensor, origins: torch.Tensor) -> torch.Tensor:
+    """Write crop_windows() output back into batch in place"""
+    crop_height, crop_width = windows.shape[1:3]
+    if bool((origins == origins[0]).all()):
+        x, y = origins[0].tolist()
+        batch[:, y:y + crop_height, x:x + crop_width] = windows
+    else:
+        batch[_window_index(origins, crop_width, crop_height)] = windows
+    return batch
+
+
+def _window_index(origins: torch.Tensor, crop_width: int, crop_height: int):
+    """Advanced-indexing tensors selecting a window per frame"""
+    frame_index = torch.arange(len(origins))[:, None, None]
+    rows = (origins[:, 1, None] + torch.arange(crop_height))[:, :, None]
+    cols = (origins[:, 0, None] + torch.arange(crop_width))[:, None, :]
+    return frame_index, rows, cols
+
+
 def temporal_smoothing(frames: torch.Tensor, window_size: int = 3) -> torch.Tensor:
     """
     Apply temporal smoothing to reduce flickering
@@ -279,3 +556,79 @@ def temporal_smoothing(frames: torch.Tensor, window_size: int = 3) -> torch.Tens
         smoothed.append(torch.mean(window_frames, dim=0))
     
     return torch.stack(smoothed)
+
+
+def deduplicate_frames(
+    frames: torch.Tensor,
+    tolerance: float = 0.0,
+    masks: Optional[torch.Tensor] = None
+) -> Tuple[List[int], List[int]]:
+    """
+    Find unique frames in a batch
+    
+    Exact duplicates anywhere in the clip are found by hashing the frames as
+    they would be written (uint8). With tolerance > 0, a frame whose mean
+    absolute difference from the previous frame's unique frame is within
+    tolerance is also collapsed onto it (held poses with slight noise).
+    
+    Args:
+        frames: Frame batch [B, H, W, C], any transport dtype
+        tolerance: Near-duplicate threshold on mean absolute difference (0 = exact only)
+        masks: Optional masks [B, H, W]; frames only match if their masks match too
+        
+    Returns:
+        (unique_indices, index_map): source index of each unique frame, and
+        the unique position every source frame maps to
+    """
+    import hashlib
+    
+    seen = {}
+    unique_indices = []
+    index_map = []
+    
+    for i in range(len(frames)):
+        if tolerance > 0 and index_map:
+            previous = unique_indices[index_map[-1]]
+            diff = to_float_frames(frames[i]) - to_float_frames(frames[previous])
+            close = torch.mean(torch.abs(diff)) <= tolerance
+            if close and (masks is None or torch.equal(masks[i], masks[previous])):
+                index_map.append(index_map[-1])
+                continue
+        
+        frame = frames[i] if frames.dtype == torch.uint8 else (frames[i].float() * 255).to(torch.uint8)
+        digest = hashlib.blake2b(frame.cpu().numpy().tobytes())
+        if masks is not None:
+            digest.update(masks[i].cpu().numpy().tobytes())
+        key = digest.digest()
+        
+        if key not in seen:
+            seen[key] = len(unique_indices)
+            unique_indices.append(i)
+        index_map.append(seen[key])
+    
+    return unique_indices, index_map
+
+
+def merge_frame_runs(index_map: List[int], durations: List[int]) -> Tuple[List[int], List[int]]:
+    """
+    Collapse consecutive repeats of the same unique frame into one timed frame
+    
+    Args:
+        index_map: Unique frame position for every source frame
+        durations: Source frame durations in ms
+        
+    Returns:
+        (frame_indices, merged_durations) for writing an animation with the
+        original timing
+    """
+    frame_indices = []
+    merged_durations = []
+    
+    for index, duration in zip(index_map, durations):
+        if frame_indices and frame_indices[-1] == index:
+            merged_durations[-1] += duration
+        else:
+            frame_indices.append(index)
+            merged_durations.append(duration)
+    
+    return frame_indices, merged_durations